@@ -1,15 +1,23 @@
+import os
 from flask import Flask
 from config import Config
-from bankApp.models import DatabaseManager
+from bankApp.models import DatabaseManager, InMemoryDatabaseManager
 
 app  = Flask(__name__)
 app.config.from_object(Config)
 
-# Gestionnaire de base de données
-db_manager = DatabaseManager()
+# Gestionnaire de base de données (BANKAPP_DATABASE=memory : base en mémoire, pour les tests de charge hors ligne)
+if os.environ.get("BANKAPP_DATABASE") == "memory":
+    db_manager = InMemoryDatabaseManager()
+else:
+    db_manager = DatabaseManager()
 
-# Iniitialisation de la DB
-db_manager.init_db()
+# L'initialisation du schéma n'est plus faite à l'import : elle est lancée au démarrage
+# du serveur (run.py, wsgi.py) ou manuellement avec : flask --app bankApp init-db
+@app.cli.command("init-db")
+def init_db_command():
+    # Crée les tables si elles n'existent pas
+    db_manager.init_db()
 
 # Import des routes après la création de app
 from bankApp import views
@@ -3,6 +3,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from config import Config
 from datetime import datetime
 import uuid
+import threading
 
 # Classe pour gérer la connexion à la base de données, les utilisateurs et les conversations
 class DatabaseManager:
@@ -57,6 +58,17 @@ class DatabaseManager:
                 )
             """)
             
+            # Étiquettes posées après coup sur des conversations (réentraînement incrémental)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS conversation_labels (
+                    id SERIAL PRIMARY KEY,
+                    conversation_id INTEGER REFERENCES conversations(id),
+                    category VARCHAR(100) NOT NULL,
+                    intent VARCHAR(100) NOT NULL,
+                    labelled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             conn.commit() # Enregistre les modifications dans la base de données
             cur.close() # Ferme le curseur
             conn.close() # Ferme la connexion à la base de données
@@ -259,4 +271,196 @@ class DatabaseManager:
             
         except Exception as e:
             print(f"Erreur lors de la récupération de l'historique: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    """
+        Enregistre l'étiquette (catégorie, intention) attendue pour une conversation.
+        Retourne True si succès, False sinon.
+    """
+    def label_conversation(self, conversation_id, category, intent):
+        conn = self.get_connection()
+        if not conn:
+            return False
+        
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO conversation_labels (conversation_id, category, intent, labelled_at)
+                VALUES (%s, %s, %s, %s)
+            """, (conversation_id, category, intent, datetime.now()))
+            
+            conn.commit()
+            cur.close()
+            conn.close()
+            return True
+            
+        except Exception as e:
+            print(f"Erreur lors de l'étiquetage: {e}")
+            return False
+
+    """
+        Étiquettes d'id supérieur à after_id avec le message de la conversation, par ordre d'id.
+        Avec max_confidence, seules les conversations sans réponse ou de confiance inférieure sont retenues.
+        Produit des lots de tuples (id de l'étiquette, user_message, category, intent).
+    """
+    def iter_labelled_conversations(self, after_id=0, max_confidence=None, batch_size=10000):
+        # Comme iter_conversations : une erreur remonte à l'appelant, qui ne prend pas un échec pour la fin des étiquettes
+        conn = self.get_connection()
+        if not conn:
+            raise ConnectionError("Base de données indisponible")
+
+        try:
+            cur = conn.cursor(name="iter_labelled_conversations")
+            cur.itersize = batch_size
+            cur.execute("""
+                SELECT l.id, c.user_message, l.category, l.intent
+                FROM conversation_labels l
+                JOIN conversations c ON c.id = l.conversation_id
+                WHERE l.id > %s
+                  AND (%s IS NULL OR c.confidence IS NULL OR c.confidence < %s)
+                ORDER BY l.id
+            """, (after_id, max_confidence, max_confidence))
+
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+            cur.close()
+        except Exception as e:
+            print(f"Erreur lors du parcours des étiquettes: {e}")
+            raise
+        finally:
+            conn.close()
+
+    """
+        Parcourt toute la table 'conversations' par ordre d'id croissant, à partir de after_id exclu
+        (reprise d'un traitement interrompu). Curseur côté serveur : la table n'est jamais chargée en entier.
+        Produit des lots de tuples (id, user_message, bot_response, category, confidence).
+    """
+    def iter_conversations(self, after_id=0, batch_size=10000):
+        # Une erreur interrompt le parcours et remonte à l'appelant (reprise depuis son dernier id traité) :
+        # une fin silencieuse serait prise pour la fin de la table
+        conn = self.get_connection()
+        if not conn:
+            raise ConnectionError("Base de données indisponible")
+
+        try:
+            # Un curseur nommé est un curseur côté serveur (lecture par paquets de itersize lignes)
+            cur = conn.cursor(name="iter_conversations")
+            cur.itersize = batch_size
+            cur.execute("""
+                SELECT id, user_message, bot_response, category, confidence
+                FROM conversations
+                WHERE id > %s
+                ORDER BY id
+            """, (after_id,))
+
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+            cur.close()
+        except Exception as e:
+            print(f"Erreur lors du parcours des conversations: {e}")
+            raise
+        finally:
+            conn.close()
+
+# Gestionnaire en mémoire, même interface que DatabaseManager, sans PostgreSQL :
+# utilisé par les benchmarks et les tests de charge hors ligne (données perdues à l'arrêt).
+class InMemoryDatabaseManager:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = {}            # id -> ligne utilisateur
+        self.users_by_email = {}   # email -> id
+        self.users_by_public_id = {}
+        self.conversations = {}    # user_id -> liste des conversations (ordre d'insertion)
+        self.next_conversation_id = 1
+        self.labels = []           # (id, conversation_id, category, intent)
+
+    def init_db(self):
+        return True
+
+    def create_user(self, email, password, first_name, last_name):
+        password_hash = generate_password_hash(password)
+        with self.lock:
+            if email in self.users_by_email:
+                return None  # Email déjà utilisé
+            user = {
+                'id': len(self.users) + 1,
+                'public_id': str(uuid.uuid4()),
+                'email': email,
+                'password_hash': password_hash,
+                'first_name': first_name,
+                'last_name': last_name,
+                'created_at': datetime.now(),
+                'last_login': None,
+            }
+            self.users[user['id']] = user
+            self.users_by_email[email] = user['id']
+            self.users_by_public_id[user['public_id']] = user['id']
+        return {k: user[k] for k in ('id', 'public_id', 'email', 'first_name', 'last_name')}
+
+    def authenticate_user(self, email, password):
+        user = self.users.get(self.users_by_email.get(email))
+        if not user or not check_password_hash(user['password_hash'], password):
+            return None
+        user['last_login'] = datetime.now()
+        return {k: user[k] for k in ('id', 'public_id', 'email', 'first_name', 'last_name')}
+
+    def get_user_by_public_id(self, public_id):
+        user = self.users.get(self.users_by_public_id.get(public_id))
+        if not user:
+            return None
+        return {k: user[k] for k in ('id', 'public_id', 'email', 'first_name', 'last_name', 'created_at', 'last_login')}
+
+    def save_conversation(self, user_id, user_message, bot_response, category, confidence):
+        with self.lock:
+            self.conversations.setdefault(user_id, []).append(
+                (user_message, bot_response, category, confidence, datetime.now(), self.next_conversation_id)
+            )
+            self.next_conversation_id += 1
+        return True
+
+    def get_conversation_history(self, user_id, limit=100):
+        conversations = self.conversations.get(user_id, [])[-limit:][::-1]
+        return [{
+            'user_message': conv[0],
+            'bot_response': conv[1],
+            'category': conv[2],
+            'confidence': conv[3],
+            'timestamp': conv[4].strftime('%d/%m/%Y %H:%M:%S')
+        } for conv in conversations]
+
+    def iter_conversations(self, after_id=0, batch_size=10000):
+        with self.lock:
+            rows = sorted(
+                (conv[5], conv[0], conv[1], conv[2], conv[3])
+                for conversations in self.conversations.values() for conv in conversations if conv[5] > after_id
+            )
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    def label_conversation(self, conversation_id, category, intent):
+        with self.lock:
+            self.labels.append((len(self.labels) + 1, conversation_id, category, intent))
+        return True
+
+    def iter_labelled_conversations(self, after_id=0, max_confidence=None, batch_size=10000):
+        with self.lock:
+            conversations = {
+                conv[5]: conv for conversations in self.conversations.values() for conv in conversations
+            }
+            rows = [
+                (label_id, conversations[conversation_id][0], category, intent)
+                for label_id, conversation_id, category, intent in self.labels
+                if label_id > after_id and conversation_id in conversations and (
+                    max_confidence is None or conversations[conversation_id][3] is None
+                    or conversations[conversation_id][3] < max_confidence)
+            ]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
@@ -0,0 +1,253 @@
+#bankApp/nlp/artifacts.py
+import os
+import sys
+import json
+import numpy as np
+from bankApp.nlp.atomic_io import atomic_write, atomic_save_array
+
+# Version du format des artefacts de service (à incrémenter à chaque changement de disposition)
+ARTIFACT_VERSION = 2
+
+# Versions encore lisibles : la version 1, sans table des réponses, la reconstruit au chargement
+SUPPORTED_VERSIONS = (1, ARTIFACT_VERSION)
+
+# Sous-dossier des artefacts de service dans le dossier des modèles
+ARTIFACTS_SUBDIR = "serving"
+MANIFEST_FILE = "manifest.json"
+STRINGS_FILE = "strings.json"
+
+# Tableaux binaires alignés ligne à ligne (ouverts en mmap au chargement)
+ARRAY_FILES = {
+    "embeddings": "embeddings.npy",
+    "intent_ids": "intent_ids.npy",
+    "response_ids": "response_ids.npy",
+    "category_offsets": "category_offsets.npy",
+    "answer_ids": "answer_ids.npy",
+}
+
+class Answer:
+    # Intention et réponse servies pour une ligne ; un seul enregistrement par paire distincte,
+    # partagé par toutes les lignes (instructions) de cette paire
+    __slots__ = ("intent", "response")
+
+    def __init__(self, intent, response):
+        self.intent = intent
+        self.response = response
+
+    def __repr__(self):
+        return f"Answer({self.intent!r}, {self.response!r})"
+
+class ServingArtifacts:
+    """
+    Artefacts nécessaires au service de prédiction, sans pandas.
+    Les lignes sont triées par catégorie : les embeddings d'une catégorie forment
+    une tranche contiguë (vue sur le mmap, aucune copie par requête).
+    Les embeddings sont normalisés L2 : la similarité cosinus est un simple produit scalaire.
+    Les lignes en double du dataset sont fusionnées à la sauvegarde.
+    """
+
+    def __init__(self, manifest, arrays, strings):
+        self.manifest = manifest
+        self.embeddings = arrays["embeddings"]
+        self.intent_ids = arrays["intent_ids"]
+        self.response_ids = arrays["response_ids"]
+        self.category_offsets = arrays["category_offsets"]
+
+        # Tables de chaînes internées, indexées par identifiant entier
+        self.categories = tuple(sys.intern(c) for c in strings["categories"])
+        self.intents = tuple(sys.intern(i) for i in strings["intents"])
+        self.responses = tuple(strings["responses"])
+        self._category_codes = {c: code for code, c in enumerate(self.categories)}
+
+        # Enregistrements (intention, réponse) par paire distincte et code de paire de chaque ligne, calculés
+        # à la sauvegarde : une seule indexation par résultat au service, sans objet créé par requête
+        if "answer_ids" in arrays:
+            pairs, self.answer_ids = strings["answers"], arrays["answer_ids"]
+        else:
+            pairs, self.answer_ids = _answer_table(self.intent_ids, self.response_ids, len(self.responses))
+        self.answers = tuple(Answer(self.intents[i], self.responses[r]) for i, r in pairs)
+
+    def __len__(self):
+        return len(self.intent_ids)
+
+    def category_code(self, category):
+        # Code entier d'une catégorie (label des index vectoriels), None si inconnue
+        return self._category_codes.get(category)
+
+    def category_slice(self, category):
+        # Retourne (début, fin) des lignes de la catégorie, (0, 0) si inconnue
+        code = self.category_code(category)
+        if code is None:
+            return 0, 0
+        return int(self.category_offsets[code]), int(self.category_offsets[code + 1])
+
+    def row_category_codes(self):
+        # Code de catégorie de chaque ligne (reconstruit depuis les bornes, sans stockage)
+        return np.repeat(np.arange(len(self.categories)), np.diff(self.category_offsets))
+
+    def answer(self, row):
+        return self.answers[self.answer_ids[row]]
+
+    def intent(self, row):
+        return self.answers[self.answer_ids[row]].intent
+
+    def response(self, row):
+        return self.answers[self.answer_ids[row]].response
+
+def _intern_column(values):
+    # Remplace une colonne de chaînes répétées par (table de chaînes uniques, codes entiers)
+    table, codes = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+    return [str(v) for v in table], codes.astype(np.int32)
+
+def _answer_table(intent_ids, response_ids, n_responses):
+    # Paires (intention, réponse) distinctes et code de paire de chaque ligne
+    n_responses = max(n_responses, 1)
+    keys, answer_ids = np.unique(intent_ids.astype(np.int64) * n_responses + response_ids, return_inverse=True)
+    pairs = [[key // n_responses, key % n_responses] for key in keys.tolist()]
+    return pairs, answer_ids.reshape(-1).astype(np.int32)
+
+def _write_artifacts(directory, arrays, strings):
+    # Table des réponses ajoutée aux artefacts : les workers l'ouvrent en mmap au lieu de la recalculer
+    strings["answers"], arrays["answer_ids"] = _answer_table(
+        arrays["intent_ids"], arrays["response_ids"], len(strings["responses"])
+    )
+
+    for name, filename in ARRAY_FILES.items():
+        atomic_save_array(os.path.join(directory, filename), arrays[name])
+
+    with atomic_write(os.path.join(directory, STRINGS_FILE)) as f:
+        json.dump(strings, f, ensure_ascii=False)
+
+    # Le manifeste est écrit en dernier : sa présence indique des artefacts complets
+    embeddings = arrays["embeddings"]
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "rows": int(embeddings.shape[0]),
+        "dim": int(embeddings.shape[1]),
+        "normalized": True,
+        "arrays": {name: {"dtype": str(a.dtype), "shape": list(a.shape)} for name, a in arrays.items()},
+    }
+    with atomic_write(os.path.join(directory, MANIFEST_FILE)) as f:
+        json.dump(manifest, f, indent=2)
+
+def save_artifacts(model_dir, categories, intents, responses, embeddings):
+    """
+    Sauvegarde les artefacts de service au format versionné.
+    Args:
+        model_dir (str): Dossier des modèles
+        categories, intents, responses (sequence): Colonnes alignées sur les embeddings
+        embeddings (np.ndarray): Embeddings (n, dim) des instructions
+    Returns:
+        str: Dossier des artefacts
+    """
+    directory = os.path.join(model_dir, ARTIFACTS_SUBDIR)
+    os.makedirs(directory, exist_ok=True)
+
+    category_table, category_codes = _intern_column(categories)
+    intent_table, intent_ids = _intern_column(intents)
+    response_table, response_ids = _intern_column(responses)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    # Les doublons (même instruction, même intention) ont le même embedding : une seule ligne est gardée,
+    # la recherche des k meilleures intentions ne retourne pas k fois la même phrase
+    keys = np.column_stack([category_codes, intent_ids, response_ids, embeddings.view(np.int32)])
+    _, unique_rows = np.unique(keys, axis=0, return_index=True)
+    unique_rows.sort()
+
+    # Tri stable par catégorie pour obtenir des tranches contiguës
+    order = unique_rows[np.argsort(category_codes[unique_rows], kind="stable")]
+    counts = np.bincount(category_codes[order], minlength=len(category_table))
+    category_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    # Normalisation L2 hors ligne
+    embeddings = embeddings[order]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.maximum(norms, 1e-12)
+
+    arrays = {
+        "embeddings": np.ascontiguousarray(embeddings),
+        "intent_ids": intent_ids[order],
+        "response_ids": response_ids[order],
+        "category_offsets": category_offsets,
+    }
+    strings = {
+        "categories": category_table,
+        "intents": intent_table,
+        "responses": response_table,
+    }
+    _write_artifacts(directory, arrays, strings)
+    return directory
+
+def append_artifacts(model_dir, base, category_codes, intent_ids, embeddings):
+    """
+    Écrit dans model_dir les artefacts de base augmentés de nouvelles lignes, sans retrier ni
+    dédoublonner les lignes existantes : les nouvelles lignes sont placées à la fin de la tranche
+    de leur catégorie. Les catégories et intentions doivent déjà exister dans base.
+    Args:
+        base (ServingArtifacts): Artefacts de la version de départ
+        category_codes, intent_ids (np.ndarray): Codes des nouvelles lignes dans les tables de base
+        embeddings (np.ndarray): Embeddings (n, dim) des nouvelles lignes
+    Returns:
+        tuple: (position de chaque ancienne ligne, position de chaque nouvelle ligne) dans les nouveaux artefacts
+    """
+    directory = os.path.join(model_dir, ARTIFACTS_SUBDIR)
+    os.makedirs(directory, exist_ok=True)
+
+    # Réponse de chaque intention (une intention n'a qu'une réponse dans le dataset)
+    intent_responses = np.zeros(len(base.intents), dtype=base.response_ids.dtype)
+    intent_responses[base.intent_ids] = base.response_ids
+    intent_ids = np.asarray(intent_ids, dtype=base.intent_ids.dtype)
+
+    # Tri stable par catégorie des anciennes puis des nouvelles lignes : l'ordre relatif des anciennes est conservé
+    codes = np.concatenate([base.row_category_codes(), np.asarray(category_codes)])
+    order = np.argsort(codes, kind="stable")
+    positions = np.empty(len(order), dtype=np.int64)
+    positions[order] = np.arange(len(order))
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    counts = np.bincount(codes, minlength=len(base.categories))
+    arrays = {
+        "embeddings": np.ascontiguousarray(np.concatenate([base.embeddings, embeddings])[order]),
+        "intent_ids": np.concatenate([base.intent_ids, intent_ids])[order],
+        "response_ids": np.concatenate([base.response_ids, intent_responses[intent_ids]])[order],
+        "category_offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+    }
+    strings = {
+        "categories": list(base.categories),
+        "intents": list(base.intents),
+        "responses": list(base.responses),
+    }
+    _write_artifacts(directory, arrays, strings)
+    return positions[:len(base)], positions[len(base):]
+
+def artifacts_exist(model_dir):
+    return os.path.exists(os.path.join(model_dir, ARTIFACTS_SUBDIR, MANIFEST_FILE))
+
+def load_artifacts(model_dir, mmap=True):
+    """
+    Charge les artefacts de service. Avec mmap=True, les tableaux sont ouverts en lecture seule
+    via np.load(mmap_mode='r') : les workers partagent le cache de pages au lieu de copies privées.
+    Returns:
+        ServingArtifacts
+    """
+    directory = os.path.join(model_dir, ARTIFACTS_SUBDIR)
+    with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") not in SUPPORTED_VERSIONS:
+        raise ValueError(
+            f"Version d'artefacts {manifest.get('version')} non supportée "
+            f"(attendue: {ARTIFACT_VERSION}). Relancez l'entraînement."
+        )
+
+    mmap_mode = "r" if mmap else None
+    # Tableaux listés par le manifeste (answer_ids absent des artefacts en version 1)
+    arrays = {
+        name: np.load(os.path.join(directory, ARRAY_FILES[name]), mmap_mode=mmap_mode)
+        for name in manifest["arrays"]
+    }
+    with open(os.path.join(directory, STRINGS_FILE), encoding="utf-8") as f:
+        strings = json.load(f)
+
+    return ServingArtifacts(manifest, arrays, strings)
@@ -0,0 +1,39 @@
+#bankApp/nlp/atomic_io.py
+# Écritures atomiques des fichiers lus par d'autres processus (artefacts, pointeur CURRENT, états,
+# points de contrôle) : le contenu est écrit dans un fichier temporaire voisin puis renommé avec
+# os.replace, un lecteur ne voit jamais un fichier partiel.
+import os
+from contextlib import contextmanager
+import numpy as np
+
+@contextmanager
+def atomic_path(path):
+    """
+    Chemin temporaire à remplir (pour les écrivains qui ouvrent le fichier eux-mêmes : to_csv par blocs,
+    ParquetWriter...). Renommé en path à la sortie du bloc, supprimé en cas d'erreur.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        yield tmp_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """
+    Ouvre un fichier écrit de façon atomique (UTF-8 en mode texte).
+    Args:
+        path (str): Fichier de destination
+        mode (str): "w" (texte) ou "wb" (binaire)
+    """
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+
+def atomic_save_array(path, array):
+    # np.save atomique
+    with atomic_write(path, "wb") as f:
+        np.save(f, array)
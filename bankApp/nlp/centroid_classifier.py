@@ -0,0 +1,94 @@
+#bankApp/nlp/centroid_classifier.py
+import numpy as np
+
+class NearestCentroidClassifier:
+    """
+    Classifieur de catégories par centroïde le plus proche sur les embeddings de phrases.
+    Réutilise l'embedding déjà calculé pour la recherche d'intention : une requête ne demande
+    qu'un passage de l'encodeur, sans TF-IDF ni forêt aléatoire.
+    Les probabilités sont un softmax des similarités cosinus divisées par `temperature`.
+    """
+
+    def __init__(self, temperature=0.05):
+        self.temperature = temperature
+        self.classes_ = None
+        self.centroids_ = None
+        self.counts_ = None
+        self.sums_ = None
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def fit(self, embeddings, labels):
+        """
+        Calcule un centroïde normalisé par catégorie.
+        Args:
+            embeddings (np.ndarray): Embeddings (n, dim)
+            labels (sequence): Catégorie de chaque ligne
+        """
+        vectors = self._normalize(embeddings)
+        self.classes_, codes = np.unique(np.asarray(labels).astype(str), return_inverse=True)
+
+        # Somme par catégorie en une passe, puis moyenne
+        sums = np.zeros((len(self.classes_), vectors.shape[1]), dtype=np.float64)
+        np.add.at(sums, codes, vectors)
+        self.counts_ = np.bincount(codes, minlength=len(self.classes_)).astype(np.int64)
+        self.sums_ = sums
+        self.centroids_ = self._normalize(sums / self.counts_[:, None])
+        return self
+
+    def partial_fit(self, embeddings, labels):
+        """
+        Mise à jour incrémentale : les sommes par catégorie sont complétées par les nouvelles lignes,
+        les centroïdes sont exactement ceux d'un fit sur l'ensemble des lignes vues.
+        Les catégories doivent déjà être connues du modèle.
+        """
+        labels = np.asarray(labels).astype(str)
+        unknown = set(labels.tolist()) - set(self.classes_.tolist())
+        if unknown:
+            raise ValueError(f"Catégories inconnues du classifieur: {sorted(unknown)}")
+        codes = np.searchsorted(self.classes_, labels)
+
+        # Anciens fichiers sans sommes : la moyenne non normalisée est approchée par le centroïde
+        if self.sums_ is None:
+            self.sums_ = self.centroids_.astype(np.float64) * self.counts_[:, None]
+
+        vectors = self._normalize(embeddings)
+        sums = self.sums_.copy()
+        np.add.at(sums, codes, vectors)
+        self.sums_ = sums
+        self.counts_ = self.counts_ + np.bincount(codes, minlength=len(self.classes_))
+        self.centroids_ = self._normalize(sums / np.maximum(self.counts_, 1)[:, None])
+        return self
+
+    def decision_function(self, embeddings):
+        # Similarité cosinus entre chaque embedding et chaque centroïde
+        return self._normalize(np.atleast_2d(embeddings)) @ self.centroids_.T
+
+    def predict_proba(self, embeddings):
+        scores = self.decision_function(embeddings) / self.temperature
+        scores -= scores.max(axis=1, keepdims=True)
+        probas = np.exp(scores)
+        return probas / probas.sum(axis=1, keepdims=True)
+
+    def predict(self, embeddings):
+        return self.classes_[self.decision_function(embeddings).argmax(axis=1)]
+
+    def save(self, path):
+        # Format .npz sans pickle : quelques Ko, chargement instantané
+        arrays = {} if self.sums_ is None else {"sums": self.sums_}
+        np.savez(path, classes=self.classes_, centroids=self.centroids_,
+                 counts=self.counts_, temperature=self.temperature, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        model = cls(temperature=float(data["temperature"]))
+        model.classes_ = data["classes"]
+        model.centroids_ = data["centroids"]
+        model.counts_ = data["counts"]
+        model.sums_ = data["sums"] if "sums" in data.files else None
+        return model
@@ -1,11 +1,20 @@
 import os
-import random
+import argparse
+import numpy as np
 import pandas as pd
+from bankApp.nlp.atomic_io import atomic_path
 
 # Définition du chemin vers le dossier "data", situé un niveau au-dessus de ce fichier.
 # Cela permet de toujours sauvegarder le dataset au bon endroit, peu importe l'endroit
 # depuis lequel le script est exécuté.
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+OUTPUT_FILE = os.path.join(DATA_DIR, "banking_dataset.csv")
+
+# Colonnes du dataset généré
+COLUMNS = ["tag", "instruction", "category", "intent", "response"]
+
+# Mots de remplissage ajoutés par le bruit (début ou fin de phrase), comme dans le trafic réel
+FILLER_WORDS = ["bonjour", "svp", "s'il vous plaît", "euh", "merci", "allo", "urgent", "bonsoir"]
 
 """
     Définition du dictionnaire des intentions du chatbot
@@ -314,38 +323,182 @@ intents = {
 
 """
     Génération du dataset synthétique
-    Pour chaque intention, on crée un certain nombre d'exemples (total_per_intent).
+    Pour chaque intention, on crée un certain nombre d'exemples (rows_per_intent).
     Chaque ligne générée contient :
         - un tag unique
-        - une instruction (phrase utilisateur tirée au hasard)
+        - une instruction (phrase utilisateur tirée au hasard, éventuellement bruitée)
         - une catégorie
         - l'intention
         - une réponse (tirée au hasard)
+    Les lignes sont produites par blocs (DataFrame de chunk_size lignes au plus) :
+    la mémoire utilisée ne dépend pas de la taille totale du dataset.
 """
 
-data = []
-tag_count = 1
-total_per_intent = 500
-
-for intent, info in intents.items():
-    for _ in range(total_per_intent):
-        tag = f"TAG_{tag_count:06d}"
-        instruction = random.choice(info["instructions"])
-        response = random.choice(info["responses"])
-        category = info["category"]
-        data.append([tag, instruction, category, intent, response])
-        tag_count += 1
-
-# Conversion du dataset en DataFrame Pandas
-df = pd.DataFrame(data, columns=["tag", "instruction", "category", "intent", "response"])
-
-# Sauvegarde du dataset au format CSV dans le dossier "data"
-# Le fichier sera créé au chemin :
-# bankApp/data/banking_dataset.csv
-OUTPUT_FILE = os.path.join(DATA_DIR, "banking_dataset.csv")
-df.to_csv(OUTPUT_FILE, index=False)
+def expand_intents(base_intents=intents, n_synthetic_intents=0):
+    """
+    Ajoute des intentions synthétiques (copies numérotées des intentions existantes,
+    instructions et réponses marquées par leur numéro) pour les tests de montée en charge.
+    Returns:
+        list: [(nom, info)] des intentions
+    """
+    items = list(base_intents.items())
+    for k in range(n_synthetic_intents):
+        name, info = items[k % len(base_intents)]
+        items.append((f"{name}_synth_{k:05d}", {
+            "category": info["category"],
+            "instructions": [f"{instruction} (dossier {k})" for instruction in info["instructions"]],
+            "responses": [f"{response} (dossier {k})" for response in info["responses"]],
+        }))
+    return items
+
+def _flatten(items, field):
+    # Table plate des chaînes d'un champ, avec début et nombre d'entrées par intention
+    values = np.array([value for _, info in items for value in info[field]], dtype=object)
+    counts = np.array([len(info[field]) for _, info in items], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return values, offsets, counts
+
+def _typo(text, rng):
+    # Faute de frappe : inversion de deux lettres voisines, lettre supprimée ou doublée
+    if len(text) < 3:
+        return text
+    i = int(rng.integers(0, len(text) - 1))
+    kind = rng.integers(0, 3)
+    if kind == 0:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if kind == 1:
+        return text[:i] + text[i + 1:]
+    return text[:i] + text[i] + text[i:]
+
+def add_noise(instructions, rng, noise):
+    """
+    Bruit de trafic réel appliqué à une fraction `noise` des lignes pour chaque type :
+    fautes de frappe, casse (majuscules / minuscules / sans capitale) et mots de remplissage.
+    Args:
+        instructions (pd.Series): Instructions
+        rng (np.random.Generator): Générateur seedé
+        noise (float): Probabilité de chaque altération (0 désactive)
+    Returns:
+        pd.Series
+    """
+    if noise <= 0:
+        return instructions
+    instructions = instructions.copy()
+    n = len(instructions)
+
+    # Fautes de frappe (seules les lignes tirées passent par Python)
+    rows = np.flatnonzero(rng.random(n) < noise)
+    instructions.iloc[rows] = [_typo(text, rng) for text in instructions.iloc[rows]]
+
+    # Casse
+    for transform in ("lower", "upper"):
+        rows = np.flatnonzero(rng.random(n) < noise / 2)
+        instructions.iloc[rows] = getattr(instructions.iloc[rows].str, transform)()
+
+    # Mots de remplissage en début ou en fin de phrase
+    fillers = np.array(FILLER_WORDS, dtype=object)
+    rows = np.flatnonzero(rng.random(n) < noise)
+    words = fillers[rng.integers(0, len(fillers), len(rows))]
+    at_start = rng.random(len(rows)) < 0.5
+    selected = instructions.iloc[rows].to_numpy()
+    instructions.iloc[rows] = np.where(at_start, words + " " + selected, selected + " " + words)
+    return instructions
+
+def generate_chunks(rows_per_intent=500, n_synthetic_intents=0, noise=0.0, seed=42, chunk_size=100_000):
+    """
+    Génère le dataset par blocs, avec tirages vectorisés (indexation NumPy) et un générateur seedé.
+    Args:
+        rows_per_intent (int): Nombre de lignes par intention
+        n_synthetic_intents (int): Nombre d'intentions synthétiques ajoutées aux intentions de base
+        noise (float): Taux de bruit (fautes de frappe, casse, mots de remplissage)
+        seed (int): Graine du générateur (même graine et mêmes paramètres = même dataset)
+        chunk_size (int): Nombre maximal de lignes par bloc
+    Yields:
+        pd.DataFrame: Bloc de lignes (colonnes COLUMNS)
+    """
+    rng = np.random.default_rng(seed)
+    items = expand_intents(intents, n_synthetic_intents)
+    names = np.array([name for name, _ in items], dtype=object)
+    categories = np.array([info["category"] for _, info in items], dtype=object)
+    instructions, instruction_offsets, instruction_counts = _flatten(items, "instructions")
+    responses, response_offsets, response_counts = _flatten(items, "responses")
+
+    total = len(items) * rows_per_intent
+    for start in range(0, total, chunk_size):
+        row_numbers = np.arange(start, min(start + chunk_size, total))
+        intent_ids = row_numbers // rows_per_intent
+
+        # Tirage uniforme d'une instruction et d'une réponse dans la tranche de chaque intention
+        instruction_rows = instruction_offsets[intent_ids] + (
+            rng.random(len(row_numbers)) * instruction_counts[intent_ids]).astype(np.int64)
+        response_rows = response_offsets[intent_ids] + (
+            rng.random(len(row_numbers)) * response_counts[intent_ids]).astype(np.int64)
+
+        chunk = pd.DataFrame({
+            "tag": "TAG_" + pd.Series(row_numbers + 1).astype(str).str.zfill(6),
+            "instruction": instructions[instruction_rows],
+            "category": categories[intent_ids],
+            "intent": names[intent_ids],
+            "response": responses[response_rows],
+        }, columns=COLUMNS)
+        chunk["instruction"] = add_noise(chunk["instruction"], rng, noise)
+        yield chunk
+
+def write_dataset(output_file=OUTPUT_FILE, **params):
+    """
+    Écrit le dataset bloc par bloc en CSV ou en Parquet (selon l'extension, Parquet nécessite pyarrow).
+    Args:
+        output_file (str): Fichier de sortie (.csv ou .parquet)
+        **params: Paramètres de generate_chunks
+    Returns:
+        dict: {"rows", "intents", "categories"}
+    """
+    parquet = output_file.endswith(".parquet")
+    writer = None
+    rows, intent_names, category_names = 0, set(), set()
+
+    # Le fichier n'apparaît qu'une fois complet
+    with atomic_path(output_file) as tmp_file:
+        for i, chunk in enumerate(generate_chunks(**params)):
+            if parquet:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_file, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp_file, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+            rows += len(chunk)
+            intent_names.update(chunk["intent"].unique())
+            category_names.update(chunk["category"].unique())
+
+        if writer is not None:
+            writer.close()
+    return {"rows": rows, "intents": len(intent_names), "categories": sorted(category_names)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Génération du dataset synthétique")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Fichier de sortie (.csv ou .parquet)")
+    parser.add_argument("--rows-per-intent", type=int, default=500)
+    parser.add_argument("--synthetic-intents", type=int, default=0, help="Intentions synthétiques ajoutées")
+    parser.add_argument("--noise", type=float, default=0.0, help="Taux de bruit (fautes, casse, remplissage)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
 
-print(f"Dataset généré avec succès ! {len(df)} lignes créées.")
-print(f"Catégories disponibles : {df['category'].unique()}")
-print(f"Intentions disponibles : {df['intent'].nunique()}")
+    # Sauvegarde du dataset dans le dossier "data" (bankApp/data/banking_dataset.csv par défaut)
+    stats = write_dataset(
+        args.output,
+        rows_per_intent=args.rows_per_intent,
+        n_synthetic_intents=args.synthetic_intents,
+        noise=args.noise,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+    )
+    print(f"Dataset généré avec succès ! {stats['rows']} lignes créées.")
+    print(f"Catégories disponibles : {stats['categories']}")
+    print(f"Intentions disponibles : {stats['intents']}")
 
+if __name__ == "__main__":
+    main()
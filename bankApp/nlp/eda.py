@@ -1,311 +1,377 @@
 import os
-import pandas as pd
-import numpy as np
+import argparse
 import matplotlib.pyplot as plt
 import seaborn as sns
-from wordcloud import WordCloud
-from collections import Counter
+from wordcloud import WordCloud, STOPWORDS
+from bankApp.nlp.eda_aggregates import EdaAggregates, TEXT_COLUMNS, CHUNK_SIZE, aggregate, histogram_stats
+from bankApp.nlp.report_figures import Figure, FIGURE_DPI, render_figures, print_render_report
 
 # Configuration des chemins
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 INPUT_FILE = os.path.join(DATA_DIR, "banking_dataset_clean.csv")
 OUTPUT_DIR = os.path.join(DATA_DIR, "eda_fig")
 
-# Création du dossier de sortie
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Figures de l'EDA sur les conversations réelles (séparées de celles du dataset d'entraînement)
+CONVERSATIONS_OUTPUT_DIR = os.path.join(DATA_DIR, "eda_fig_conversations")
+
+# Agrégats de la dernière analyse, sauvegardés à côté des figures
+AGGREGATES_FILE = "eda_aggregates.json"
+
+# Intentions détaillées dans intent_word_analysis.png (les plus fréquentes si absentes des données)
+IMPORTANT_INTENTS = ['activer_carte', 'consulter_solde', 'demander_pret', 'probleme_connexion']
 
 def setup_plot_style():
     # Configuration du style des visualisations
     plt.style.use('default')
     sns.set_palette("husl")
 
-def load_and_prepare_data():
-    # Chargement et préparation des données
-    df = pd.read_csv(INPUT_FILE, encoding='utf-8')
-    
-    # Calcul des longueurs de texte
-    df['instruction_length'] = df['instruction_clean'].str.len()
-    df['instruction_word_count'] = df['instruction_clean'].str.split().str.len()
-    df['response_word_count'] = df['response'].str.split().str.len()
-    
-    return df
-
-def basic_statistics(df):
+def load_aggregates(files=None, source="dataset", jobs=None, chunk_size=CHUNK_SIZE):
+    """
+    Agrège les données par blocs, en parallèle, sans jamais charger le dataset complet.
+    Args:
+        files (list): Fichiers CSV / Parquet exportés (le dataset nettoyé par défaut)
+        source (str): "dataset" (fichiers) ou "conversations" (table de la base)
+        jobs (int): Nombre de processus
+    Returns:
+        EdaAggregates
+    """
+    from bankApp.nlp.eda_aggregates import dataset_chunks, conversation_chunks, published_response_intents
+
+    if source == "conversations":
+        from bankApp import db_manager
+        chunks = conversation_chunks(db_manager, published_response_intents(), chunk_size=chunk_size)
+    else:
+        chunks = (chunk for path in files or [INPUT_FILE] for chunk in dataset_chunks(path, chunk_size))
+    return aggregate(chunks, jobs=jobs)
+
+def _histogram(ax, counter, bins, mean=None):
+    # Histogramme (et KDE) pondéré par les effectifs : identique à celui des valeurs brutes
+    sns.histplot(x=list(counter.keys()), weights=list(counter.values()), bins=bins, ax=ax, kde=True)
+    if mean is not None:
+        ax.axvline(mean, color='red', linestyle='--', label=f'Moyenne: {mean:.1f}')
+        ax.legend()
+
+def _boxplot(ax, counters):
+    # Boîtes à moustaches calculées depuis les histogrammes par catégorie
+    stats = []
+    for label, counter in counters.items():
+        box = histogram_stats(counter)
+        box["label"] = label
+        stats.append(box)
+    ax.bxp(stats, showfliers=True)
+
+def basic_statistics(agg):
     # Statistiques de base du dataset
     print("=" * 50)
     print("STATISTIQUES DE BASE DU DATASET")
     print("=" * 50)
-    
+
     stats = {
-        "Nombre total d'échantillons": len(df),
-        "Nombre de catégories": df['category'].nunique(),
-        "Nombre d'intentions": df['intent'].nunique(),
-        "Colonnes disponibles": list(df.columns),
-        "Valeurs manquantes": df.isnull().sum().to_dict(),
-        "Doublons": df.duplicated().sum()
+        "Nombre total d'échantillons": agg.rows,
+        "Nombre de catégories": len(agg.categories),
+        "Nombre d'intentions": len(agg.intents),
+        "Colonnes disponibles": list(TEXT_COLUMNS),
+        "Valeurs manquantes": dict(agg.missing),
+        # Ancienne mesure (DataFrame.duplicated() : lignes identiques sur toutes les colonnes de la source)
+        # et doublons après normalisation (même instruction nettoyée, réponse, catégorie et intention)
+        "Doublons (lignes source identiques)": agg.exact_duplicates,
+        "Doublons (instruction nettoyée, réponse, catégorie, intention)": agg.duplicates,
     }
-    
+
     for key, value in stats.items():
         print(f" {key}: {value}")
-        
+
     return stats
 
-def category_distribution(df):
+def category_distribution(agg):
     # Distribution des catégories et intentions
     print("\n" + "=" * 50)
     print("DISTRIBUTION DES CATÉGORIES")
     print("=" * 50)
-    
+
     # Distribution par catégorie
-    category_counts = df['category'].value_counts()
+    category_counts = agg.categories.most_common()
     print("Distribution par catégorie:")
-    for category, count in category_counts.items():
-        percentage = (count / len(df)) * 100
+    for category, count in category_counts:
+        percentage = (count / agg.rows) * 100
         print(f"   {category}: {count} échantillons ({percentage:.1f}%)")
-    
+
     # Distribution par intention
-    intent_counts = df['intent'].value_counts()
+    intent_counts = agg.intents.most_common()
     print(f"\nTop 5 des intentions:")
-    for intent, count in intent_counts.head().items():
-        percentage = (count / len(df)) * 100
+    for intent, count in intent_counts[:5]:
+        percentage = (count / agg.rows) * 100
         print(f"   {intent}: {count} échantillons ({percentage:.1f}%)")
-        
+
     return category_counts, intent_counts
 
-def visualize_category_distribution(df):
+def plot_category_distribution(agg, path, dpi=FIGURE_DPI):
     # Visualisations de la distribution
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-    
+
     # Pie chart des catégories
-    category_counts = df['category'].value_counts()
-    axes[0, 0].pie(category_counts.values, labels=category_counts.index, autopct='%1.1f%%', 
-                  startangle=90)
+    categories, counts = zip(*agg.categories.most_common())
+    axes[0, 0].pie(counts, labels=categories, autopct='%1.1f%%', startangle=90)
     axes[0, 0].set_title('Distribution des Catégories', fontsize=14, fontweight='bold')
-    
+
     # Bar chart des intentions (top 10)
-    intent_counts = df['intent'].value_counts().head(10)
-    sns.barplot(x=intent_counts.values, y=intent_counts.index, ax=axes[0, 1])
+    intents, counts = zip(*agg.intents.most_common(10))
+    sns.barplot(x=list(counts), y=list(intents), ax=axes[0, 1])
     axes[0, 1].set_title('Top 10 des Intentions', fontsize=14, fontweight='bold')
     axes[0, 1].set_xlabel('Nombre d\'échantillons')
-    
+
     # Histogramme de la longueur des instructions
-    sns.histplot(data=df, x='instruction_length', bins=30, ax=axes[1, 0], kde=True)
+    _histogram(axes[1, 0], agg.instruction_length, bins=30)
     axes[1, 0].set_title('Distribution de la Longueur des Instructions', fontsize=14, fontweight='bold')
     axes[1, 0].set_xlabel('Longueur des instructions (caractères)')
-    
+
     # Boxplot par catégorie
-    sns.boxplot(data=df, x='category', y='instruction_length', ax=axes[1, 1])
+    _boxplot(axes[1, 1], agg.length_by_category)
     axes[1, 1].set_title('Longueur des Instructions par Catégorie', fontsize=14, fontweight='bold')
     axes[1, 1].tick_params(axis='x', rotation=45)
     axes[1, 1].set_xlabel('Catégorie')
     axes[1, 1].set_ylabel('Longueur (caractères)')
-    
+
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'distribution_analysis.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    print("Graphiques de distribution sauvegardés")
 
-def text_length_analysis(df):
+def text_length_analysis(agg):
     # Analyse de la longueur du texte
     print("\n" + "=" * 50)
     print("ANALYSE DE LA LONGUEUR DU TEXTE")
     print("=" * 50)
-    
+
+    instruction_stats = histogram_stats(agg.instruction_words)
+    response_stats = histogram_stats(agg.response_words)
     length_stats = {
-        "Instructions - Mots moyens": df['instruction_word_count'].mean(),
-        "Instructions - Mots max": df['instruction_word_count'].max(),
-        "Instructions - Mots min": df['instruction_word_count'].min(),
-        "Réponses - Mots moyens": df['response_word_count'].mean(),
-        "Réponses - Mots max": df['response_word_count'].max(),
+        "Instructions - Mots moyens": instruction_stats["mean"],
+        "Instructions - Mots max": instruction_stats["max"],
+        "Instructions - Mots min": instruction_stats["min"],
+        "Réponses - Mots moyens": response_stats["mean"],
+        "Réponses - Mots max": response_stats["max"],
     }
-    
+
     for key, value in length_stats.items():
         print(f"• {key}: {value:.1f}")
-        
-    # Visualisation détaillée
+
+    return length_stats
+
+def plot_text_length(agg, path, dpi=FIGURE_DPI):
+    # Visualisation détaillée de la longueur du texte
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-    
+
     # Distribution des mots dans les instructions
-    sns.histplot(data=df, x='instruction_word_count', bins=20, ax=axes[0, 0], kde=True)
+    _histogram(axes[0, 0], agg.instruction_words, bins=20, mean=histogram_stats(agg.instruction_words)["mean"])
     axes[0, 0].set_title('Distribution du Nombre de Mots - Instructions')
     axes[0, 0].set_xlabel('Nombre de mots')
-    axes[0, 0].axvline(df['instruction_word_count'].mean(), color='red', linestyle='--', 
-                      label=f'Moyenne: {df["instruction_word_count"].mean():.1f}')
-    axes[0, 0].legend()
-    
+
     # Distribution des mots dans les réponses
-    sns.histplot(data=df, x='response_word_count', bins=20, ax=axes[0, 1], kde=True)
+    _histogram(axes[0, 1], agg.response_words, bins=20, mean=histogram_stats(agg.response_words)["mean"])
     axes[0, 1].set_title('Distribution du Nombre de Mots - Réponses')
     axes[0, 1].set_xlabel('Nombre de mots')
-    axes[0, 1].axvline(df['response_word_count'].mean(), color='red', linestyle='--', 
-                      label=f'Moyenne: {df["response_word_count"].mean():.1f}')
-    axes[0, 1].legend()
-    
+
     # Mots par catégorie (instructions)
-    sns.boxplot(data=df, x='category', y='instruction_word_count', ax=axes[1, 0])
+    _boxplot(axes[1, 0], agg.words_by_category_count)
     axes[1, 0].set_title('Nombre de Mots par Catégorie - Instructions')
     axes[1, 0].tick_params(axis='x', rotation=45)
-    
-    # Scatter plot longueur instructions vs réponses
-    sns.scatterplot(data=df, x='instruction_word_count', y='response_word_count', alpha=0.6, ax=axes[1, 1])
+
+    # Longueur instructions vs réponses : un point par couple distinct, taille selon l'effectif
+    pairs, counts = zip(*agg.length_pairs.items())
+    x, y = zip(*pairs)
+    sns.scatterplot(x=list(x), y=list(y), size=list(counts), alpha=0.6, ax=axes[1, 1], legend=False)
     axes[1, 1].set_title('Relation: Longueur Instructions vs Réponses')
     axes[1, 1].set_xlabel('Mots dans instruction')
     axes[1, 1].set_ylabel('Mots dans réponse')
-    
+
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'text_length_analysis.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    return length_stats
 
-def word_frequency_analysis(df):
+def word_frequency_analysis(agg):
     # Analyse de la fréquence des mots
     print("\n" + "=" * 50)
     print("ANALYSE DE FRÉQUENCE DES MOTS")
     print("=" * 50)
-    
-    # Tous les mots combinés
-    all_text = ' '.join(df['instruction_clean'].dropna())
-    words = all_text.split()
-    word_freq = Counter(words)
-    
+
+    word_freq = agg.words
+
     print("Top 20 des mots les plus fréquents:")
     for word, freq in word_freq.most_common(20):
         print(f"   '{word}': {freq} occurrences")
-    
-    # Word Cloud
+
+    return word_freq
+
+def plot_wordcloud(words, path, dpi=FIGURE_DPI):
+    # Word Cloud construit depuis les fréquences (aucun texte concaténé)
     plt.figure(figsize=(12, 6))
-    wordcloud = WordCloud(width=800, height=400, background_color='white', max_words=100).generate(all_text)
+    frequencies = {word: freq for word, freq in words.items() if word not in STOPWORDS}
+    # Image du nuage à l'échelle de la résolution demandée (aperçu : nuage plus petit, plus rapide)
+    scale = min(dpi / FIGURE_DPI, 1.0)
+    wordcloud = WordCloud(width=int(800 * scale), height=int(400 * scale), background_color='white',
+                          max_words=100).generate_from_frequencies(frequencies)
     plt.imshow(wordcloud, interpolation='bilinear')
     plt.axis('off')
     plt.title('Word Cloud des Instructions', size=16, fontweight='bold')
-    plt.savefig(os.path.join(OUTPUT_DIR, 'wordcloud.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
+
+def plot_top_words(top_words, path, dpi=FIGURE_DPI):
     # Top 30 mots les plus fréquents
-    top_words = word_freq.most_common(30)
     words, frequencies = zip(*top_words)
-    
+
     plt.figure(figsize=(12, 8))
     sns.barplot(x=list(frequencies), y=list(words))
     plt.title('Top 30 des Mots les Plus Fréquents', fontsize=16, fontweight='bold')
     plt.xlabel('Fréquence')
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'top_words_frequency.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    return word_freq
 
-def category_specific_analysis(df):
+def category_specific_analysis(agg):
     # Analyse spécifique par catégorie
     print("\n" + "=" * 50)
     print("ANALYSE SPÉCIFIQUE PAR CATÉGORIE")
     print("=" * 50)
-    
-    categories = df['category'].unique()
+
+    for category, word_freq in agg.words_by_category.items():
+        print(f"\nCatégorie '{category}':")
+        for word, freq in word_freq.most_common(5):
+            print(f"   '{word}': {freq}")
+
+def plot_category_words(top_words_by_category, path, dpi=FIGURE_DPI):
+    # Top 8 mots de chaque catégorie
+    categories = list(top_words_by_category)
     n_categories = len(categories)
-    
+
     # Créer une grille de subplots
     n_rows = (n_categories + 2) // 3
     fig, axes = plt.subplots(n_rows, 3, figsize=(18, 5 * n_rows))
     if n_rows == 1:
         axes = axes.reshape(1, -1)
-    
+
     for i, category in enumerate(categories):
         row = i // 3
         col = i % 3
-        
-        category_text = ' '.join(df[df['category'] == category]['instruction_clean'])
-        words = category_text.split()
-        word_freq = Counter(words)
-        
+
         # Top 8 mots pour cette catégorie
-        top_words = word_freq.most_common(8)
+        top_words = top_words_by_category[category]
         if top_words:
             words, freqs = zip(*top_words)
-            
+
             sns.barplot(x=list(freqs), y=list(words), ax=axes[row, col])
             axes[row, col].set_title(f'Top Mots - {category}', fontweight='bold')
             axes[row, col].set_xlabel('Fréquence')
-        
-        print(f"\nCatégorie '{category}':")
-        for word, freq in top_words[:5]:
-            print(f"   '{word}': {freq}")
-    
+
     # Cacher les axes non utilisés
     for i in range(len(categories), n_rows * 3):
         row = i // 3
         col = i % 3
         axes[row, col].set_visible(False)
-        
+
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'category_word_analysis.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-def intent_specific_analysis(df):
+def important_intents(agg):
+    # Intentions importantes et leurs 6 mots les plus fréquents (les intentions les plus fréquentes si absentes)
+    intents = [i for i in IMPORTANT_INTENTS if i in agg.words_by_intent]
+    if not intents:
+        intents = [intent for intent, _ in agg.intents.most_common(4)]
+    return [(intent, agg.words_by_intent[intent].most_common(6) if intent in agg.words_by_intent else [])
+            for intent in intents[:4]]
+
+def plot_intent_words(top_words_by_intent, path, dpi=FIGURE_DPI):
     # Analyse par intention spécifique
-    print("\n" + "=" * 50)
-    print("ANALYSE PAR INTENTION")
-    print("=" * 50)
-    
-    # Sélectionner quelques intentions importantes
-    important_intents = ['activer_carte', 'consulter_solde', 'demander_pret', 'probleme_connexion']
-    
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
     axes = axes.flatten()
-    
-    for i, intent in enumerate(important_intents):
-        if i < len(axes):
-            intent_data = df[df['intent'] == intent]
-            intent_text = ' '.join(intent_data['instruction_clean'])
-            words = intent_text.split()
-            word_freq = Counter(words)
-            
-            top_words = word_freq.most_common(6)
-            if top_words:
-                words, freqs = zip(*top_words)
-                sns.barplot(x=list(freqs), y=list(words), ax=axes[i])
-                axes[i].set_title(f'Top Mots - {intent}', fontweight='bold')
-                axes[i].set_xlabel('Fréquence')
-    
+
+    for i, (intent, top_words) in enumerate(top_words_by_intent):
+        if top_words:
+            words, freqs = zip(*top_words)
+            sns.barplot(x=list(freqs), y=list(words), ax=axes[i])
+            axes[i].set_title(f'Top Mots - {intent}', fontweight='bold')
+            axes[i].set_xlabel('Fréquence')
+
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'intent_word_analysis.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-def generate_report():
-    # Génère un rapport complet d'EDA
+def report_figures(agg):
+    """
+    Figures du rapport. Chacune ne reçoit que la partie des agrégats qu'elle trace, qui sert aussi
+    d'empreinte : une figure dont les données n'ont pas changé n'est pas redessinée.
+    Returns:
+        list: Figures à rendre (report_figures.render_figures)
+    """
+    data = agg.to_dict()
+
+    def subset(*names):
+        # Agrégat partiel (seuls les compteurs utilisés par la figure sont envoyés au processus de rendu)
+        partial = EdaAggregates()
+        for name in names:
+            setattr(partial, name, getattr(agg, name))
+        return partial, {name: data[name] for name in names}
+
+    top_words_by_category = {category: words.most_common(8) for category, words in agg.words_by_category.items()}
+    top_words_by_intent = important_intents(agg)
+    top_words = agg.words.most_common(30)
+    return [
+        Figure('distribution_analysis.png', plot_category_distribution,
+               *subset("categories", "intents", "instruction_length", "length_by_category")),
+        Figure('text_length_analysis.png', plot_text_length,
+               *subset("instruction_words", "response_words", "words_by_category_count", "length_pairs")),
+        Figure('wordcloud.png', plot_wordcloud, agg.words, data["words"]),
+        Figure('top_words_frequency.png', plot_top_words, top_words),
+        Figure('category_word_analysis.png', plot_category_words, top_words_by_category),
+        Figure('intent_word_analysis.png', plot_intent_words, top_words_by_intent),
+    ]
+
+def generate_report(files=None, source="dataset", jobs=None, chunk_size=CHUNK_SIZE, output_dir=None,
+                    preview=False, force=False):
+    # Génère un rapport complet d'EDA à partir des agrégats (mémoire constante, quelle que soit la taille des données)
+    # Figures rendues en parallèle ; seules celles dont les données ont changé sont redessinées
 
     # Configuration
-    setup_plot_style()
-    df = load_and_prepare_data()
-    
+    output_dir = output_dir or (CONVERSATIONS_OUTPUT_DIR if source == "conversations" else OUTPUT_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    agg = load_aggregates(files, source=source, jobs=jobs, chunk_size=chunk_size)
+    agg.save(os.path.join(output_dir, AGGREGATES_FILE))
+
     # Exécution de toutes les analyses
-    basic_stats = basic_statistics(df)
-    category_dist, intent_dist = category_distribution(df)
-    length_stats = text_length_analysis(df)
-    word_freq = word_frequency_analysis(df)
-    
+    basic_stats = basic_statistics(agg)
+    category_dist, intent_dist = category_distribution(agg)
+    length_stats = text_length_analysis(agg)
+    word_freq = word_frequency_analysis(agg)
+    category_specific_analysis(agg)
+
     # Génération des visualisations
-    visualize_category_distribution(df)
-    category_specific_analysis(df)
-    intent_specific_analysis(df)
-    
+    results = render_figures(report_figures(agg), output_dir, preview=preview, jobs=jobs, setup=setup_plot_style,
+                             force=force)
+
     print("\n" + "=" * 70)
-    print("ANALYSE TERMINÉE - RAPPORTS SAUVEGARDÉS DANS 'data/eda_fig/'")
+    print(f"ANALYSE TERMINÉE - RAPPORTS SAUVEGARDÉS DANS '{output_dir}'")
     print("=" * 70)
     print("Fichiers générés:")
-    print("   distribution_analysis.png")
-    print("   text_length_analysis.png")
-    print("   wordcloud.png") 
-    print("   top_words_frequency.png")
-    print("   category_word_analysis.png")
-    print("   intent_word_analysis.png")
+    print_render_report(results)
+    print(f"   {AGGREGATES_FILE}")
     print("\nPoints clés à retenir:")
     print(f"   Dataset équilibré entre {len(category_dist)} catégories")
-    print(f"   {basic_stats['Nombre total d\'échantillons']} échantillons au total")
+    n_samples = basic_stats["Nombre total d'échantillons"]
+    print(f"   {n_samples} échantillons au total")
     print(f"   Longueur moyenne des instructions: {length_stats['Instructions - Mots moyens']:.1f} mots")
 
 # Point d'entrée principal
 if __name__ == "__main__":
-    generate_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyse exploratoire du dataset ou des conversations réelles")
+    parser.add_argument("--source", choices=["dataset", "conversations"], default="dataset")
+    parser.add_argument("--files", nargs="+", help="Fichiers CSV / Parquet exportés (défaut: dataset nettoyé)")
+    parser.add_argument("--jobs", type=int, help="Nombre de processus (défaut: nombre de cœurs)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--output-dir", help="Dossier des figures")
+    parser.add_argument("--preview", action="store_true", help="Aperçu rapide en basse résolution")
+    parser.add_argument("--force", action="store_true", help="Redessiner toutes les figures")
+    args = parser.parse_args()
+
+    generate_report(args.files, source=args.source, jobs=args.jobs, chunk_size=args.chunk_size,
+                    output_dir=args.output_dir, preview=args.preview, force=args.force)
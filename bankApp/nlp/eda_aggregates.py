@@ -0,0 +1,358 @@
+#bankApp/nlp/eda_aggregates.py
+# Agrégats de l'EDA calculés par blocs, hors mémoire : fréquences de mots, de catégories et d'intentions,
+# histogrammes de longueurs. Chaque bloc produit des compteurs partiels fusionnables (merge) : les blocs
+# sont traités en parallèle dans un pool de processus et la mémoire ne dépend que du vocabulaire
+# et du nombre de longueurs distinctes, pas du nombre de messages (doublons : partitions de hash sur disque).
+# Sources : dataset CSV / Parquet (fichiers exportés) ou table conversations de la base.
+import os
+import json
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+import numpy as np
+from bankApp.nlp.atomic_io import atomic_write
+
+# Lignes par bloc lu et envoyé à un processus
+CHUNK_SIZE = 100_000
+
+# Catégorie / intention des messages sans réponse (même libellé que l'application)
+UNKNOWN_LABEL = "Inconnue"
+
+# Colonnes du format commun des blocs
+TEXT_COLUMNS = ("instruction_clean", "response", "category", "intent")
+
+# Colonne optionnelle des blocs : hash de la ligne source complète (toutes ses colonnes, avant normalisation)
+SOURCE_HASH_COLUMN = "source_hash"
+
+# Comptage des lignes distinctes : hash gardés en mémoire avant d'être répartis sur disque (8 octets chacun),
+# et nombre de partitions sur disque (bits de poids fort du hash)
+SPILL_HASHES = 1_000_000
+PARTITION_BITS = 8
+
+def row_hashes(df):
+    # Hash 64 bits de chaque ligne (valeurs manquantes comprises, comme DataFrame.duplicated)
+    import pandas as pd
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+class DistinctCounter:
+    """
+    Nombre de hash distincts en mémoire bornée. Les hash restent en mémoire jusqu'à SPILL_HASHES,
+    puis sont ajoutés à 2**PARTITION_BITS fichiers selon leurs bits de poids fort ; un même hash tombe
+    toujours dans la même partition, le total est la somme des distincts de chaque partition.
+    Exact aux collisions de hash 64 bits près ; mémoire : SPILL_HASHES hash et une partition à la fois.
+    Deux compteurs se fusionnent (merge) comme les compteurs de EdaAggregates.
+    """
+
+    def __init__(self):
+        self.blocks = []        # hash en mémoire, par bloc
+        self.pending = 0
+        self.spill_dir = None   # partitions sur disque, créées au premier débordement
+
+    def _partition_path(self, partition):
+        return os.path.join(self.spill_dir, f"{partition:03d}.u64")
+
+    def _partition_paths(self):
+        if self.spill_dir is None:
+            return []
+        return [self._partition_path(p) for p in range(1 << PARTITION_BITS)
+                if os.path.exists(self._partition_path(p))]
+
+    def add(self, hashes):
+        if len(hashes):
+            self.blocks.append(np.asarray(hashes, dtype=np.uint64))
+            self.pending += len(hashes)
+        if self.pending >= SPILL_HASHES:
+            self._spill()
+
+    def _spill(self):
+        # Hash en mémoire (dédoublonnés) ajoutés à la fin de leur partition
+        if not self.blocks:
+            return
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="eda_hashes_")
+        hashes = np.unique(np.concatenate(self.blocks))
+        self.blocks, self.pending = [], 0
+        # Hash triés : chaque partition est une tranche contiguë
+        partitions = hashes >> np.uint64(64 - PARTITION_BITS)
+        bounds = np.searchsorted(partitions, np.arange((1 << PARTITION_BITS) + 1, dtype=np.uint64))
+        for partition in range(1 << PARTITION_BITS):
+            start, end = bounds[partition], bounds[partition + 1]
+            if start < end:
+                with open(self._partition_path(partition), "ab") as f:
+                    hashes[start:end].tofile(f)
+
+    def merge(self, other):
+        for block in other.blocks:
+            self.add(block)
+        for path in other._partition_paths():
+            self.add(np.fromfile(path, dtype=np.uint64))
+        other.close()
+        return self
+
+    def count(self):
+        if self.spill_dir is None:
+            return len(np.unique(np.concatenate(self.blocks))) if self.blocks else 0
+        self._spill()
+        return sum(len(np.unique(np.fromfile(path, dtype=np.uint64))) for path in self._partition_paths())
+
+    def close(self):
+        # Libère la mémoire et supprime les partitions
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self.blocks, self.pending, self.spill_dir = [], 0, None
+
+class EdaAggregates:
+    """
+    Compteurs de l'EDA. Toutes les statistiques et figures du rapport en sont dérivées ;
+    deux agrégats partiels se combinent par simple addition (merge).
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.missing = Counter()             # colonne -> valeurs manquantes
+        self.categories = Counter()
+        self.intents = Counter()
+        self.instruction_length = Counter()  # longueur (caractères) -> nombre de messages
+        self.instruction_words = Counter()   # nombre de mots -> nombre de messages
+        self.response_words = Counter()
+        self.length_pairs = Counter()        # (mots instruction, mots réponse) -> nombre de messages
+        self.length_by_category = {}         # catégorie -> Counter(longueur)
+        self.words_by_category_count = {}    # catégorie -> Counter(nombre de mots)
+        self.words = Counter()
+        self.words_by_category = {}          # catégorie -> Counter(mot)
+        self.words_by_intent = {}            # intention -> Counter(mot)
+        # Doublons, deux définitions :
+        #   duplicates        : mêmes colonnes TEXT_COLUMNS (instruction nettoyée, réponse, catégorie, intention)
+        #   exact_duplicates  : ligne source identique sur toutes ses colonnes (DataFrame.duplicated(),
+        #                       l'ancienne mesure de l'EDA), None si la source ne fournit pas SOURCE_HASH_COLUMN
+        self.text_hashes = DistinctCounter()
+        self.source_hashes = DistinctCounter()
+        self.source_rows = 0
+        self.duplicates = None
+        self.exact_duplicates = None
+
+    def update(self, chunk):
+        """
+        Ajoute un bloc (DataFrame aux colonnes TEXT_COLUMNS, et SOURCE_HASH_COLUMN si la source le fournit).
+        """
+        if SOURCE_HASH_COLUMN in chunk.columns:
+            self.source_hashes.add(chunk[SOURCE_HASH_COLUMN].to_numpy(dtype=np.uint64))
+            self.source_rows += len(chunk)
+            chunk = chunk.drop(columns=SOURCE_HASH_COLUMN)
+
+        self.rows += len(chunk)
+        self.missing.update({column: int(n) for column, n in chunk.isnull().sum().items() if n})
+        self.text_hashes.add(row_hashes(chunk[list(TEXT_COLUMNS)]))
+        chunk = chunk.fillna({"instruction_clean": "", "response": "", "category": UNKNOWN_LABEL,
+                              "intent": UNKNOWN_LABEL})
+
+        self.categories.update(chunk["category"].value_counts().to_dict())
+        self.intents.update(chunk["intent"].value_counts().to_dict())
+
+        tokens = chunk["instruction_clean"].str.split()
+        lengths = chunk["instruction_clean"].str.len()
+        word_counts = tokens.str.len()
+        response_counts = chunk["response"].str.split().str.len()
+        self.instruction_length.update(lengths.value_counts().to_dict())
+        self.instruction_words.update(word_counts.value_counts().to_dict())
+        self.response_words.update(response_counts.value_counts().to_dict())
+        self.length_pairs.update(Counter(zip(word_counts.tolist(), response_counts.tolist())))
+
+        # Un groupby par bloc au lieu d'un filtre complet du DataFrame par catégorie / intention
+        for category, rows in chunk.groupby("category").indices.items():
+            self.length_by_category.setdefault(category, Counter()).update(Counter(lengths.iloc[rows].tolist()))
+            self.words_by_category_count.setdefault(category, Counter()).update(Counter(word_counts.iloc[rows].tolist()))
+            words = Counter(chain.from_iterable(tokens.iloc[rows]))
+            self.words_by_category.setdefault(category, Counter()).update(words)
+            self.words.update(words)
+        for intent, rows in chunk.groupby("intent").indices.items():
+            self.words_by_intent.setdefault(intent, Counter()).update(chain.from_iterable(tokens.iloc[rows]))
+        return self
+
+    def merge(self, other):
+        # Fusion de deux agrégats partiels (associative : l'ordre des blocs n'importe pas)
+        self.rows += other.rows
+        for name in ("missing", "categories", "intents", "instruction_length", "instruction_words",
+                     "response_words", "length_pairs", "words"):
+            getattr(self, name).update(getattr(other, name))
+        for name in ("length_by_category", "words_by_category_count", "words_by_category", "words_by_intent"):
+            table = getattr(self, name)
+            for key, counter in getattr(other, name).items():
+                table.setdefault(key, Counter()).update(counter)
+        self.text_hashes.merge(other.text_hashes)
+        self.source_hashes.merge(other.source_hashes)
+        self.source_rows += other.source_rows
+        return self
+
+    def finalize(self):
+        # Nombre de doublons, puis libération des hash (et de leurs partitions sur disque)
+        self.duplicates = self.rows - self.text_hashes.count()
+        if self.source_rows:
+            self.exact_duplicates = self.source_rows - self.source_hashes.count()
+        self.text_hashes.close()
+        self.source_hashes.close()
+        return self
+
+    def to_dict(self):
+        # Forme JSON canonique (clés triées) : ses sections servent aussi d'empreinte aux figures du rapport
+        def counter(c):
+            return {str(k): v for k, v in sorted(c.items(), key=lambda item: str(item[0]))}
+
+        def table(t):
+            return {str(k): counter(c) for k, c in sorted(t.items(), key=lambda item: str(item[0]))}
+
+        return {
+            "rows": self.rows,
+            "duplicates": self.duplicates,
+            "exact_duplicates": self.exact_duplicates,
+            "missing": counter(self.missing),
+            "categories": counter(self.categories),
+            "intents": counter(self.intents),
+            "instruction_length": counter(self.instruction_length),
+            "instruction_words": counter(self.instruction_words),
+            "response_words": counter(self.response_words),
+            "length_pairs": {f"{a},{b}": n for (a, b), n in sorted(self.length_pairs.items())},
+            "length_by_category": table(self.length_by_category),
+            "words_by_category_count": table(self.words_by_category_count),
+            "words": counter(self.words),
+            "words_by_category": table(self.words_by_category),
+            "words_by_intent": table(self.words_by_intent),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        agg.rows, agg.duplicates = data["rows"], data["duplicates"]
+        agg.exact_duplicates = data.get("exact_duplicates")
+        for name in ("missing", "categories", "intents", "words"):
+            setattr(agg, name, Counter(data[name]))
+        for name in ("instruction_length", "instruction_words", "response_words"):
+            setattr(agg, name, Counter({int(k): v for k, v in data[name].items()}))
+        agg.length_pairs = Counter({tuple(map(int, k.split(","))): v for k, v in data["length_pairs"].items()})
+        for name in ("length_by_category", "words_by_category_count"):
+            setattr(agg, name, {key: Counter({int(k): v for k, v in c.items()}) for key, c in data[name].items()})
+        for name in ("words_by_category", "words_by_intent"):
+            setattr(agg, name, {key: Counter(c) for key, c in data[name].items()})
+        return agg
+
+    def save(self, path):
+        with atomic_write(path) as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+def histogram_stats(counter):
+    """
+    Statistiques d'une distribution donnée par son histogramme {valeur: effectif}.
+    Returns:
+        dict: mean, min, max, et les quartiles / moustaches au format de Axes.bxp
+    """
+    values = np.array(sorted(counter), dtype=np.float64)
+    counts = np.array([counter[v] for v in sorted(counter)], dtype=np.float64)
+    cumulative = np.cumsum(counts) / counts.sum()
+
+    def quantile(q):
+        return float(values[np.searchsorted(cumulative, q)])
+
+    q1, med, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        "mean": float((values * counts).sum() / counts.sum()),
+        "min": float(values[0]),
+        "max": float(values[-1]),
+        "q1": q1, "med": med, "q3": q3,
+        "whislo": float(inside.min()), "whishi": float(inside.max()),
+        # Valeurs distinctes hors moustaches (une par valeur, pas une par message)
+        "fliers": values[(values < inside.min()) | (values > inside.max())],
+    }
+
+def _aggregate_chunk(chunk):
+    # Agrégat partiel d'un bloc (exécuté dans un processus du pool)
+    return EdaAggregates().update(chunk)
+
+def dataset_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    Blocs d'un dataset exporté (CSV ou Parquet) aux colonnes TEXT_COLUMNS.
+    Un fichier brut sans instruction_clean est normalisé à la volée (normalize_series).
+    """
+    import pandas as pd
+    from bankApp.nlp.ponctuations import normalize_series
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        reader = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size))
+    else:
+        reader = pd.read_csv(path, encoding="utf-8", chunksize=chunk_size)
+
+    for chunk in reader:
+        # Toutes les colonnes du fichier, avant normalisation : même définition que DataFrame.duplicated()
+        source_hash = row_hashes(chunk)
+        if "instruction_clean" not in chunk.columns:
+            chunk["instruction_clean"] = normalize_series(chunk["instruction"])
+        chunk = chunk.reindex(columns=list(TEXT_COLUMNS))
+        chunk[SOURCE_HASH_COLUMN] = source_hash
+        yield chunk
+
+def conversation_chunks(db_manager, response_intents=None, chunk_size=CHUNK_SIZE):
+    """
+    Blocs de la table conversations (curseur côté serveur). L'intention n'est pas stockée :
+    elle est retrouvée par la réponse servie si response_intents est fourni.
+    """
+    import pandas as pd
+    from bankApp.nlp.ponctuations import normalize_series
+
+    response_intents = response_intents or {}
+    for rows in db_manager.iter_conversations(batch_size=chunk_size):
+        df = pd.DataFrame(rows, columns=["id", "user_message", "bot_response", "category", "confidence"])
+        yield pd.DataFrame({
+            "instruction_clean": normalize_series(df["user_message"]),
+            "response": df["bot_response"],
+            "category": df["category"],
+            "intent": df["bot_response"].map(response_intents).fillna(UNKNOWN_LABEL),
+            # Ligne identique hors id (toujours unique) : même message, même réponse, même catégorie et confiance
+            SOURCE_HASH_COLUMN: row_hashes(df.drop(columns="id")),
+        })
+
+def published_response_intents():
+    # Réponse -> intention de la version publiée (artefacts de service, sans charger l'encodeur)
+    from bankApp.nlp.artifacts import artifacts_exist, load_artifacts
+    from bankApp.nlp.model_registry import version_dir
+
+    model_dir = version_dir()
+    if not artifacts_exist(model_dir):
+        return {}
+    metadata = load_artifacts(model_dir)
+    pairs = set(zip(metadata.response_ids.tolist(), metadata.intent_ids.tolist()))
+    return {metadata.responses[r]: metadata.intents[i] for r, i in pairs}
+
+def aggregate(chunks, jobs=None):
+    """
+    Agrège des blocs en parallèle (fenêtre bornée de blocs en vol : mémoire constante).
+    Args:
+        chunks (iterable): Blocs aux colonnes TEXT_COLUMNS
+        jobs (int): Nombre de processus (nombre de cœurs par défaut, 1 : dans ce processus)
+    Returns:
+        EdaAggregates
+    """
+    jobs = jobs or os.cpu_count() or 1
+    total = EdaAggregates()
+    if jobs == 1:
+        for chunk in chunks:
+            total.update(chunk)
+        return total.finalize()
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = []
+        for chunk in chunks:
+            pending.append(executor.submit(_aggregate_chunk, chunk))
+            if len(pending) >= 2 * jobs:
+                total.merge(pending.pop(0).result())
+        for future in pending:
+            total.merge(future.result())
+    return total.finalize()
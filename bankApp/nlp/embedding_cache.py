@@ -0,0 +1,123 @@
+#bankApp/nlp/embedding_cache.py
+import os
+import re
+import uuid
+import hashlib
+import numpy as np
+from bankApp.nlp.atomic_io import atomic_save_array
+
+# Cache persistant des embeddings, adressé par le contenu : clé = (identifiant du modèle, hash du texte)
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+EMBEDDING_CACHE_DIR = os.path.join(DATA_DIR, "embedding_cache")
+
+# Taille des hash de texte (octets, blake2b)
+KEY_BYTES = 16
+
+# Au-delà de ce nombre de segments, ils sont fusionnés en un seul
+MAX_SEGMENTS = 8
+
+def text_keys(texts):
+    # Hash blake2b de chaque texte, sous forme de tableau d'octets de taille fixe
+    return np.array(
+        [hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest() for text in texts],
+        dtype=f"S{KEY_BYTES}",
+    )
+
+class EmbeddingCache:
+    """
+    Embeddings déjà calculés pour un modèle donné, stockés en segments .npy (clés + vecteurs float32).
+    Chaque ajout écrit un nouveau segment (aucune réécriture du cache existant) ;
+    la recherche est vectorisée (np.searchsorted sur les clés triées).
+    """
+
+    def __init__(self, model_id, directory=EMBEDDING_CACHE_DIR):
+        self.model_id = model_id
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9._-]+", "__", model_id))
+        self._load()
+
+    def _segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".keys.npy")] for name in os.listdir(self.directory) if name.endswith(".keys.npy"))
+
+    def _load(self):
+        keys, vectors = [], []
+        for segment in self._segments():
+            keys.append(np.load(os.path.join(self.directory, segment + ".keys.npy")))
+            vectors.append(np.load(os.path.join(self.directory, segment + ".vectors.npy")))
+
+        if keys:
+            keys = np.concatenate(keys)
+            vectors = np.concatenate(vectors)
+        else:
+            keys, vectors = np.empty(0, dtype=f"S{KEY_BYTES}"), None
+
+        # Clés triées pour la recherche ; un doublon éventuel entre segments est ignoré
+        keys, first = np.unique(keys, return_index=True)
+        self.keys = keys
+        self.vectors = vectors[first] if vectors is not None else None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, keys):
+        """
+        Returns:
+            tuple: (lignes du cache, masque des clés trouvées)
+        """
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+        rows = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return rows, self.keys[rows] == keys
+
+    def add(self, keys, vectors):
+        # Nouveau segment écrit de façon atomique (renommage), puis fusion si trop de segments
+        if not len(keys):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        segment = os.path.join(self.directory, uuid.uuid4().hex)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        # Les clés sont écrites en dernier : un segment n'est visible que complet
+        atomic_save_array(segment + ".vectors.npy", vectors)
+        atomic_save_array(segment + ".keys.npy", np.asarray(keys))
+
+        self._load()
+        if len(self._segments()) > MAX_SEGMENTS:
+            self.compact()
+
+    def compact(self):
+        # Remplace tous les segments par un seul
+        old_segments = self._segments()
+        keys, vectors = self.keys, self.vectors
+        segment = os.path.join(self.directory, uuid.uuid4().hex)
+        atomic_save_array(segment + ".vectors.npy", vectors)
+        atomic_save_array(segment + ".keys.npy", keys)
+        for old in old_segments:
+            os.remove(os.path.join(self.directory, old + ".keys.npy"))
+            os.remove(os.path.join(self.directory, old + ".vectors.npy"))
+        self._load()
+
+def encode_with_cache(model_embed, texts, cache, batch_size=64):
+    """
+    Encode des textes en ne passant dans le modèle que ceux absents du cache (une fois chacun, par lots).
+    Args:
+        model_embed: Encodeur (méthode encode)
+        texts (list): Textes à encoder
+        cache (EmbeddingCache): Cache du modèle
+        batch_size (int): Taille des lots de l'encodeur
+    Returns:
+        np.ndarray: Embeddings (n, dim) float32 alignés sur texts
+    """
+    keys = text_keys(texts)
+    unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    rows, found = cache.lookup(unique_keys)
+
+    missing = np.flatnonzero(~found)
+    print(f"Cache d'embeddings: {len(unique_keys) - len(missing)}/{len(unique_keys)} textes uniques trouvés, "
+          f"{len(missing)} à encoder")
+    if len(missing):
+        new_vectors = model_embed.encode([texts[i] for i in first[missing]], batch_size=batch_size)
+        cache.add(unique_keys[missing], new_vectors)
+        rows, found = cache.lookup(unique_keys)
+
+    return np.asarray(cache.vectors[rows], dtype=np.float32)[inverse.ravel()]
@@ -0,0 +1,300 @@
+#bankApp/nlp/encoders.py
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from bankApp.nlp.atomic_io import atomic_write
+
+# Encodeur de phrases au service :
+#   "torch" : SentenceTransformer (PyTorch, pleine précision)
+#   "onnx"  : export ONNX du même modèle, poids quantifiés en int8, exécuté par onnxruntime
+ENCODER_BACKENDS = ("torch", "onnx")
+ENCODER_BACKEND = os.environ.get("NLP_ENCODER_BACKEND", "torch")
+
+# Threads de calcul de la session ONNX (par processus) ; par défaut tous les cœurs
+ENCODER_THREADS = int(os.environ.get("NLP_ENCODER_THREADS", "0")) or os.cpu_count()
+
+# Encodeur PyTorch sauvegardé au format natif sentence-transformers (poids safetensors + tokenizer)
+ENCODER_SUBDIR = "encoder"
+ENCODER_MANIFEST_FILE = "encoder_manifest.json"
+LEGACY_ENCODER_FILE = "sentence_transformer.joblib"
+
+# Export ONNX à l'entraînement (NLP_ONNX_EXPORT=0 pour le désactiver) : un export demandé qui échoue,
+# dépendance manquante ou parité insuffisante comprise, fait échouer l'entraînement
+ONNX_EXPORT = os.environ.get("NLP_ONNX_EXPORT", "1") == "1"
+ONNX_SUBDIR = "onnx"
+ONNX_CONFIG_FILE = "encoder.json"
+PARITY_FILE = "parity.npy"
+
+# Similarité cosinus minimale entre embeddings ONNX et PyTorch pour accepter le backend ONNX
+PARITY_MIN_COSINE = 0.98
+
+# Phrases de référence de la vérification de parité (embeddings PyTorch sauvegardés à l'export)
+PARITY_SENTENCES = [
+    "comment activer ma carte bancaire",
+    "je veux bloquer ma carte elle est perdue",
+    "quel est le solde de mon compte courant",
+    "faire un virement vers un autre compte",
+    "je n arrive pas à me connecter à l application",
+    "demander un prêt immobilier",
+    "ouvrir un compte épargne",
+    "modifier mon plafond de paiement",
+]
+
+def _directory_files(directory, exclude=()):
+    # Fichiers d'un dossier (chemins relatifs, triés) pour un hash reproductible
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            rel_path = os.path.relpath(os.path.join(root, name), directory)
+            if rel_path not in exclude:
+                files.append(rel_path)
+    return sorted(files)
+
+def content_hash(directory, files):
+    # SHA-256 des chemins et contenus des fichiers : identifiant stable du modèle
+    digest = hashlib.sha256()
+    for rel_path in files:
+        digest.update(rel_path.encode("utf-8"))
+        with open(os.path.join(directory, rel_path), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def save_encoder(model_embed, model_dir):
+    """
+    Sauvegarde le SentenceTransformer dans son format natif (poids safetensors, tokenizer, config)
+    au lieu d'un pickle joblib, avec un manifeste contenant le hash du contenu.
+    Returns:
+        str: Hash du contenu de l'encodeur
+    """
+    directory = os.path.join(model_dir, ENCODER_SUBDIR)
+    model_embed.save(directory, safe_serialization=True)
+
+    files = _directory_files(directory, exclude=(ENCODER_MANIFEST_FILE,))
+    manifest = {
+        "hash": content_hash(directory, files),
+        "files": {rel_path: os.path.getsize(os.path.join(directory, rel_path)) for rel_path in files},
+    }
+    # Le manifeste est écrit en dernier : sa présence indique un encodeur complet
+    with atomic_write(os.path.join(directory, ENCODER_MANIFEST_FILE)) as f:
+        json.dump(manifest, f, indent=2)
+    return manifest["hash"]
+
+def encoder_exists(model_dir):
+    return os.path.exists(os.path.join(model_dir, ENCODER_SUBDIR, ENCODER_MANIFEST_FILE))
+
+def encoder_hash(model_dir):
+    # Hash du contenu de l'encodeur natif, None pour les anciennes versions (pickle joblib)
+    if not encoder_exists(model_dir):
+        return None
+    with open(os.path.join(model_dir, ENCODER_SUBDIR, ENCODER_MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)["hash"]
+
+def load_torch_encoder(model_dir, verify=False):
+    """
+    Charge l'encodeur PyTorch depuis le format natif (poids safetensors, sans réseau), puis préchauffe le tokenizer.
+    Les poids sont copiés dans la mémoire privée du processus (low_cpu_mem_usage évite seulement une
+    initialisation aléatoire préalable) : sous gunicorn, ils sont chargés une fois dans le maître (preload_app)
+    et partagés en copy-on-write par les workers, jamais réécrits à l'inférence.
+    Les anciennes versions sans dossier natif retombent sur le pickle joblib.
+    Args:
+        model_dir (str): Dossier de version
+        verify (bool): Recalcule le hash complet (sinon seules les tailles des fichiers sont vérifiées)
+    Raises:
+        ValueError: Si les fichiers ne correspondent pas au manifeste
+    """
+    if not encoder_exists(model_dir):
+        import joblib
+        return joblib.load(os.path.join(model_dir, LEGACY_ENCODER_FILE))
+
+    directory = os.path.join(model_dir, ENCODER_SUBDIR)
+    with open(os.path.join(directory, ENCODER_MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for rel_path, size in manifest["files"].items():
+        path = os.path.join(directory, rel_path)
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            raise ValueError(f"Encodeur incomplet ou modifié: {rel_path}")
+    if verify and content_hash(directory, sorted(manifest["files"])) != manifest["hash"]:
+        raise ValueError(f"Hash de l'encodeur invalide: {directory}")
+
+    from sentence_transformers import SentenceTransformer
+    model_embed = SentenceTransformer(
+        directory,
+        device="cpu",
+        local_files_only=True,
+        # Poids chargés directement dans le modèle, sans second jeu de tenseurs initialisés au hasard
+        model_kwargs={"low_cpu_mem_usage": True},
+    )
+    # Le tokenizer (tables de vocabulaire Rust) est initialisé dès le chargement, pas à la première requête
+    model_embed.tokenize(PARITY_SENTENCES[:1])
+    print(f"Encodeur chargé (format natif, hash {manifest['hash'][:12]})")
+    return model_embed
+
+def export_onnx(model_embed, model_dir, quantize=True):
+    """
+    Exporte le transformer d'un SentenceTransformer au format ONNX (+ tokenizer),
+    applique une quantification dynamique int8 des poids et sauvegarde les embeddings
+    de référence PyTorch, puis vérifie la parité de l'encodeur exporté.
+    Returns:
+        str: Dossier de l'encodeur ONNX
+    Raises:
+        ImportError: Si onnx ou onnxruntime manquent
+        ValueError: Si la parité n'est pas atteinte
+    """
+    import torch
+
+    directory = os.path.join(model_dir, ONNX_SUBDIR)
+    os.makedirs(directory, exist_ok=True)
+
+    transformer = model_embed[0].auto_model.eval()
+    tokenizer = model_embed.tokenizer
+    tokenizer.save_pretrained(directory)
+
+    # Export du transformer seul : le pooling (moyenne masquée) est refait en NumPy
+    sample = tokenizer(PARITY_SENTENCES[:2], padding=True, return_tensors="pt")
+    fp32_path = os.path.join(directory, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=17,
+            # Exportateur TorchScript : l'exportateur dynamo (défaut de torch >= 2.9) demande onnxscript
+            dynamo=False,
+        )
+
+    model_file = "model.onnx"
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, os.path.join(directory, "model.int8.onnx"), weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+        model_file = "model.int8.onnx"
+
+    reference = model_embed.encode(PARITY_SENTENCES)
+    np.save(os.path.join(directory, PARITY_FILE), np.asarray(reference, dtype=np.float32))
+
+    # La configuration est écrite en dernier : sa présence indique un encodeur ONNX complet
+    with atomic_write(os.path.join(directory, ONNX_CONFIG_FILE)) as f:
+        json.dump({
+            "model_file": model_file,
+            "max_seq_length": int(model_embed.max_seq_length),
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": int(tokenizer.pad_token_id),
+            "pooling": "mean",
+        }, f, indent=2)
+
+    # Vérification immédiate : un export qui ne reproduit pas les embeddings PyTorch fait échouer l'entraînement
+    worst = check_parity(OnnxEncoder(directory), directory)
+    print(f"Encodeur ONNX exporté ({model_file}, parité cosinus min: {worst:.4f})")
+    return directory
+
+class OnnxEncoder:
+    """
+    Encodeur de phrases ONNX : tokenizer Rust (tokenizers) + session onnxruntime + pooling moyen.
+    Même interface que SentenceTransformer.encode pour le service ; n'importe pas torch.
+    La session est créée au premier encodage dans chaque processus : le pool de threads d'onnxruntime
+    ne survit pas au fork, un worker gunicorn n'utilise jamais la session créée dans le maître (preload).
+    """
+
+    def __init__(self, directory, threads=ENCODER_THREADS):
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(directory, ONNX_CONFIG_FILE), encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        self.directory = directory
+        self.threads = threads
+        # Sessions par pid : celle héritée du maître n'est ni utilisée ni détruite dans le worker
+        self._sessions = {}
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Session onnxruntime du processus courant, créée au premier appel
+        pid = os.getpid()
+        session = self._sessions.get(pid)
+        if session is None:
+            with self._session_lock:
+                session = self._sessions.get(pid)
+                if session is None:
+                    session = self._sessions[pid] = self._create_session()
+        return session
+
+    def _create_session(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(
+            os.path.join(self.directory, self.config["model_file"]),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Args:
+            sentences (list): Phrases à encoder
+        Returns:
+            np.ndarray: Embeddings (n, dim) en float32
+        """
+        outputs = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(list(sentences[start:start + batch_size]))
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            hidden = self.session.run(
+                ["last_hidden_state"], {"input_ids": input_ids, "attention_mask": attention_mask}
+            )[0]
+
+            # Pooling moyen sur les tokens réels (identique au module Pooling de sentence-transformers)
+            mask = attention_mask[:, :, None].astype(np.float32)
+            outputs.append((hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        if not outputs:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32)
+
+def check_parity(encoder, directory, min_cosine=PARITY_MIN_COSINE):
+    """
+    Compare les embeddings de l'encodeur aux embeddings PyTorch de référence.
+    Returns:
+        float: Similarité cosinus minimale observée
+    Raises:
+        ValueError: Si la parité n'est pas atteinte
+    """
+    reference = np.load(os.path.join(directory, PARITY_FILE))
+    embeddings = encoder.encode(PARITY_SENTENCES)
+    cosines = (embeddings * reference).sum(axis=1) / (
+        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1)
+    )
+    worst = float(cosines.min())
+    if worst < min_cosine:
+        raise ValueError(f"Parité ONNX insuffisante: cosinus minimal {worst:.4f} < {min_cosine}")
+    return worst
+
+def onnx_encoder_exists(model_dir):
+    return os.path.exists(os.path.join(model_dir, ONNX_SUBDIR, ONNX_CONFIG_FILE))
+
+def load_onnx_encoder(model_dir):
+    # Charge l'encodeur ONNX et vérifie sa parité avec les embeddings PyTorch de référence
+    directory = os.path.join(model_dir, ONNX_SUBDIR)
+    encoder = OnnxEncoder(directory)
+    worst = check_parity(encoder, directory)
+    print(f"Encodeur ONNX chargé (parité cosinus min: {worst:.4f}, {ENCODER_THREADS} threads)")
+    return encoder
@@ -0,0 +1,282 @@
+#bankApp/nlp/incremental_training.py
+# Mise à jour incrémentale de la version publiée à partir des conversations étiquetées après coup
+# (en priorité celles servies sous le seuil de confiance), sans relancer le pipeline complet :
+#   - seules les nouvelles questions passent dans l'encodeur (cache d'embeddings) ;
+#   - elles sont ajoutées aux artefacts et à l'index vectoriel existants (pas de reconstruction pour flat / ivf) ;
+#   - centroïdes mis à jour par moyenne cumulée, Random Forest complétée par de nouveaux arbres (warm_start) ;
+#   - la nouvelle version est publiée comme après un entraînement complet.
+#
+#   python -m bankApp.nlp.incremental_training label etiquettes.csv   (colonnes conversation_id, category, intent)
+#   python -m bankApp.nlp.incremental_training update [--all] [--no-publish]
+import argparse
+import csv
+import json
+import os
+import shutil
+import time
+import numpy as np
+import joblib
+from bankApp.nlp.artifacts import ARTIFACTS_SUBDIR, append_artifacts, load_artifacts
+from bankApp.nlp.atomic_io import atomic_write
+from bankApp.nlp.model_registry import (
+    MODEL_DIR, COMPLETE_FILE, create_version_dir, complete_version, current_version, discard_version, publish_version, version_dir,
+)
+from bankApp.nlp.centroid_classifier import NearestCentroidClassifier
+from bankApp.nlp.vector_index import INDEX_SUBDIR, extend_index, index_exists, load_index, save_index
+from bankApp.nlp.embedding_cache import EmbeddingCache, encode_with_cache
+from bankApp.nlp.encoders import encoder_hash, load_torch_encoder
+from bankApp.nlp.lemma_table import lemma_table_exists, load_lemma_table
+from bankApp.nlp.model_training import EMBEDDING_MODEL, RF_COMPRESS, random_forest_report
+
+# Configuration des chemins
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+INPUT_FILE = os.path.join(DATA_DIR, "banking_dataset_tokenize.csv")
+
+# Suivi des étiquettes déjà intégrées, écrit dans chaque version issue d'une mise à jour
+INCREMENTAL_FILE = "incremental.json"
+
+# Étiquettes lues sans produire de version (toutes inconnues de la version de départ) : dernière étiquette
+# lue pour cette version, pour ne pas les relire à chaque mise à jour
+SKIPPED_LABELS_FILE = os.path.join(MODEL_DIR, "incremental_skipped.json")
+
+# Fichiers réécrits par la mise à jour ; les autres (encodeur, ONNX, TF-IDF, table de lemmes) sont repris
+# de la version de départ par lien physique : ils ne sont jamais réécrits sur place
+REWRITTEN = {
+    ARTIFACTS_SUBDIR, INDEX_SUBDIR, "random_forest.joblib", "category_centroids.npz",
+    "random_forest_report.json", INCREMENTAL_FILE, COMPLETE_FILE,
+}
+
+# Arbres ajoutés à la Random Forest à chaque mise à jour (part du nombre d'arbres existants, au moins MIN)
+RF_EXTRA_TREES = 0.1
+RF_MIN_EXTRA_TREES = 10
+
+# Lignes du dataset d'entraînement par catégorie mêlées aux nouvelles : les nouveaux arbres voient
+# toutes les catégories (même ordre des classes que les anciens) sans sur-apprendre les étiquettes récentes
+REPLAY_PER_CATEGORY = 50
+
+def _link_or_copy(src, dst):
+    # Lien physique (instantané, aucune place disque), copie si le système de fichiers ne le permet pas
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def copy_version(base_dir, output_dir):
+    # Reprend les fichiers inchangés de la version de départ ; la suppression ultérieure de celle-ci
+    # (prune_versions) n'affecte pas les liens physiques
+    ignore = lambda directory, names: [n for n in names if directory == base_dir and n in REWRITTEN]
+    shutil.copytree(base_dir, output_dir, ignore=ignore, copy_function=_link_or_copy, dirs_exist_ok=True)
+
+def read_incremental_state(model_dir):
+    # Dernière étiquette intégrée à une version (0 pour une version issue d'un entraînement complet)
+    try:
+        with open(os.path.join(model_dir, INCREMENTAL_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_label_id": 0}
+
+def read_skipped_labels(base_version):
+    # Dernière étiquette ignorée sur la version de départ (0 si aucune, ou si elle concernait une autre version)
+    try:
+        with open(SKIPPED_LABELS_FILE, encoding="utf-8") as f:
+            return json.load(f).get(str(base_version), 0)
+    except FileNotFoundError:
+        return 0
+
+def save_skipped_labels(base_version, last_label_id):
+    # Une seule version de départ suivie : après une nouvelle publication, l'ancienne entrée n'a plus d'usage
+    with atomic_write(SKIPPED_LABELS_FILE) as f:
+        json.dump({str(base_version): last_label_id}, f, indent=2)
+
+def fetch_labels(db_manager, after_id=0, max_confidence=None):
+    # Étiquettes postérieures à after_id : [(id, user_message, category, intent)]
+    rows = []
+    for batch in db_manager.iter_labelled_conversations(after_id=after_id, max_confidence=max_confidence):
+        rows.extend(batch)
+    return rows
+
+def resolve_labels(metadata, rows):
+    """
+    Codes de catégorie et d'intention des étiquettes dans les tables de la version de départ.
+    Une intention inconnue (ou rattachée à une autre catégorie) demande un entraînement complet :
+    la ligne est ignorée.
+    Returns:
+        tuple: (indices des lignes retenues, codes de catégorie, identifiants d'intention)
+    """
+    intent_codes = {intent: code for code, intent in enumerate(metadata.intents)}
+    intent_categories = dict(zip(metadata.intent_ids.tolist(), metadata.row_category_codes().tolist()))
+
+    kept, category_codes, intent_ids = [], [], []
+    for i, (_, _, category, intent) in enumerate(rows):
+        category_code, intent_id = metadata.category_code(category), intent_codes.get(intent)
+        if category_code is None or intent_id is None or intent_categories.get(intent_id) != category_code:
+            continue
+        kept.append(i)
+        category_codes.append(category_code)
+        intent_ids.append(intent_id)
+    return kept, np.array(category_codes, dtype=np.int64), np.array(intent_ids, dtype=np.int64)
+
+def update_random_forest(tfidf, rfc, tokens, categories):
+    """
+    Ajoute des arbres entraînés sur les nouvelles lignes et un échantillon du dataset d'entraînement
+    (vocabulaire TF-IDF inchangé). Retourne None si les nouveaux arbres ne verraient pas toutes les catégories.
+    Args:
+        tokens (list): Nouvelles questions normalisées comme au service (table de lemmes)
+        categories (list): Catégorie de chaque question
+    """
+    import pandas as pd
+
+    tokens, y = list(tokens), list(categories)
+    if os.path.exists(INPUT_FILE):
+        df = pd.read_csv(INPUT_FILE, encoding="utf-8", usecols=["tokens", "category"])
+        sample = df.sample(frac=1, random_state=42).groupby("category").head(REPLAY_PER_CATEGORY)
+        tokens += sample["tokens"].fillna("").tolist()
+        y += sample["category"].tolist()
+
+    if set(y) != set(rfc.classes_.tolist()):
+        print("Random Forest inchangée : les nouvelles lignes ne couvrent pas toutes les catégories "
+              f"et le dataset d'entraînement ({INPUT_FILE}) est absent")
+        return None
+
+    n_extra = max(RF_MIN_EXTRA_TREES, int(len(rfc.estimators_) * RF_EXTRA_TREES))
+    rfc.set_params(warm_start=True, n_estimators=len(rfc.estimators_) + n_extra, n_jobs=-1)
+    rfc.fit(tfidf.transform(tokens), y)
+    rfc.set_params(warm_start=False, n_jobs=1)
+    print(f"Random Forest: {n_extra} arbres ajoutés ({len(rfc.estimators_)} au total)")
+    return rfc
+
+def update_models(db_manager, min_confidence, include_confident=False, publish=True):
+    """
+    Intègre les nouvelles étiquettes à la version publiée et écrit une nouvelle version.
+    Args:
+        db_manager: DatabaseManager ou InMemoryDatabaseManager (iter_labelled_conversations)
+        min_confidence (float): Seuil de confiance du service (Config.NLP_MIN_CONFIDENCE)
+        include_confident (bool): Intègre aussi les conversations servies au-dessus du seuil
+        publish (bool): Publie la version (sinon elle peut d'abord être validée avec traffic_replay)
+    Returns:
+        dict: Résumé de la mise à jour, None s'il n'y a aucune nouvelle étiquette utilisable
+    Raises:
+        ValueError: Aucune version publiée (ancien format à plat dans MODEL_DIR)
+    """
+    # Dépendance du service importée ici : même nettoyage que les questions à la prédiction
+    from bankApp.nlp.preduction_service import correct_texts, normalize_text
+
+    start = time.perf_counter()
+    base_version = current_version()
+    if base_version is None:
+        # Ancien format : les modèles à plat dans MODEL_DIR contiennent aussi versions/, ils ne peuvent
+        # pas servir de version de départ
+        raise ValueError("Aucune version publiée : lancez d'abord un entraînement complet (model_training)")
+    base_dir = version_dir(base_version)
+    state = read_incremental_state(base_dir)
+    after_id = max(state["last_label_id"], read_skipped_labels(base_version))
+
+    rows = fetch_labels(db_manager, after_id, None if include_confident else min_confidence)
+    if not rows:
+        print(f"Aucune nouvelle étiquette depuis la version {base_version}")
+        return None
+
+    metadata = load_artifacts(base_dir)
+    kept, category_codes, intent_ids = resolve_labels(metadata, rows)
+    print(f"{len(rows)} nouvelles étiquettes, {len(rows) - len(kept)} ignorées (catégorie ou intention inconnue)")
+    if not kept:
+        # Aucune version produite : les étiquettes lues ne seront pas relues tant que cette version est la base
+        save_skipped_labels(base_version, max(row[0] for row in rows))
+        return None
+
+    texts = correct_texts([normalize_text(rows[i][1]) for i in kept])
+    categories = [rows[i][2] for i in kept]
+
+    # Encodage des seules nouvelles questions, via le cache du même encodeur que l'entraînement
+    model_embed = load_torch_encoder(base_dir)
+    model_hash = encoder_hash(base_dir)
+    if model_hash is not None:
+        embeddings = encode_with_cache(model_embed, texts, EmbeddingCache(f"{EMBEDDING_MODEL}-{model_hash[:16]}"))
+    else:
+        embeddings = np.asarray(model_embed.encode(texts, batch_size=64), dtype=np.float32)
+
+    version, output_dir = create_version_dir()
+    try:
+        copy_version(base_dir, output_dir)
+
+        # Artefacts et index : les nouvelles lignes sont ajoutées à la tranche de leur catégorie
+        row_map, new_rows = append_artifacts(output_dir, metadata, category_codes, intent_ids, embeddings)
+        if index_exists(base_dir):
+            new_metadata = load_artifacts(output_dir)
+            index = extend_index(load_index(base_dir, metadata.embeddings), new_metadata.embeddings,
+                                 new_metadata.row_category_codes(), row_map, new_rows)
+            save_index(index, output_dir)
+
+        # Centroïdes : moyenne cumulée exacte
+        centroids_path = os.path.join(base_dir, 'category_centroids.npz')
+        if os.path.exists(centroids_path):
+            NearestCentroidClassifier.load(centroids_path).partial_fit(embeddings, categories).save(
+                os.path.join(output_dir, 'category_centroids.npz'))
+
+        # Random Forest : nouveaux arbres (warm_start), sinon reprise de l'ancienne
+        rf_path = os.path.join(base_dir, 'random_forest.joblib')
+        if os.path.exists(rf_path):
+            tfidf = joblib.load(os.path.join(base_dir, 'tfidf_vectorizer.joblib'))
+            normalizer = load_lemma_table(base_dir) if lemma_table_exists(base_dir) else None
+            tokens = [normalizer.normalize(t) for t in texts] if normalizer is not None else texts
+            rfc = update_random_forest(tfidf, joblib.load(rf_path), tokens, categories)
+            if rfc is None:
+                _link_or_copy(rf_path, os.path.join(output_dir, 'random_forest.joblib'))
+            else:
+                joblib.dump(rfc, os.path.join(output_dir, 'random_forest.joblib'), compress=RF_COMPRESS)
+                params = {f"rf__{name}": rfc.get_params()[name] for name in ("n_estimators", "max_depth", "min_samples_leaf")}
+                random_forest_report(output_dir, params, tokens[:200])
+
+        summary = {
+            "base_version": base_version,
+            "last_label_id": max(row[0] for row in rows),
+            "rows_added": len(kept),
+            "rows_skipped": len(rows) - len(kept),
+            "elapsed_s": time.perf_counter() - start,
+        }
+        with atomic_write(os.path.join(output_dir, INCREMENTAL_FILE)) as f:
+            json.dump(summary, f, indent=2)
+        print(f"Version {version}: {len(kept)} lignes ajoutées en {summary['elapsed_s']:.1f} s")
+    except BaseException:
+        # Échec : le dossier incomplet est supprimé, la version servie reste inchangée
+        discard_version(version)
+        raise
+    complete_version(version)
+
+    if publish:
+        publish_version(version)
+    return {"version": version, **summary}
+
+def import_labels(db_manager, csv_file):
+    # Étiquettes d'un fichier CSV (conversation_id, category, intent)
+    count = 0
+    with open(csv_file, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            count += db_manager.label_conversation(int(row["conversation_id"]), row["category"], row["intent"])
+    print(f"{count} étiquettes enregistrées")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Réentraînement incrémental à partir des conversations étiquetées")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    label_parser = commands.add_parser("label", help="Enregistre des étiquettes depuis un CSV")
+    label_parser.add_argument("csv_file", help="Colonnes conversation_id, category, intent")
+
+    update_parser = commands.add_parser("update", help="Intègre les nouvelles étiquettes à la version publiée")
+    update_parser.add_argument("--all", action="store_true",
+                               help="Inclut les conversations servies au-dessus du seuil de confiance")
+    update_parser.add_argument("--no-publish", action="store_true",
+                               help="Écrit la version sans la publier (à valider avec traffic_replay)")
+    args = parser.parse_args()
+
+    from config import Config
+    from bankApp import db_manager
+
+    if args.command == "label":
+        import_labels(db_manager, args.csv_file)
+    else:
+        update_models(db_manager, Config.NLP_MIN_CONFIDENCE, include_confident=args.all, publish=not args.no_publish)
+
+if __name__ == "__main__":
+    main()
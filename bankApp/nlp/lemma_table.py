@@ -0,0 +1,91 @@
+#bankApp/nlp/lemma_table.py
+import os
+import re
+import json
+from collections import Counter, defaultdict
+from bankApp.nlp.atomic_io import atomic_write
+
+# Version du format de la table (à incrémenter à chaque changement de disposition)
+LEMMA_TABLE_VERSION = 1
+LEMMA_TABLE_FILE = "lemma_table.json"
+
+# Mots alphabétiques (équivalent de token.is_alpha de spaCy : lettres uniquement, sans chiffres)
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+class LemmaNormalizer:
+    """
+    Normalisation des textes par simple consultation de dictionnaire, sans spaCy :
+    forme de surface -> lemme (le lemme spaCy le plus fréquent sur le corpus) et mots vides retirés.
+    Utilisée à l'identique pour produire la colonne `tokens` d'entraînement et au service,
+    les deux espaces de variables TF-IDF sont donc les mêmes.
+    Un mot absent de la table est conservé tel quel.
+    """
+
+    def __init__(self, lemmas, stop_words):
+        self.lemmas = dict(lemmas)
+        self.stop_words = frozenset(stop_words)
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def normalize(self, text):
+        """
+        Args:
+            text (str): Texte nettoyé (ou brut : il est mis en minuscules)
+        Returns:
+            str: Lemmes séparés par des espaces, sans mots vides
+        """
+        lemmas, stop_words = self.lemmas, self.stop_words
+        words = WORD_PATTERN.findall(text.lower())
+        return " ".join(lemmas.get(w, w) for w in words if w not in stop_words)
+
+    def save(self, path):
+        with atomic_write(path) as f:
+            json.dump({
+                "version": LEMMA_TABLE_VERSION,
+                "lemmas": self.lemmas,
+                "stop_words": sorted(self.stop_words),
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != LEMMA_TABLE_VERSION:
+            raise ValueError(
+                f"Version de table de lemmes {data.get('version')} non supportée "
+                f"(attendue: {LEMMA_TABLE_VERSION}). Relancez la lemmatisation."
+            )
+        return cls(data["lemmas"], data["stop_words"])
+
+def build_lemma_table(docs, stop_words=()):
+    """
+    Construit la table à partir de documents spaCy déjà analysés.
+    Args:
+        docs (iterable): Documents spaCy du corpus
+        stop_words (iterable): Mots vides de la langue (nlp.Defaults.stop_words), ajoutés à ceux observés
+    Returns:
+        LemmaNormalizer
+    """
+    counts = defaultdict(Counter)
+    observed_stop_words = set()
+    for doc in docs:
+        for token in doc:
+            if not token.is_alpha:
+                continue
+            surface = token.lower_
+            if token.is_stop:
+                observed_stop_words.add(surface)
+            else:
+                counts[surface][token.lemma_] += 1
+
+    # Le lemme dépend du contexte : on garde le plus fréquent pour chaque forme de surface
+    lemmas = {surface: lemma_counts.most_common(1)[0][0] for surface, lemma_counts in counts.items()}
+    stop_words = {w.lower() for w in stop_words} | observed_stop_words
+    return LemmaNormalizer(lemmas, stop_words)
+
+def lemma_table_exists(directory):
+    return os.path.exists(os.path.join(directory, LEMMA_TABLE_FILE))
+
+def load_lemma_table(directory):
+    return LemmaNormalizer.load(os.path.join(directory, LEMMA_TABLE_FILE))
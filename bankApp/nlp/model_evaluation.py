@@ -1,20 +1,34 @@
 import os
+import time
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.model_selection import cross_val_score, train_test_split
-from model_training import load_trained_models
+from bankApp.nlp.model_training import load_trained_models
+from bankApp.nlp.model_registry import version_dir
+from bankApp.nlp.data_generation import add_noise
+from bankApp.nlp.centroid_classifier import NearestCentroidClassifier
+from bankApp.nlp.vector_index import FlatIndex, STORAGE_TYPES
+from bankApp.nlp.ponctuations import normalize_text
+from bankApp.nlp.preduction_service import ModelBundle, category_probas, correct_texts, predict, predict_batch
+from bankApp.nlp.report_figures import Figure, FIGURE_DPI, render_figures, print_render_report
 
 # Configuration des chemins
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 MODEL_DIR = os.path.join(DATA_DIR, "models")
+INPUT_FILE = os.path.join(DATA_DIR, "banking_dataset_tokenize.csv")
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-def plot_confusion_matrix(y_test, y_pred, categories):
+# Bruit des questions d'évaluation du pipeline (fautes de frappe, casse, mots de remplissage) et graine du tirage
+EVAL_NOISE = 0.5
+EVAL_SEED = 1234
+
+def plot_confusion_matrix(data, path, dpi=FIGURE_DPI):
     # Visualisation de la matrice de confusion
-    cm = confusion_matrix(y_test, y_pred)
+    cm, categories = np.array(data["matrix"]), data["categories"]
     
     plt.figure(figsize=(12, 10))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
@@ -28,19 +42,20 @@ def plot_confusion_matrix(y_test, y_pred, categories):
     plt.xticks(rotation=45, ha='right')
     plt.yticks(rotation=0)
     plt.tight_layout()
-    plt.savefig(os.path.join(MODEL_DIR, 'confusion_matrix.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    print("Matrice de confusion sauvegardée")
 
-def plot_feature_importance(model, vectorizer, top_n=20):
-    # Importance des features (TF-IDF)
+def top_features(model, vectorizer, top_n=20):
+    # Top N des features TF-IDF par importance
     feature_names = vectorizer.get_feature_names_out()
     importances = model.feature_importances_
-    
-    # Top N features
     indices = np.argsort(importances)[::-1][:top_n]
-    top_features = [feature_names[i] for i in indices]
-    top_importances = importances[indices]
+    return {"features": [str(feature_names[i]) for i in indices], "importances": importances[indices].tolist()}
+
+def plot_feature_importance(data, path, dpi=FIGURE_DPI):
+    # Importance des features (TF-IDF)
+    top_features, top_importances = data["features"], data["importances"]
+    top_n = len(top_features)
     
     plt.figure(figsize=(12, 8))
     sns.barplot(x=top_importances, y=top_features)
@@ -48,12 +63,12 @@ def plot_feature_importance(model, vectorizer, top_n=20):
              fontsize=16, fontweight='bold')
     plt.xlabel('Importance', fontsize=12)
     plt.tight_layout()
-    plt.savefig(os.path.join(MODEL_DIR, 'feature_importance.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    print("✓ Importance des features sauvegardée")
 
-def plot_cross_validation(cv_scores):
+def plot_cross_validation(cv_scores, path, dpi=FIGURE_DPI):
     # Visualisation des scores de validation croisée
+    cv_scores = np.array(cv_scores)
     plt.figure(figsize=(10, 6))
     x_pos = np.arange(len(cv_scores))
     bars = plt.bar(x_pos, cv_scores, color=sns.color_palette("viridis", len(cv_scores)))
@@ -71,11 +86,12 @@ def plot_cross_validation(cv_scores):
                 f'{score:.4f}', ha='center', va='bottom')
     
     plt.tight_layout()
-    plt.savefig(os.path.join(MODEL_DIR, 'cross_validation_scores.png'), dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-def comprehensive_evaluation(model, vectorizer, X_test, y_test, categories):
-    # Évaluation complète du modèle
+def comprehensive_evaluation(model, vectorizer, X_test, y_test, categories, X_cv=None, y_cv=None,
+                             preview=False, force=False):
+    # Évaluation complète du modèle ; les figures sont rendues ensemble, en parallèle, à la fin
     print("=" * 60)
     print("ÉVALUATION COMPLÈTE DU MODÈLE")
     print("=" * 60)
@@ -89,41 +105,289 @@ def comprehensive_evaluation(model, vectorizer, X_test, y_test, categories):
     
     # Rapport de classification détaillé
     print("\nRAPPORT DE CLASSIFICATION:")
-    print(classification_report(y_test, y_pred, target_names=categories))
+    print(classification_report(y_test, y_pred, labels=categories, target_names=categories))
     
     # Matrice de confusion
-    plot_confusion_matrix(y_test, y_pred, categories)
+    figures = [Figure('confusion_matrix.png', plot_confusion_matrix, {
+        "matrix": confusion_matrix(y_test, y_pred, labels=categories).tolist(), "categories": categories,
+    })]
     
     # Feature importance (pour Random Forest)
     if hasattr(model, 'feature_importances_'):
-        plot_feature_importance(model, vectorizer)
+        figures.append(Figure('feature_importance.png', plot_feature_importance, top_features(model, vectorizer)))
     
-    # Validation croisée
+    # Validation croisée (plis ajustés en parallèle sur tous les cœurs)
     print(f"\nVALIDATION CROISÉE (5-fold):")
-    cv_scores = cross_val_score(model, X_test, y_test, cv=5, scoring='accuracy')
+    if X_cv is None:
+        X_cv, y_cv = X_test, y_test
+    start = time.perf_counter()
+    cv_scores = cross_val_score(model, X_cv, y_cv, cv=5, scoring='accuracy', n_jobs=-1)
     
     print(f"   Scores: {[f'{score:.4f}' for score in cv_scores]}")
-    print(f"   Moyenne: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+    print(f"   Moyenne: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f}) en {time.perf_counter() - start:.1f} s")
     
-    plot_cross_validation(cv_scores)
+    figures.append(Figure('cross_validation_scores.png', plot_cross_validation, cv_scores.tolist()))
+    print_render_report(render_figures(figures, MODEL_DIR, preview=preview, force=force))
     
     return accuracy
 
-def integrate_evaluation():
-    # Import des modèles depuis model_taining.py
-    from model_training import tfidf, rfc, df
-    
+def _latency_percentiles(timings_ms):
+    return {f"p{q}_ms": float(np.percentile(timings_ms, q)) for q in (50, 95, 99)}
+
+def make_eval_queries(df, test_df, noise=EVAL_NOISE, seed=EVAL_SEED):
+    """
+    Questions d'évaluation du pipeline : les instructions du jeu de test bruitées comme du trafic réel (add_noise).
+    Le dataset répète les mêmes instructions et l'index de service les contient toutes (jeu de test compris) :
+    seules les questions qui, après bruit, ne figurent pas dans le dataset sont gardées, l'évaluation ne mesure
+    donc pas la simple recherche d'une phrase indexée.
+    Args:
+        df (pd.DataFrame): Dataset complet (instructions indexées)
+        test_df (pd.DataFrame): Jeu de test
+        noise (float): Probabilité de chaque altération
+        seed (int): Graine du tirage (mêmes questions d'une évaluation à l'autre)
+    Returns:
+        pd.DataFrame: Colonnes instruction, category, intent
+    """
+    queries = test_df[["instruction", "category", "intent"]].reset_index(drop=True)
+    queries["instruction"] = add_noise(queries["instruction"].astype(str), np.random.default_rng(seed), noise)
+    indexed = set(df["instruction"].astype(str).str.lower().str.strip())
+    unseen = ~queries["instruction"].str.lower().str.strip().isin(indexed)
+    return queries[unseen].reset_index(drop=True)
+
+def evaluate_pipeline(bundle, test_df, min_score=0.6, batch_size=64, n_latency=200):
+    """
+    Évalue le pipeline complet de get_response (nettoyage, correction, catégorie, intention, seuil)
+    sur des questions absentes de l'index (voir make_eval_queries).
+    Les prédictions passent par le chemin par lots (predict_batch) ; la latence unitaire est mesurée
+    avec predict sur un échantillon, comme une requête du service.
+    Returns:
+        dict: Accuracy (catégorie, intention), taux de réponse et précision au seuil, débit et latences
+    """
+    questions = test_df["instruction"].astype(str).tolist()
+    true_categories = test_df["category"].to_numpy()
+    true_intents = test_df["intent"].to_numpy()
+
+    start = time.perf_counter()
+    predictions = []
+    for i in range(0, len(questions), batch_size):
+        predictions.extend(predict_batch(bundle, questions[i:i + batch_size], batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+
+    predicted_categories = np.array([category for category, _ in predictions], dtype=object)
+    top_intents = np.array([candidates[0][1] if candidates else None for _, candidates in predictions], dtype=object)
+    top_scores = np.array([candidates[0][3] if candidates else 0.0 for _, candidates in predictions])
+    answered = top_scores >= min_score
+    intent_ok = top_intents == true_intents
+
+    timings = []
+    for question in questions[:n_latency]:
+        t0 = time.perf_counter()
+        predict(bundle, question)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "n_queries": len(questions),
+        "category_accuracy": float(np.mean(predicted_categories == true_categories)),
+        "intent_accuracy": float(np.mean(intent_ok)),
+        "answered_rate": float(np.mean(answered)),
+        "answered_precision": float(np.mean(intent_ok[answered])) if answered.any() else 0.0,
+        "min_score": min_score,
+        "batch_throughput_qps": len(questions) / elapsed,
+        "latency": _latency_percentiles(timings),
+    }
+
+def integrate_evaluation(min_score=0.6, preview=False, force=False):
+    """
+    Évaluation de la version publiée : classifieur TF-IDF + Random Forest (rapport, matrice de confusion,
+    validation croisée parallèle) puis pipeline complet sur le jeu de test.
+    """
+    # Chargement des modèles publiés et du dataset (même découpage que l'entraînement)
+    model_dir = version_dir()
+    models = load_trained_models(model_dir, classifier="random_forest")
+    if models is None:
+        return None
+    tfidf, rfc = models[0], models[1]
+
+    df = pd.read_csv(INPUT_FILE, encoding="utf-8")
+    df["tokens"] = df["tokens"].fillna("")
+    _, test_df = train_test_split(df, test_size=0.2, random_state=42)
+
     # Préparer les données pour l'évaluation
     X = tfidf.transform(df["tokens"])
     y = df["category"]
+    X_test = tfidf.transform(test_df["tokens"])
+    y_test = test_df["category"]
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Évaluation complète
-    accuracy = comprehensive_evaluation(rfc, tfidf, X_test, y_test, df['category'].unique())
-    
+    # Évaluation complète du classifieur
+    accuracy = comprehensive_evaluation(rfc, tfidf, X_test, y_test, [str(c) for c in rfc.classes_], X_cv=X, y_cv=y,
+                                        preview=preview, force=force)
     print(f"\nPerformance finale du modèle: {accuracy:.4f}")
 
+    # Pipeline complet (catégorie, intention, seuil de confiance)
+    print("=" * 60)
+    print("ÉVALUATION DU PIPELINE COMPLET")
+    print("=" * 60)
+    bundle = ModelBundle(os.path.basename(os.path.normpath(model_dir)), *models)
+    queries = make_eval_queries(df, test_df)
+    metrics = evaluate_pipeline(bundle, queries, min_score=min_score)
+    metrics["noise"] = EVAL_NOISE
+    latency = metrics["latency"]
+    print(f"   {metrics['n_queries']} questions bruitées absentes de l'index (bruit {EVAL_NOISE}) | catégorie={metrics['category_accuracy']:.4f} | "
+          f"intention={metrics['intent_accuracy']:.4f}")
+    print(f"   Seuil {min_score}: réponses={metrics['answered_rate']:.4f} | précision={metrics['answered_precision']:.4f}")
+    print(f"   Débit par lots: {metrics['batch_throughput_qps']:.1f} questions/s | latence unitaire "
+          f"p50={latency['p50_ms']:.1f} ms p95={latency['p95_ms']:.1f} ms p99={latency['p99_ms']:.1f} ms")
+
+    return {"classifier_accuracy": accuracy, "pipeline": metrics}
+
+def _median_latency_ms(func, inputs):
+    # Latence médiane (ms) d'un appel unitaire
+    timings = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def _load_eval_queries():
+    # Questions d'évaluation tirées du jeu de test (même découpage que l'entraînement)
+    df = pd.read_csv(INPUT_FILE, encoding="utf-8")
+    _, test_df = train_test_split(df, test_size=0.2, random_state=42)
+    return make_eval_queries(df, test_df)
+
+def _serving_inputs(model_embed, questions, batch_size=64):
+    # Questions nettoyées et corrigées puis embeddings normalisés, comme au service (predict_batch)
+    questions_clean = correct_texts([normalize_text(q) for q in questions])
+    vectors = np.asarray(model_embed.encode(questions_clean, batch_size=batch_size), dtype=np.float32)
+    return questions_clean, vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def compare_category_classifiers(n_latency=200):
+    """
+    Compare TF-IDF + Random Forest et le classifieur par centroïdes sur l'embedding, sur les questions
+    bruitées absentes de l'index (make_eval_queries) nettoyées et corrigées comme au service :
+    accuracy, latence unitaire de classification (category_probas) et taille sur disque.
+    Returns:
+        dict: {nom_classifieur: {"accuracy", "latency_ms", "size_kb"}}
+    """
+    print("=" * 60)
+    print("COMPARAISON DES CLASSIFIEURS DE CATÉGORIES")
+    print("=" * 60)
+
+    model_dir = version_dir()
+    models = load_trained_models(model_dir, classifier="random_forest")
+    if models is None:
+        return None
+    _, _, model_embed, metadata, _, index, _ = models
+    centroids = NearestCentroidClassifier.load(os.path.join(model_dir, 'category_centroids.npz'))
+    version = os.path.basename(os.path.normpath(model_dir))
+    bundles = {
+        "random_forest": ModelBundle(version, *models),
+        "centroid": ModelBundle(version, None, None, model_embed, metadata, centroids, index),
+    }
+
+    # L'embedding est de toute façon calculé pour la recherche d'intention : il n'est pas compté
+    # dans la latence du classifieur par centroïdes
+    queries = _load_eval_queries()
+    questions_clean, question_vecs = _serving_inputs(model_embed, queries["instruction"].astype(str).tolist())
+    y_true = queries["category"].to_numpy()
+    sample = range(min(n_latency, len(questions_clean)))
+
+    def file_kb(*names):
+        return sum(os.path.getsize(os.path.join(model_dir, n)) for n in names) / 1024
+
+    sizes = {
+        "random_forest": file_kb('tfidf_vectorizer.joblib', 'random_forest.joblib'),
+        "centroid": file_kb('category_centroids.npz'),
+    }
+    results = {}
+    for name, bundle in bundles.items():
+        probas, classes = category_probas(bundle, questions_clean, question_vecs)
+        results[name] = {
+            "accuracy": accuracy_score(y_true, classes[np.argmax(probas, axis=1)]),
+            "latency_ms": _median_latency_ms(
+                lambda i: category_probas(bundle, questions_clean[i:i + 1], question_vecs[i:i + 1]), sample
+            ),
+            "size_kb": sizes[name],
+        }
+
+    print(f"   {len(questions_clean)} questions bruitées absentes de l'index (bruit {EVAL_NOISE})")
+    for name, metrics in results.items():
+        print(f"   {name}: accuracy={metrics['accuracy']:.4f} | "
+              f"latence={metrics['latency_ms']:.3f} ms | taille={metrics['size_kb']:.1f} Ko")
+    print("Sélection au service : NLP_CATEGORY_CLASSIFIER=random_forest|centroid")
+
+    return results
+
+def evaluate_quantization(k=5, batch_size=64, n_latency=200):
+    """
+    Impact de la quantification de l'index (float16, int8 + réévaluation float32) sur le pipeline complet
+    (predict_batch) avec chaque stockage, sur les questions bruitées absentes de l'index (make_eval_queries) :
+    accuracy d'intention, accord top-1 et recall@k des intentions avec float32, mémoire, durée de recherche
+    par question et latence unitaire de predict.
+    Returns:
+        dict: {stockage: {"intent_accuracy", "top1_agreement", "recall_at_k", "memory_kb", "search_ms", "latency_ms"}}
+    """
+    print("=" * 60)
+    print("IMPACT DE LA QUANTIFICATION DE L'INDEX")
+    print("=" * 60)
+
+    model_dir = version_dir()
+    models = load_trained_models(model_dir)
+    if models is None:
+        return None
+    metadata = models[3]
+    version = os.path.basename(os.path.normpath(model_dir))
+
+    queries = _load_eval_queries()
+    questions = queries["instruction"].astype(str).tolist()
+    true_intents = queries["intent"].tolist()
+
+    # Même ensemble de modèles, seul l'index de recherche d'intention change
+    found, results = {}, {}
+    for storage in STORAGE_TYPES:
+        index = FlatIndex.from_sorted(metadata.embeddings, metadata.category_offsets, storage=storage)
+        bundle = ModelBundle(version, *models[:5], index, *models[6:])
+        timings = {}
+        predictions = []
+        for i in range(0, len(questions), batch_size):
+            predictions.extend(predict_batch(bundle, questions[i:i + batch_size], top_n=k,
+                                             batch_size=batch_size, timings=timings))
+        found[storage] = [[candidate[1] for candidate in candidates] for _, candidates in predictions]
+        results[storage] = {
+            "intent_accuracy": float(np.mean([
+                len(intents) > 0 and intents[0] == intent for intents, intent in zip(found[storage], true_intents)
+            ])),
+            "memory_kb": index.memory_bytes() / 1024,
+            "search_ms": timings["search"] * 1000 / max(len(questions), 1),
+            "latency_ms": _median_latency_ms(lambda q: predict(bundle, q), questions[:n_latency]),
+        }
+
+    reference = found["float32"]
+    for storage, metrics in results.items():
+        metrics["top1_agreement"] = float(np.mean([
+            len(a) > 0 and len(b) > 0 and a[0] == b[0] for a, b in zip(found[storage], reference)
+        ]))
+        metrics["recall_at_k"] = float(np.mean([
+            len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(found[storage], reference)
+        ]))
+
+    print(f"   {len(questions)} questions bruitées absentes de l'index (bruit {EVAL_NOISE})")
+    for storage, metrics in results.items():
+        print(f"   {storage}: accuracy intention={metrics['intent_accuracy']:.4f} | "
+              f"accord top-1={metrics['top1_agreement']:.4f} | recall@{k}={metrics['recall_at_k']:.4f} | "
+              f"mémoire={metrics['memory_kb']:.1f} Ko | recherche={metrics['search_ms']:.3f} ms | "
+              f"latence={metrics['latency_ms']:.1f} ms")
+    print("Sélection à l'entraînement : NLP_INDEX_STORAGE=float32|float16|int8")
+
+    return results
+
 # Point d'entrée principal
 if __name__ == "__main__":
-    integrate_evaluation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Évaluation de la version publiée")
+    parser.add_argument("--preview", action="store_true", help="Figures en basse résolution (aperçu rapide)")
+    parser.add_argument("--force", action="store_true", help="Redessiner toutes les figures")
+    args = parser.parse_args()
+
+    integrate_evaluation(preview=args.preview, force=args.force)
+    compare_category_classifiers()
+    evaluate_quantization()
\ No newline at end of file
@@ -0,0 +1,140 @@
+#bankApp/nlp/model_registry.py
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from bankApp.nlp.atomic_io import atomic_write
+
+# Configuration des chemins
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+MODEL_DIR = os.path.join(DATA_DIR, "models")
+
+# Chaque entraînement écrit dans models/versions/<version>/ ;
+# le fichier models/CURRENT contient le nom de la version servie.
+VERSIONS_DIR = os.path.join(MODEL_DIR, "versions")
+CURRENT_FILE = os.path.join(MODEL_DIR, "CURRENT")
+
+# Versions publiées, une par ligne dans l'ordre de publication : seules elles comptent pour KEEP_VERSIONS
+PUBLISHED_FILE = os.path.join(MODEL_DIR, "PUBLISHED")
+
+# Nombre de versions publiées conservées sur disque, cibles de retour arrière (la version courante
+# n'est jamais supprimée). Les versions non publiées (candidates, --no-publish) ne sont jamais comptées.
+KEEP_VERSIONS = 3
+
+# Marqueur écrit quand tous les fichiers d'une version sont écrits (publiée ou non)
+COMPLETE_FILE = "COMPLETE"
+
+# Un dossier non publié et incomplet plus ancien que ce délai est un entraînement échoué ou interrompu
+STALE_VERSION_HOURS = 24
+
+def create_version_dir():
+    """
+    Crée un nouveau dossier de version, non publié.
+    Returns:
+        tuple: (version, chemin du dossier)
+    """
+    version = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+    path = os.path.join(VERSIONS_DIR, version)
+    os.makedirs(path)
+    return version, path
+
+def complete_version(version):
+    # Marque une version comme complète : elle n'est plus considérée comme un entraînement échoué
+    with atomic_write(os.path.join(VERSIONS_DIR, version, COMPLETE_FILE)) as f:
+        f.write(version)
+
+def discard_version(version):
+    # Supprime le dossier d'un entraînement qui a échoué avant d'être complet
+    shutil.rmtree(os.path.join(VERSIONS_DIR, version), ignore_errors=True)
+
+def current_version():
+    # Version publiée, ou None si aucune (ancien format : modèles à plat dans MODEL_DIR)
+    try:
+        with open(CURRENT_FILE, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def version_dir(version=None):
+    """
+    Dossier d'une version de modèles (la version courante par défaut).
+    Sans version publiée, retourne MODEL_DIR pour rester compatible avec l'ancien format.
+    """
+    version = version or current_version()
+    if version is None:
+        return MODEL_DIR
+    return os.path.join(VERSIONS_DIR, version)
+
+def publish_version(version):
+    """
+    Publie une version complète : le pointeur CURRENT est remplacé atomiquement,
+    les lecteurs voient soit l'ancienne version, soit la nouvelle, jamais un état partiel.
+    Raises:
+        FileNotFoundError: Version inexistante
+        ValueError: Version sans marqueur COMPLETE (entraînement en cours, échoué ou interrompu)
+    """
+    path = os.path.join(VERSIONS_DIR, version)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Version de modèles introuvable: {version}")
+    if not os.path.exists(os.path.join(path, COMPLETE_FILE)):
+        raise ValueError(f"Version de modèles incomplète, publication refusée: {version}")
+
+    with atomic_write(CURRENT_FILE) as f:
+        f.write(version)
+    # Une version republiée (retour arrière) redevient la plus récente
+    _save_published([v for v in published_versions() if v != version] + [version])
+    print(f"Version de modèles publiée: {version}")
+
+    prune_versions()
+
+def _listed_versions():
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+    return sorted(v for v in os.listdir(VERSIONS_DIR) if os.path.isdir(os.path.join(VERSIONS_DIR, v)))
+
+def published_versions():
+    """
+    Versions publiées, de la plus ancienne à la plus récente.
+    Sans fichier PUBLISHED (versions antérieures à ce suivi), les versions aux artefacts complets
+    sont considérées comme publiées, dans l'ordre de leur nom.
+    """
+    try:
+        with open(PUBLISHED_FILE, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        from bankApp.nlp.artifacts import artifacts_exist
+        return [v for v in _listed_versions() if artifacts_exist(os.path.join(VERSIONS_DIR, v))]
+
+def _save_published(versions):
+    with atomic_write(PUBLISHED_FILE) as f:
+        f.write("".join(f"{v}\n" for v in versions))
+
+def _remove(version):
+    # Sous Windows un fichier encore ouvert en mmap ne peut pas être supprimé : on réessaiera plus tard
+    shutil.rmtree(os.path.join(VERSIONS_DIR, version), ignore_errors=True)
+    return not os.path.exists(os.path.join(VERSIONS_DIR, version))
+
+def prune_versions(keep=KEEP_VERSIONS):
+    """
+    Garde les `keep` dernières versions publiées (et la version courante) ; supprime les plus anciennes
+    publiées et les entraînements échoués. Les versions non publiées mais complètes sont conservées.
+    """
+    current = current_version()
+    published = published_versions()
+    kept = set(published[-keep:] if keep > 0 else []) | {current}
+    remaining = [v for v in published if v in kept or not _remove(v)]
+    if remaining != published:
+        _save_published(remaining)
+    remove_failed_versions()
+
+def remove_failed_versions(max_age_hours=STALE_VERSION_HOURS):
+    # Dossiers jamais publiés ni complétés, assez anciens pour ne plus être en cours d'écriture
+    protected = set(published_versions()) | {current_version()}
+    deadline = time.time() - max_age_hours * 3600
+    for version in _listed_versions():
+        path = os.path.join(VERSIONS_DIR, version)
+        if version in protected or os.path.exists(os.path.join(path, COMPLETE_FILE)):
+            continue
+        if os.path.getmtime(path) < deadline:
+            _remove(version)
@@ -1,83 +1,305 @@
 #bankApp/nlp/model_training.py
 import os
-import pandas as pd
+import json
+import time
 import numpy as np
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sentence_transformers import SentenceTransformer
+from bankApp.nlp.atomic_io import atomic_write
+from bankApp.nlp.artifacts import save_artifacts, load_artifacts, artifacts_exist
+from bankApp.nlp.model_registry import (
+    create_version_dir, complete_version, discard_version, publish_version, version_dir,
+)
+from bankApp.nlp.centroid_classifier import NearestCentroidClassifier
+from bankApp.nlp.vector_index import FlatIndex, build_index, save_index, load_index, index_exists
+from bankApp.nlp.embedding_cache import EmbeddingCache, encode_with_cache
+from bankApp.nlp.lemma_table import LEMMA_TABLE_FILE, lemma_table_exists, load_lemma_table
+from bankApp.nlp.encoders import (
+    ENCODER_BACKEND, ONNX_EXPORT, save_encoder, load_torch_encoder, export_onnx, onnx_encoder_exists, load_onnx_encoder,
+)
 
 # Configuration des chemins
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 MODEL_DIR = os.path.join(DATA_DIR, "models")
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-def train_models():
+# Encodeur de phrases (identifiant Hugging Face)
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Classifieur de catégories utilisé au service :
+#   "random_forest" : TF-IDF + Random Forest (deux représentations par requête)
+#   "centroid"      : centroïde le plus proche sur l'embedding de phrase (un seul passage d'encodeur)
+CATEGORY_CLASSIFIERS = ("random_forest", "centroid")
+CATEGORY_CLASSIFIER = os.environ.get("NLP_CATEGORY_CLASSIFIER", "random_forest")
+
+# Random Forest : petite recherche de configuration (NLP_RF_SEARCH=0 pour utiliser RF_DEFAULT_PARAMS)
+RF_SEARCH = os.environ.get("NLP_RF_SEARCH", "1") == "1"
+RF_SEARCH_SPACE = {
+    "tfidf__max_features": [None, 2000],
+    "rf__n_estimators": [50, 100],
+    "rf__max_depth": [None, 30],
+    "rf__min_samples_leaf": [1, 2],
+}
+RF_DEFAULT_PARAMS = {
+    "tfidf__max_features": None,
+    "rf__n_estimators": 100,
+    "rf__max_depth": None,
+    "rf__min_samples_leaf": 1,
+}
+# Écart d'accuracy toléré pour préférer une configuration plus compacte
+RF_SCORE_TOLERANCE = 0.005
+# Niveau de compression joblib des artefacts TF-IDF / Random Forest
+RF_COMPRESS = 3
+
+# Index vectoriel construit à l'entraînement : "flat" (exact), "ivf" ou "hnsw" (approchés, grands catalogues)
+VECTOR_INDEX = os.environ.get("NLP_VECTOR_INDEX", "flat")
+
+# Stockage de l'index : "float32", "float16" ou "int8" (balayage sur codes compacts + réévaluation float32)
+INDEX_STORAGE = os.environ.get("NLP_INDEX_STORAGE", "float32")
+
+def _rf_pipeline(n_jobs=1):
+    from sklearn.pipeline import Pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.ensemble import RandomForestClassifier
+
+    # TF-IDF en float32 : les arbres travaillent en float32, aucune copie de conversion
+    return Pipeline([
+        ("tfidf", TfidfVectorizer(dtype=np.float32)),
+        ("rf", RandomForestClassifier(n_jobs=n_jobs, random_state=42)),
+    ])
+
+def search_random_forest(tokens, y, n_jobs=-1):
     """
-    Entraîne et sauvegarde tous les modèles
+    Petite recherche (validation croisée 3 plis, candidats évalués en parallèle) sur la profondeur,
+    la taille des feuilles, le nombre d'arbres et la taille du vocabulaire.
+    Parmi les configurations à moins de RF_SCORE_TOLERANCE de la meilleure accuracy, la plus compacte est retenue.
+    Returns:
+        dict: Paramètres retenus (noms de la Pipeline tfidf/rf)
+    """
+    from sklearn.model_selection import GridSearchCV
+
+    search = GridSearchCV(_rf_pipeline(), RF_SEARCH_SPACE, cv=3, scoring="accuracy", n_jobs=n_jobs, refit=False)
+    search.fit(tokens, y)
+
+    scores = search.cv_results_["mean_test_score"]
+    candidates = [p for p, score in zip(search.cv_results_["params"], scores) if score >= scores.max() - RF_SCORE_TOLERANCE]
+
+    def compactness(p):
+        unbounded = float("inf")
+        return (
+            p["rf__n_estimators"],
+            p["rf__max_depth"] or unbounded,
+            -p["rf__min_samples_leaf"],
+            p["tfidf__max_features"] or unbounded,
+        )
+
+    print(f"Recherche Random Forest: meilleure accuracy CV {scores.max():.4f}, {len(candidates)} configurations équivalentes")
+    return min(candidates, key=compactness)
+
+def fit_random_forest(tokens, y, train_idx, params, n_jobs=-1):
+    """
+    Ajuste le TF-IDF sur tout le corpus et la forêt sur les lignes d'entraînement, sur tous les cœurs.
+    Returns:
+        tuple: (tfidf, rfc)
+    """
+    pipeline = _rf_pipeline(n_jobs=n_jobs).set_params(**params)
+    tfidf = pipeline.named_steps["tfidf"]
+    rfc = pipeline.named_steps["rf"]
+
+    X_tfidf = tfidf.fit_transform(tokens)
+    rfc.fit(X_tfidf[train_idx], y.iloc[train_idx])
+
+    # Au service, une requête = une ligne : le pool de threads de joblib coûterait plus qu'il ne rapporte
+    rfc.n_jobs = 1
+    return tfidf, rfc
+
+def random_forest_report(output_dir, params, sample_tokens):
+    """
+    Taille, temps de chargement et latence de prédiction unitaire de l'artefact Random Forest,
+    affichés et sauvegardés dans random_forest_report.json.
+    """
+    rf_path = os.path.join(output_dir, 'random_forest.joblib')
+    tfidf_path = os.path.join(output_dir, 'tfidf_vectorizer.joblib')
+
+    start = time.perf_counter()
+    tfidf, rfc = joblib.load(tfidf_path), joblib.load(rf_path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for text in sample_tokens:
+        start = time.perf_counter()
+        rfc.predict_proba(tfidf.transform([text]))
+        timings.append((time.perf_counter() - start) * 1000)
+
+    report = {
+        "params": {name: value for name, value in params.items()},
+        "size_kb": (os.path.getsize(rf_path) + os.path.getsize(tfidf_path)) / 1024,
+        "load_ms": load_ms,
+        "predict_p50_ms": float(np.percentile(timings, 50)),
+        "predict_p99_ms": float(np.percentile(timings, 99)),
+        "n_nodes": int(sum(tree.tree_.node_count for tree in rfc.estimators_)),
+        "vocabulary": len(tfidf.vocabulary_),
+    }
+    with atomic_write(os.path.join(output_dir, 'random_forest_report.json')) as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Random Forest: {report['size_kb']:.0f} Ko (compressé), chargement {load_ms:.0f} ms, "
+          f"prédiction unitaire p50 {report['predict_p50_ms']:.2f} ms / p99 {report['predict_p99_ms']:.2f} ms")
+    return report
+
+def train_models(publish=True):
+    """
+    Entraîne et sauvegarde tous les modèles dans un nouveau dossier de version
+    Args:
+        publish (bool): Publie la version (pointeur CURRENT) une fois tous les fichiers écrits
     Returns:
         tuple: (tfidf, rfc, model_embed, df, embeddings, categories)
     """
+    # Dépendances d'entraînement importées ici : le chargement des modèles pour le service n'en a pas besoin
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from sentence_transformers import SentenceTransformer
 
     # Chargement du dataset
     INPUT_FILE = os.path.join(DATA_DIR, "banking_dataset_tokenize.csv")
     df = pd.read_csv(INPUT_FILE, encoding="utf-8")
     print(f"Données chargées: {len(df)} échantillons")
 
-    # Entraînement TF-IDF & RandomForest
-    print("Entraînement TF-IDF et Random Forest...")
-    tfidf = TfidfVectorizer()
-    X_tfidf = tfidf.fit_transform(df["tokens"])
+    # Split des données (mêmes lignes d'entraînement pour la forêt et les centroïdes)
+    train_idx, _ = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    tokens = df["tokens"].fillna("")
     y = df["category"]
+
+    # Entraînement TF-IDF & RandomForest : configuration compacte choisie par une petite recherche
+    print("Entraînement TF-IDF et Random Forest...")
+    params = search_random_forest(tokens.iloc[train_idx], y.iloc[train_idx]) if RF_SEARCH else RF_DEFAULT_PARAMS
+    tfidf, rfc = fit_random_forest(tokens, y, train_idx, params)
+    print(f"Random Forest entraîné ({params})")
+
+    # Nouveau dossier de version (jamais à la place des fichiers servis) ; l'encodeur y est sauvegardé
+    # d'abord : son hash de contenu identifie le modèle dans le cache d'embeddings
+    version, output_dir = create_version_dir()
+    try:
+        model_embed = SentenceTransformer(EMBEDDING_MODEL)
+        model_hash = save_encoder(model_embed, output_dir)
+
+        # Génération des embeddings : seuls les textes absents du cache passent dans l'encodeur
+        print("Génération des embeddings...")
+        cache = EmbeddingCache(f"{EMBEDDING_MODEL}-{model_hash[:16]}")
+        embeddings = encode_with_cache(model_embed, df["instruction_clean"].fillna("").tolist(), cache)
+        categories = df["category"].values
+        print("Embeddings générés")
+
+        # Classifieur par centroïdes, entraîné sur les mêmes lignes que la forêt
+        centroids = NearestCentroidClassifier().fit(embeddings[train_idx], categories[train_idx])
+        print("Classifieur par centroïdes entraîné")
+
+        # Sauvegarde des modèles dans le dossier de version
+        print(f"Sauvegarde des modèles (version {version})...")
+        joblib.dump(tfidf, os.path.join(output_dir, 'tfidf_vectorizer.joblib'), compress=RF_COMPRESS)
+        joblib.dump(rfc, os.path.join(output_dir, 'random_forest.joblib'), compress=RF_COMPRESS)
+        random_forest_report(output_dir, params, tokens.iloc[:200].tolist())
+        centroids.save(os.path.join(output_dir, 'category_centroids.npz'))
+
+        # Table de lemmes qui a produit la colonne tokens : le service normalise les questions avec la même
+        if lemma_table_exists(DATA_DIR):
+            load_lemma_table(DATA_DIR).save(os.path.join(output_dir, LEMMA_TABLE_FILE))
+        else:
+            print("Pas de table de lemmes : relancez tokenize_lemmatise (questions non normalisées au service)")
     
-    # Split des données
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_tfidf, y, test_size=0.2, random_state=42
-    )
-
-    # Entraînement Random Forest
-    rfc = RandomForestClassifier()
-    rfc.fit(X_train, y_train)
-    print("Random Forest entraîné")
-
-    # Génération des embeddings
-    print("Génération des embeddings...")
-    model_embed = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-    embeddings = model_embed.encode(df["instruction_clean"].tolist())
-    categories = df["category"].values
-    print("Embeddings générés")
-
-    # Sauvegarde des modèles
-    print("Sauvegarde des modèles...")
-    joblib.dump(tfidf, os.path.join(MODEL_DIR, 'tfidf_vectorizer.joblib'))
-    joblib.dump(rfc, os.path.join(MODEL_DIR, 'random_forest.joblib'))
-    joblib.dump(model_embed, os.path.join(MODEL_DIR, 'sentence_transformer.joblib'))
-    
-    # Sauvegarde des embeddings et metadata
-    np.save(os.path.join(MODEL_DIR, 'embeddings.npy'), embeddings)
-    df.to_csv(os.path.join(MODEL_DIR, 'dataset_metadata.csv'), index=False)
+        # Sauvegarde des embeddings et metadata au format mmap versionné
+        save_artifacts(output_dir, df["category"], df["intent"], df["response"], embeddings)
+
+        # Index vectoriel construit hors ligne sur les artefacts (triés par catégorie, normalisés)
+        print(f"Construction de l'index vectoriel ({VECTOR_INDEX}, {INDEX_STORAGE})...")
+        metadata = load_artifacts(output_dir)
+        index = build_index(VECTOR_INDEX, metadata.embeddings, metadata.row_category_codes(), storage=INDEX_STORAGE)
+        save_index(index, output_dir)
+
+        # Export ONNX quantifié de l'encodeur, vérifié par parité avec PyTorch (NLP_ONNX_EXPORT=0 : pas d'export)
+        if ONNX_EXPORT:
+            export_onnx(model_embed, output_dir)
+    except BaseException:
+        # Échec : le dossier incomplet est supprimé, la version servie reste inchangée
+        discard_version(version)
+        raise
+    complete_version(version)
+
+    # Publication atomique : les serveurs rechargent la nouvelle version en arrière-plan
+    if publish:
+        publish_version(version)
     
     return tfidf, rfc, model_embed, df, embeddings, categories
 
-def load_trained_models():
+def migrate_legacy_metadata(model_dir):
+    """
+    Convertit les anciens fichiers dataset_metadata.csv + embeddings.npy
+    vers le format d'artefacts versionné (une seule fois).
+    """
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(model_dir, 'dataset_metadata.csv'))
+    embeddings = np.load(os.path.join(model_dir, 'embeddings.npy'))
+    save_artifacts(model_dir, df["category"], df["intent"], df["response"], embeddings)
+    print("Métadonnées converties au format d'artefacts versionné")
+
+def load_encoder(model_dir, backend=None):
+    """
+    Charge l'encodeur de phrases du backend demandé (ENCODER_BACKEND par défaut).
+    Le backend ONNX est abandonné au profit de PyTorch s'il est absent ou si la parité échoue.
+    """
+    backend = backend or ENCODER_BACKEND
+    if backend == "onnx":
+        if onnx_encoder_exists(model_dir):
+            try:
+                return load_onnx_encoder(model_dir)
+            except (ImportError, ValueError) as e:
+                print(f"Encodeur ONNX indisponible, retour à PyTorch: {e}")
+        else:
+            print("Pas d'encodeur ONNX dans cette version, retour à PyTorch")
+    return load_torch_encoder(model_dir)
+
+def load_trained_models(model_dir=None, classifier=None, encoder_backend=None):
     """
     Charge les modèles pré-entraînés
+    Args:
+        model_dir (str): Dossier de version à charger (la version publiée par défaut)
+        classifier (str): Classifieur de catégories à charger (CATEGORY_CLASSIFIER par défaut)
+        encoder_backend (str): Backend de l'encodeur, "torch" ou "onnx" (ENCODER_BACKEND par défaut)
     Returns:
-        tuple: (tfidf, rfc, model_embed, df, embeddings, categories)
+        tuple: (tfidf, rfc, model_embed, metadata, centroids, index, normalizer) où metadata est un
+        ServingArtifacts (embeddings normalisés, intentions et réponses ouverts en mmap), index l'index
+        vectoriel et normalizer la table de lemmes appliquée avant le TF-IDF.
+        Seul le classifieur choisi est chargé : (tfidf, rfc, normalizer) ou centroids, les autres valent None.
     """
     
+    model_dir = model_dir or version_dir()
+    classifier = classifier or CATEGORY_CLASSIFIER
+    if classifier not in CATEGORY_CLASSIFIERS:
+        raise ValueError(f"Classifieur inconnu: {classifier} (attendu: {CATEGORY_CLASSIFIERS})")
+
     try:
-        tfidf = joblib.load(os.path.join(MODEL_DIR, 'tfidf_vectorizer.joblib'))
-        rfc = joblib.load(os.path.join(MODEL_DIR, 'random_forest.joblib'))
-        model_embed = joblib.load(os.path.join(MODEL_DIR, 'sentence_transformer.joblib'))
+        tfidf = rfc = centroids = normalizer = None
+        if classifier == "centroid":
+            centroids = NearestCentroidClassifier.load(os.path.join(model_dir, 'category_centroids.npz'))
+        else:
+            tfidf = joblib.load(os.path.join(model_dir, 'tfidf_vectorizer.joblib'))
+            rfc = joblib.load(os.path.join(model_dir, 'random_forest.joblib'))
+            if lemma_table_exists(model_dir):
+                normalizer = load_lemma_table(model_dir)
+        model_embed = load_encoder(model_dir, encoder_backend)
         
-        df = pd.read_csv(os.path.join(MODEL_DIR, 'dataset_metadata.csv'))
-        embeddings = np.load(os.path.join(MODEL_DIR, 'embeddings.npy'))
-        categories = df["category"].values
+        if not artifacts_exist(model_dir):
+            migrate_legacy_metadata(model_dir)
+        metadata = load_artifacts(model_dir)
+
+        # Sans index sauvegardé (anciennes versions), recherche exacte sur les tranches par catégorie
+        if index_exists(model_dir):
+            index = load_index(model_dir, metadata.embeddings)
+        else:
+            index = FlatIndex.from_sorted(metadata.embeddings, metadata.category_offsets)
         
         print("Modèles chargés avec succès!")
-        return tfidf, rfc, model_embed, df, embeddings, categories
+        return tfidf, rfc, model_embed, metadata, centroids, index, normalizer
         
     except FileNotFoundError as e:
         print(f"Erreur: Modèles non trouvés. Veuillez d'abord exécuter l'entraînement.")
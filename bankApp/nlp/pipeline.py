@@ -0,0 +1,307 @@
+#bankApp/nlp/pipeline.py
+# Exécute le pipeline NLP (génération -> nettoyage -> EDA / lemmatisation -> entraînement -> évaluation)
+# comme un graphe d'étapes aux entrées et sorties déclarées :
+#   - une étape dont le hash des entrées (fichiers de données + code) n'a pas changé est sautée ;
+#   - les étapes indépendantes (EDA et lemmatisation/entraînement) tournent en parallèle ;
+#   - la durée et la taille des sorties de chaque étape sont enregistrées.
+#
+#   python -m bankApp.nlp.pipeline
+#   python -m bankApp.nlp.pipeline --force model_training
+#   python -m bankApp.nlp.pipeline --only tokenize_lemmatise model_training --dry-run
+import os
+import sys
+import ast
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from bankApp.nlp.model_registry import MODEL_DIR, VERSIONS_DIR, CURRENT_FILE
+from bankApp.nlp.atomic_io import atomic_write
+
+# Configuration des chemins
+NLP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.normpath(os.path.join(NLP_DIR, "..", "data"))
+PROJECT_DIR = os.path.normpath(os.path.join(NLP_DIR, "..", ".."))
+STATE_FILE = os.path.join(DATA_DIR, "pipeline_state.json")
+LOG_DIR = os.path.join(DATA_DIR, "pipeline_logs")
+
+def _data(name):
+    return os.path.join(DATA_DIR, name)
+
+def _code(*names):
+    return [os.path.join(NLP_DIR, name) for name in names]
+
+def _module_file(module):
+    # Fichier source d'un module du projet, None pour un paquet ou un module extérieur
+    path = os.path.join(PROJECT_DIR, *module.split(".")) + ".py"
+    return path if os.path.isfile(path) else None
+
+def _project_imports(path):
+    # Modules bankApp importés par un fichier, au niveau du module comme dans les fonctions
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            # from bankApp.nlp import artifacts : le nom importé peut être un sous-module
+            modules.add(node.module)
+            modules.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return {module for module in modules if module.split(".")[0] == "bankApp"}
+
+def module_code(module):
+    """
+    Code exécuté par un module : son fichier et, transitivement, ceux des modules du projet qu'il importe.
+    Args:
+        module (str): Nom du module (ex. bankApp.nlp.model_evaluation)
+    Returns:
+        list: Chemins des fichiers source, triés
+    """
+    files, pending = set(), [module]
+    while pending:
+        path = _module_file(pending.pop())
+        if path is None or path in files:
+            continue
+        files.add(path)
+        pending.extend(_project_imports(path))
+    return sorted(files)
+
+class Stage:
+    """
+    Étape du pipeline : un module lancé avec `python -m`, ses étapes amont,
+    ses entrées (données et code, dont le hash décide de la réexécution) et ses sorties.
+    Le code de l'étape est son module et tous les modules du projet qu'il importe (module_code),
+    plus les fichiers de `code` qu'il lit sans les importer.
+    """
+
+    def __init__(self, name, deps=(), inputs=(), code=(), outputs=()):
+        self.name = name
+        self.module = f"bankApp.nlp.{name}"
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.code = tuple(sorted(set(module_code(self.module)) | set(_code(*code))))
+        self.outputs = tuple(outputs)
+
+# Graphe des étapes, dans l'ordre du readme (preduction_service est l'interface de chat, pas une étape de build)
+STAGES = [
+    Stage("data_generation",
+          outputs=[_data("banking_dataset.csv")]),
+    Stage("ponctuations", deps=["data_generation"],
+          inputs=[_data("banking_dataset.csv")],
+          outputs=[_data("banking_dataset_clean.csv")]),
+    Stage("eda", deps=["ponctuations"],
+          inputs=[_data("banking_dataset_clean.csv")],
+          outputs=[_data("eda_fig")]),
+    Stage("tokenize_lemmatise", deps=["ponctuations"],
+          inputs=[_data("banking_dataset_clean.csv")],
+          outputs=[_data("banking_dataset_tokenize.csv"), _data("lemma_table.json")]),
+    Stage("model_training", deps=["tokenize_lemmatise"],
+          inputs=[_data("banking_dataset_tokenize.csv"), _data("lemma_table.json")],
+          outputs=[CURRENT_FILE, VERSIONS_DIR]),
+    Stage("model_evaluation", deps=["model_training"],
+          inputs=[_data("banking_dataset_tokenize.csv"), CURRENT_FILE],
+          outputs=[os.path.join(MODEL_DIR, name) for name in
+                   ("confusion_matrix.png", "feature_importance.png", "cross_validation_scores.png")]),
+]
+
+def _walk_files(path):
+    # Fichiers d'un chemin (lui-même s'il s'agit d'un fichier), triés pour un hash reproductible
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, _, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names)
+    return sorted(files)
+
+class FileHasher:
+    """
+    Hash SHA-256 du contenu des fichiers, mémorisé par (taille, date de modification) :
+    un gros CSV inchangé n'est pas relu à chaque exécution.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = dict(memo or {})
+        self._lock = threading.Lock()
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            cached = self.memo.get(path)
+        if cached is not None and cached[:2] == key:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        with self._lock:
+            self.memo[path] = key + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def stage_hash(self, stage):
+        # Hash des entrées et du code de l'étape ; une entrée absente est prise en compte comme telle
+        digest = hashlib.sha256(stage.module.encode("utf-8"))
+        for path in stage.inputs + stage.code:
+            digest.update(os.path.relpath(path, PROJECT_DIR).encode("utf-8"))
+            if not os.path.exists(path):
+                digest.update(b"<absent>")
+                continue
+            for file_path in _walk_files(path):
+                digest.update(self.file_hash(file_path).encode("ascii"))
+        return digest.hexdigest()
+
+def output_sizes(stage):
+    # Taille (octets) de chaque sortie de l'étape ; None si absente
+    sizes = {}
+    for path in stage.outputs:
+        name = os.path.relpath(path, PROJECT_DIR)
+        if os.path.exists(path):
+            sizes[name] = sum(os.path.getsize(f) for f in _walk_files(path))
+        else:
+            sizes[name] = None
+    return sizes
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {"stages": {}, "file_hashes": {}}
+    with open(STATE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state):
+    with atomic_write(STATE_FILE) as f:
+        json.dump(state, f, indent=2)
+
+def run_stage(stage):
+    """
+    Lance l'étape dans un sous-processus (sortie dans pipeline_logs/<étape>.log).
+    Returns:
+        tuple: (code de retour, durée en secondes)
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, f"{stage.name}.log"), "w", encoding="utf-8") as log:
+        process = subprocess.run(
+            [sys.executable, "-m", stage.module],
+            cwd=PROJECT_DIR, stdout=log, stderr=subprocess.STDOUT,
+        )
+    return process.returncode, time.perf_counter() - start
+
+def _log_tail(stage, lines=20):
+    with open(os.path.join(LOG_DIR, f"{stage.name}.log"), encoding="utf-8", errors="replace") as f:
+        return "".join(f.readlines()[-lines:])
+
+def _select(stages, only):
+    # Étapes demandées et toutes leurs étapes amont
+    if not only:
+        return list(stages)
+    by_name = {stage.name: stage for stage in stages}
+    selected, pending = set(), list(only)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise ValueError(f"Étape inconnue: {name} (attendues: {list(by_name)})")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in selected]
+
+def run_pipeline(stages=STAGES, only=None, force=(), jobs=2, dry_run=False):
+    """
+    Exécute le graphe d'étapes : chaque étape démarre dès que ses étapes amont sont terminées.
+    Args:
+        only (list): Étapes à exécuter (avec leurs étapes amont), toutes par défaut
+        force (list): Étapes à réexécuter même si leurs entrées n'ont pas changé
+        jobs (int): Nombre maximal d'étapes simultanées
+        dry_run (bool): Affiche les étapes à exécuter sans les lancer
+    Returns:
+        dict: {étape: {"status", "wall_s", "outputs"}} ; status vaut run, skipped, failed ou blocked
+    """
+    stages = _select(stages, only)
+    state = load_state()
+    hasher = FileHasher(state.get("file_hashes"))
+    results = {}
+    state_lock = threading.Lock()
+
+    def is_fresh(stage, input_hash):
+        previous = state["stages"].get(stage.name)
+        return (
+            stage.name not in force
+            and previous is not None
+            and previous.get("input_hash") == input_hash
+            and all(os.path.exists(path) for path in stage.outputs)
+        )
+
+    def execute(stage, upstream_pending):
+        input_hash = hasher.stage_hash(stage)
+        if not upstream_pending and is_fresh(stage, input_hash):
+            return {"status": "skipped", "wall_s": 0.0, "outputs": output_sizes(stage)}
+        if dry_run:
+            return {"status": "pending", "wall_s": 0.0, "outputs": {}}
+
+        print(f"-> {stage.name}")
+        returncode, wall_s = run_stage(stage)
+        result = {"status": "run" if returncode == 0 else "failed", "wall_s": wall_s, "outputs": output_sizes(stage)}
+        if returncode != 0:
+            print(f"Échec de {stage.name} (code {returncode}), fin du journal :\n{_log_tail(stage)}")
+            return result
+
+        with state_lock:
+            state["stages"][stage.name] = {"input_hash": input_hash, **result, "finished_at": time.time()}
+            state["file_hashes"] = hasher.memo
+            save_state(state)
+        return result
+
+    # Ordonnancement : une étape est soumise quand toutes ses étapes amont ont réussi (ou sont à jour)
+    # (en simulation, une étape dont l'amont serait réexécuté est elle aussi à réexécuter)
+    selected = {stage.name for stage in stages}
+    remaining = list(stages)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        running = {}
+        while remaining or running:
+            for stage in list(remaining):
+                dep_status = [results.get(dep, {}).get("status") for dep in stage.deps if dep in selected]
+                if any(status in ("failed", "blocked") for status in dep_status):
+                    results[stage.name] = {"status": "blocked", "wall_s": 0.0, "outputs": {}}
+                    remaining.remove(stage)
+                elif all(status in ("run", "skipped", "pending") for status in dep_status):
+                    upstream_pending = "pending" in dep_status
+                    running[executor.submit(execute, stage, upstream_pending)] = stage
+                    remaining.remove(stage)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future).name] = future.result()
+
+    return {stage.name: results[stage.name] for stage in stages}
+
+def print_report(results):
+    print("\nÉtape                  Statut    Durée (s)   Sorties")
+    for name, result in results.items():
+        outputs = ", ".join(
+            f"{os.path.basename(path)}={size / 2**20:.2f} Mo" if size is not None else f"{os.path.basename(path)}=absent"
+            for path, size in result["outputs"].items()
+        )
+        print(f"{name:22s} {result['status']:9s} {result['wall_s']:9.1f}   {outputs}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline NLP avec cache par hash des entrées")
+    parser.add_argument("--only", nargs="+", help="Étapes à exécuter (avec leurs étapes amont)")
+    parser.add_argument("--force", nargs="+", default=[], help="Étapes à réexécuter quoi qu'il arrive")
+    parser.add_argument("--jobs", type=int, default=2, help="Étapes simultanées (EDA en parallèle de l'entraînement)")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche les étapes à exécuter sans les lancer")
+    args = parser.parse_args()
+
+    results = run_pipeline(only=args.only, force=set(args.force), jobs=args.jobs, dry_run=args.dry_run)
+    print_report(results)
+    if any(result["status"] in ("failed", "blocked") for result in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,74 @@
 import os
-import pandas as pd
 import re
+import numpy as np
+from bankApp.nlp.atomic_io import atomic_path
 
 # Définir les chemins
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 INPUT_FILE = os.path.join(DATA_DIR, "banking_dataset.csv")
 OUTPUT_FILE = os.path.join(DATA_DIR, "banking_dataset_clean.csv")
 
-# Charger le dataset
-df = pd.read_csv(INPUT_FILE)
+# Lignes lues par bloc : la mémoire utilisée ne dépend pas de la taille du fichier
+CHUNK_SIZE = 200_000
 
-# Fonction pour nettoyer le texte
-def remove_ponctuation(text):
-    
-    # Convertir le texte en minuscule
-    text = text.lower()
-    
-    # Supprimer la ponctuation et caractères spéciaux
-    text = re.sub(r"[^a-z0-9àâçéèêëîïôûù]", " ", text)
+# Nombre maximal de phrases nettoyées gardées en mémoire d'un bloc à l'autre
+MEMO_SIZE = 1_000_000
 
-    # Supprimer les espaces multiples
-    text = re.sub(r"\s+", " ", text).strip()
-    
-    return text
+# Ponctuation, caractères spéciaux et espaces (une suite de ces caractères devient un seul espace)
+NON_WORD_PATTERN = re.compile(r"[^a-z0-9àâçéèêëîïôûù]+")
 
-# Appliquer la fonction
-df["instruction_clean"] = df["instruction"].apply(remove_ponctuation)
+def normalize_text(text):
+    """
+    Normalisation partagée par le pipeline d'entraînement et le service :
+    minuscules, ponctuation et caractères spéciaux remplacés par des espaces, espaces multiples supprimés.
+    """
+    return NON_WORD_PATTERN.sub(" ", text.lower()).strip()
 
-# Sauvegarder dans un nouveau fichier CSV
-df.to_csv(OUTPUT_FILE, index=False)
+# Ancien nom de la fonction de nettoyage
+remove_ponctuation = normalize_text
 
-  
-print(df)
\ No newline at end of file
+def normalize_series(texts):
+    """
+    Version vectorisée de normalize_text (opérations .str de pandas) : chaque phrase distincte
+    n'est nettoyée qu'une fois, puis le résultat est recopié sur les lignes identiques.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(texts)
+    cleaned = pd.Series(uniques, dtype=object).str.lower().str.replace(NON_WORD_PATTERN, " ", regex=True).str.strip()
+    # Code -1 (valeur manquante) -> dernier élément ajouté, None
+    cleaned = np.append(cleaned.to_numpy(dtype=object), None)
+    return pd.Series(cleaned[codes], index=texts.index, dtype=object)
+
+def clean_dataset(input_file=INPUT_FILE, output_file=OUTPUT_FILE, chunk_size=CHUNK_SIZE):
+    """
+    Lit le CSV par blocs, ajoute la colonne instruction_clean et écrit le résultat bloc par bloc.
+    Les phrases déjà nettoyées dans un bloc précédent ne sont pas retraitées.
+    Returns:
+        int: Nombre de lignes écrites
+    """
+    import pandas as pd
+
+    memo = {}
+    rows = 0
+    # Le fichier n'apparaît qu'une fois complet
+    with atomic_path(output_file) as tmp_file:
+        for i, chunk in enumerate(pd.read_csv(input_file, chunksize=chunk_size)):
+            instructions = chunk["instruction"]
+            known = instructions.isin(memo.keys()).to_numpy()
+            cleaned = normalize_series(instructions[~known])
+            values = instructions.map(memo).to_numpy(dtype=object)
+            values[~known] = cleaned.to_numpy()
+            chunk["instruction_clean"] = values
+
+            # Mémoire bornée entre blocs
+            if len(memo) < MEMO_SIZE:
+                memo.update(zip(instructions[~known], cleaned))
+
+            chunk.to_csv(tmp_file, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+            rows += len(chunk)
+    return rows
+
+if __name__ == "__main__":
+    rows = clean_dataset()
+    print(f"Dataset nettoyé: {rows} lignes -> {OUTPUT_FILE}")
@@ -1,102 +1,380 @@
 import os
-import pandas as pd
+import threading
+import time
+import weakref
 import numpy as np
-from spellchecker import SpellChecker
-from sklearn.metrics.pairwise import cosine_similarity
-from bankApp.nlp.model_training import load_trained_models
+from bankApp.nlp.ponctuations import normalize_text
+
+# Les dépendances lourdes (pandas, sklearn, sentence_transformers/torch, spellchecker)
+# sont importées à la demande : importer ce module (et donc l'application Flask) reste rapide.
 
 # Configuration
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 MODEL_DIR = os.path.join(DATA_DIR, "models")
 
-# Correcteur orthographique
-spell = SpellChecker(language='fr')
+# Intervalle (secondes) de vérification d'une nouvelle version publiée ; 0 désactive le rechargement
+MODEL_RELOAD_INTERVAL = float(os.environ.get("NLP_MODEL_RELOAD_INTERVAL", "30"))
+
+# Correcteur orthographique (dictionnaire français construit au premier usage)
+spell = None
 
 # Réponse par défaut
 DEFAULT_RESPONSE = "Je n'ai pas compris votre question, pouvez-vous reformuler ?"
 
-# Variables globales pour stocker les modèles et données
-tfidf = None
-rfc = None
-model_embed = None
-df = None
-embeddings = None
-categories = None
-models_loaded = False
+# Si l'écart de probabilité entre les deux meilleures catégories est inférieur à cette marge,
+# la recherche d'intention porte sur les deux catégories (0, par défaut, désactive)
+CATEGORY_MARGIN = float(os.environ.get("NLP_CATEGORY_MARGIN", "0"))
 
-def initialize_prediction_service():
-    # Initialise les modèles et données nécessaires pour les prédictions
-    
-    global tfidf, rfc, model_embed, df, embeddings, categories, models_loaded
-    
-    print("Initialisation du service de prédiction...")
-    
-    models = load_trained_models()
+# Taille initiale de la réserve de candidats par intention demandée (fusion des doublons)
+CANDIDATE_POOL = 4
+
+# Question utilisée pour préchauffer les modèles (allocations paresseuses de torch et du tokenizer)
+WARMUP_QUESTION = "Comment activer ma nouvelle carte bancaire ?"
+
+class ModelBundle:
+    """
+    Ensemble immuable des modèles d'une version : jamais modifié après construction.
+    Une requête lit la référence courante une seule fois et travaille sur un ensemble cohérent,
+    même si une nouvelle version est échangée pendant son traitement.
+    """
+    __slots__ = (
+        "version", "tfidf", "rfc", "model_embed", "metadata", "centroids", "index", "normalizer", "__weakref__"
+    )
+
+    def __init__(self, version, tfidf, rfc, model_embed, metadata, centroids=None, index=None, normalizer=None):
+        if index is None:
+            from bankApp.nlp.vector_index import FlatIndex
+            index = FlatIndex.from_sorted(metadata.embeddings, metadata.category_offsets)
+        values = (version, tfidf, rfc, model_embed, metadata, centroids, index, normalizer)
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelBundle est immuable")
+
+# Ensemble de modèles servi. Son remplacement est une simple affectation de référence (atomique) :
+# les lecteurs n'ont besoin d'aucun verrou.
+_bundle = None
+service_ready = False
+
+# Verrou empêchant plusieurs threads de charger les modèles en parallèle (jamais pris par les lecteurs)
+_init_lock = threading.Lock()
+_reloader = None
+
+def load_bundle(version=None):
+    """
+    Charge et préchauffe un ensemble complet de modèles, hors du chemin des requêtes.
+    Args:
+        version (str): Version à charger (la version publiée par défaut)
+    Returns:
+        ModelBundle
+    """
+    from bankApp.nlp.model_registry import current_version, version_dir
+    from bankApp.nlp.model_training import load_trained_models
+
+    version = version or current_version()
+    models = load_trained_models(version_dir(version))
     if models is None:
         raise Exception("Impossible de charger les modèles. Exécutez d'abord l'entraînement.")
+
+    bundle = ModelBundle(version, *models)
+    predict(bundle, WARMUP_QUESTION)
+    return bundle
+
+def initialize_prediction_service():
+    # Initialise les modèles et données nécessaires pour les prédictions
+    global _bundle
     
-    tfidf, rfc, model_embed, df, embeddings, categories = models
-    models_loaded = True
-    print("Service de prédiction initialisé!")
+    with _init_lock:
+        if _bundle is not None:
+            return
+
+        print("Initialisation du service de prédiction...")
+        _bundle = load_bundle()
+        print("Service de prédiction initialisé!")
+
+def get_bundle():
+    # Ensemble de modèles courant (chargé au premier appel si warm_up n'a pas été exécuté)
+    bundle = _bundle
+    if bundle is None:
+        initialize_prediction_service()
+        bundle = _bundle
+    return bundle
+
+def swap_bundle(new_bundle):
+    """
+    Remplace atomiquement l'ensemble servi. L'ancien ensemble reste utilisé par les requêtes
+    en cours et est libéré quand la dernière d'entre elles se termine.
+    """
+    global _bundle
+
+    old_bundle = _bundle
+    _bundle = new_bundle
+    if old_bundle is not None:
+        old_version = old_bundle.version
+        weakref.finalize(old_bundle, print, f"Ancienne version de modèles libérée: {old_version}")
+    print(f"Version de modèles servie: {new_bundle.version}")
+
+def reload_if_updated():
+    """
+    Charge la version publiée si elle diffère de la version servie.
+    Returns:
+        bool: True si un nouvel ensemble a été échangé
+    """
+    from bankApp.nlp.model_registry import current_version
+
+    version = current_version()
+    bundle = _bundle
+    if bundle is None or version is None or version == bundle.version:
+        return False
+
+    with _init_lock:
+        if _bundle is not None and _bundle.version == version:
+            return False
+        # Le chargement complet et le préchauffage ont lieu ici, dans le thread de rechargement
+        swap_bundle(load_bundle(version))
+    return True
+
+def _reload_loop(interval):
+    # Boucle du thread de rechargement en arrière-plan
+    while True:
+        time.sleep(interval)
+        try:
+            reload_if_updated()
+        except Exception as e:
+            # Une version défectueuse n'interrompt pas le service : l'ancienne reste en place
+            print(f"Erreur lors du rechargement des modèles: {e}")
+
+def start_model_reloader(interval=MODEL_RELOAD_INTERVAL):
+    """
+    Démarre le thread qui surveille le pointeur de version publiée.
+    À appeler dans chaque processus servant des requêtes (après le fork : les threads n'y survivent pas).
+    """
+    global _reloader
+    if interval <= 0 or (_reloader is not None and _reloader.is_alive()):
+        return
+    _reloader = threading.Thread(target=_reload_loop, args=(interval,), name="model-reloader", daemon=True)
+    _reloader.start()
+
+def warm_up():
+    """
+    Charge les modèles et exécute une inférence de préchauffage.
+    À appeler dans le processus maître avant le fork des workers : les modèles
+    sont alors partagés en copy-on-write et aucune requête ne paie le démarrage à froid.
+    """
+    global service_ready
+
+    initialize_prediction_service()
+    service_ready = True
+    print("Service de prédiction préchauffé!")
+
+def warm_up_worker():
+    """
+    Préchauffe dans un worker, après le fork, les ressources propres à chaque processus
+    (session onnxruntime de l'encodeur ONNX) : la première requête n'en paie pas la création.
+    """
+    bundle = _bundle
+    if bundle is not None:
+        predict(bundle, WARMUP_QUESTION)
+
+def is_ready():
+    # Indique si les modèles sont chargés et préchauffés
+    return service_ready
+
+def get_spell_checker():
+    # Construit le correcteur orthographique au premier appel
+    global spell
+    if spell is None:
+        from spellchecker import SpellChecker
+        spell = SpellChecker(language='fr')
+    return spell
+
+def correct_texts(texts):
+    """
+    Correction orthographique d'un lot de textes : chaque mot distinct n'est corrigé qu'une fois
+    """
+    spell = get_spell_checker()
+    corrections = {}
+    corrected_texts = []
+    for text in texts:
+        corrected_words = []
+        for w in text.split():
+            if w not in corrections:
+                correction = spell.correction(w)
+                corrections[w] = correction if correction is not None else w
+            corrected_words.append(corrections[w])
+        corrected_texts.append(" ".join(corrected_words))
+    return corrected_texts
 
 def correct_text(text):
     """
     Correction orthographique du texte
     """
-    words = text.split()
-    corrected_words = []
-    for w in words:
-        correction = spell.correction(w)
-        corrected_words.append(correction if correction is not None else w)
-    return " ".join(corrected_words)
+    return correct_texts([text])[0]
+
+def category_probas(bundle, questions_clean, question_vecs):
+    """
+    Probabilités des catégories pour un lot de questions (un seul appel au classifieur).
+    Returns:
+        tuple: (probabilités (n, nb_catégories), classes)
+    """
+    # Centroïdes sur les embeddings déjà calculés, ou TF-IDF + Random Forest
+    if bundle.centroids is not None:
+        model, features = bundle.centroids, question_vecs
+    else:
+        # Lemmes et mots vides par la table de l'entraînement : même espace de variables que le TF-IDF
+        if bundle.normalizer is not None:
+            questions_clean = [bundle.normalizer.normalize(q) for q in questions_clean]
+        model, features = bundle.rfc, bundle.tfidf.transform(questions_clean)
+    return model.predict_proba(features), model.classes_
+
+def select_categories(probas, classes):
+    # La catégorie prédite, plus la deuxième si l'écart de probabilité est inférieur à CATEGORY_MARGIN
+    order = np.argsort(probas)[::-1][:2]
+    if len(order) > 1 and probas[order[0]] - probas[order[1]] < CATEGORY_MARGIN:
+        return list(classes[order])
+    return [classes[order[0]]]
+
+def rank_categories(bundle, question_clean, question_vec):
+    """
+    Catégories à explorer pour une question : la catégorie prédite, plus la deuxième
+    si l'écart de probabilité entre les deux est inférieur à CATEGORY_MARGIN.
+    """
+    probas, classes = category_probas(bundle, [question_clean], np.atleast_2d(question_vec))
+    return select_categories(probas[0], classes)
+
+def search_intents(bundle, question_vec, categories, top_n):
+    """
+    Recherche les top_n intentions distinctes les plus proches dans les catégories données.
+    Les instructions d'une même intention sont fusionnées (meilleur score conservé).
+    Returns:
+        list: [(score, catégorie, ligne)] triée par score décroissant
+    """
+    metadata = bundle.metadata
+    best = {}
+    for category in categories:
+        category_code = metadata.category_code(category)
+        if category_code is None:
+            continue
+
+        # Réserve de candidats élargie tant qu'elle ne contient pas assez d'intentions distinctes
+        k = top_n * CANDIDATE_POOL
+        while True:
+            scores, rows = bundle.index.search(question_vec, k=k, label=category_code)
+            found = {}
+            # Identifiants d'intention des candidats en une seule indexation (entiers Python)
+            for score, row, intent_id in zip(scores.tolist(), rows.tolist(), metadata.intent_ids[rows].tolist()):
+                found.setdefault(intent_id, (score, category, row))
+            if len(found) >= top_n or len(rows) < k:
+                break
+            k *= 4
+
+        for intent_id, candidate in found.items():
+            if intent_id not in best or candidate[0] > best[intent_id][0]:
+                best[intent_id] = candidate
+
+    return sorted(best.values(), key=lambda c: c[0], reverse=True)[:top_n]
+
+def _encode(bundle, questions_clean, batch_size=32):
+    # Embeddings des questions, normalisés (cosinus = produit scalaire)
+    vectors = np.asarray(bundle.model_embed.encode(questions_clean, batch_size=batch_size), dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def _candidates(bundle, question_vec, categories, top_n):
+    # Recherche des intentions les plus proches, filtrée sur les catégories retenues
+    answers = [
+        (category, bundle.metadata.answer(row), score)
+        for score, category, row in search_intents(bundle, question_vec, categories, top_n)
+    ]
+    return [(category, answer.intent, answer.response, float(score)) for category, answer, score in answers]
+
+def predict(bundle, question, top_n=1):
+    """
+    Exécute le pipeline de prédiction avec un ensemble de modèles donné.
+    Un seul passage de l'encodeur, quel que soit top_n et le nombre de catégories explorées.
+    Returns:
+        tuple: (catégorie_prédite, [(catégorie, intention, réponse, score)] triée par score décroissant)
+    """
+    # Même nettoyage que les instructions d'entraînement (ponctuation, casse), puis correction orthographique
+    question_clean = correct_text(normalize_text(question))
+
+    # Embedding de la question
+    question_vec = _encode(bundle, [question_clean])[0]
+
+    # Prédiction de la catégorie (et de la suivante si la marge est faible)
+    categories = rank_categories(bundle, question_clean, question_vec)
+
+    return categories[0], _candidates(bundle, question_vec, categories, top_n)
 
-def get_response(question, top_n=1, min_score=0.6):
+def predict_batch(bundle, questions, top_n=1, batch_size=64, timings=None):
+    """
+    Pipeline de prédiction par lots (évaluation, rejeu de trafic) : correction orthographique mutualisée,
+    encodeur et classifieur appelés une fois par lot au lieu d'une fois par question.
+    Args:
+        timings (dict): Si fourni, cumule la durée (s) de chaque étape : normalize, spell, encode, classify, search
+    Returns:
+        list: [(catégorie_prédite, candidats)] dans l'ordre des questions, comme predict
+    """
+    t0 = time.perf_counter()
+    questions_norm = [normalize_text(q) for q in questions]
+    t1 = time.perf_counter()
+    questions_clean = correct_texts(questions_norm)
+    t2 = time.perf_counter()
+    question_vecs = _encode(bundle, questions_clean, batch_size=batch_size)
+    t3 = time.perf_counter()
+    probas, classes = category_probas(bundle, questions_clean, question_vecs)
+    t4 = time.perf_counter()
+
+    results = []
+    for question_vec, question_probas in zip(question_vecs, probas):
+        categories = select_categories(question_probas, classes)
+        results.append((categories[0], _candidates(bundle, question_vec, categories, top_n)))
+
+    if timings is not None:
+        bounds = (t0, t1, t2, t3, t4, time.perf_counter())
+        for i, stage in enumerate(("normalize", "spell", "encode", "classify", "search")):
+            timings[stage] = timings.get(stage, 0.0) + bounds[i + 1] - bounds[i]
+    return results
+
+def get_response(question, min_score=0.6):
     """
     Traite une question utilisateur et retourne la réponse appropriée.
     
     Args:
         question (str): Question posée par l'utilisateur
-        top_n (int): Nombre de réponses à retourner
         min_score (float): Score de similarité minimum (0.0-1.0)
         
     Returns:
-        tuple: (catégorie_prédite, intention_détectée, réponse, score_confiance)
+        tuple: (catégorie_prédite, intention_détectée, réponse, score_confiance) ;
+        intention et réponse valent None si aucun candidat n'atteint min_score
     """
-    global tfidf, rfc, model_embed, df, embeddings, categories, models_loaded
-    
-    if not models_loaded:
-        initialize_prediction_service()
-    
-    # Correction orthographique
-    question_clean = correct_text(question)
-
-    # Prédiction de la catégorie avec TF-IDF + Random Forest
-    vec = tfidf.transform([question_clean])
-    predicted_category = rfc.predict(vec)[0]
+    # Une seule lecture de la référence : la requête utilise un ensemble cohérent de bout en bout
+    predicted_category, candidates = predict(get_bundle(), question)
 
-    # Filtrage des instructions par catégorie prédite
-    idx = np.where(categories == predicted_category)[0]
-    if len(idx) == 0:
+    if not candidates:
         return predicted_category, None, None, 0.0
 
-    category_embeddings = embeddings[idx]
-
-    # Recherche de similarité avec les embeddings
-    question_vec = model_embed.encode([question_clean])
-    sims = cosine_similarity(question_vec, category_embeddings)[0]
-
     # Identification de l'intention la plus proche
-    best_idx = sims.argmax()
-    best_score = sims[best_idx]
+    category, intent, response, score = candidates[0]
+    if score < min_score:
+        return predicted_category, None, None, score
 
-    if best_score < min_score:
-        return predicted_category, None, None, best_score
+    return category, intent, response, score
 
-    df_index = idx[best_idx]
-    predicted_intent = df.iloc[df_index]["intent"]
-    response = df.iloc[df_index]["response"]
-
-    return predicted_category, predicted_intent, response, float(best_score)
+def get_alternatives(question, top_n=3, min_score=0.6):
+    """
+    Intentions distinctes les plus proches d'une question (ex. "vouliez-vous dire…"), en une seule passe.
+    
+    Args:
+        question (str): Question posée par l'utilisateur
+        top_n (int): Nombre maximum d'intentions retournées
+        min_score (float): Score de similarité minimum (0.0-1.0)
+        
+    Returns:
+        list: [(catégorie, intention, réponse, score)] au-dessus de min_score, triée par score décroissant
+    """
+    _, candidates = predict(get_bundle(), question, top_n)
+    return [candidate for candidate in candidates if candidate[3] >= min_score]
 
 def chat_interface():
     # Interface de chat interactive
@@ -116,7 +394,7 @@ def chat_interface():
                 continue
             
             # Prédiction
-            response, score = get_response(question)
+            category, intent, response, score = get_response(question)
             
             if response:
                 print(f"Assistant [Niveau de confiance: {score:.2f}]: {response}")
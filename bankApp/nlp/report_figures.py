@@ -0,0 +1,131 @@
+#bankApp/nlp/report_figures.py
+# Rendu des figures des rapports (EDA, évaluation). Les figures sont indépendantes : elles sont rendues en
+# parallèle dans un pool de processus, et une figure n'est pas redessinée si ses données d'entrée, le code
+# de son module de tracé et la résolution n'ont pas changé (empreinte par figure dans figures_state.json,
+# dans le dossier de sortie). Mode aperçu : résolution réduite, pour itérer rapidement sur un rapport.
+import os
+import json
+import time
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from bankApp.nlp.atomic_io import atomic_write
+
+# Résolution des figures du rapport et du mode aperçu
+FIGURE_DPI = 300
+PREVIEW_DPI = 72
+
+# Empreintes des figures rendues (un fichier par dossier de sortie)
+STATE_FILE = "figures_state.json"
+
+class Figure:
+    """
+    Figure d'un rapport.
+    Args:
+        filename (str): Fichier produit dans le dossier de sortie
+        render (callable): Fonction de tracé render(args, path, dpi), définie au niveau d'un module
+            (envoyée aux processus du pool)
+        args: Arguments de render
+        inputs: Données JSON dont dépend la figure, pour l'empreinte (args par défaut)
+    """
+
+    def __init__(self, filename, render, args, inputs=None):
+        self.filename = filename
+        self.render = render
+        self.args = args
+        self.inputs = args if inputs is None else inputs
+
+def fingerprint(data):
+    # Empreinte stable d'une structure JSON
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+@lru_cache(maxsize=None)
+def _source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def figure_key(figure, dpi):
+    # Données, code du module de tracé (nom de fonction et hash du fichier, indépendant de __main__) et résolution
+    return fingerprint({
+        "render": figure.render.__qualname__,
+        "code": _source_hash(inspect.getsourcefile(figure.render)),
+        "dpi": dpi,
+        "inputs": figure.inputs,
+    })
+
+def load_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(output_dir, state):
+    with atomic_write(os.path.join(output_dir, STATE_FILE)) as f:
+        json.dump(state, f, indent=2)
+
+def _init_worker(setup):
+    # Backend sans affichage dans les processus du pool, puis style commun du rapport
+    import matplotlib
+    matplotlib.use("Agg")
+    if setup is not None:
+        setup()
+
+def _render(render, args, path, dpi):
+    start = time.perf_counter()
+    render(args, path, dpi)
+    return time.perf_counter() - start
+
+def render_figures(figures, output_dir, preview=False, jobs=None, setup=None, force=False):
+    """
+    Rend les figures dont l'empreinte a changé (ou dont le fichier est absent), en parallèle.
+    Args:
+        figures (list): Figures du rapport
+        output_dir (str): Dossier de sortie
+        preview (bool): Résolution réduite (PREVIEW_DPI)
+        jobs (int): Nombre de processus (défaut: un par figure à rendre, au plus le nombre de cœurs ; 1 : dans ce processus)
+        setup (callable): Configuration du style, appelée dans chaque processus
+        force (bool): Rendre toutes les figures
+    Returns:
+        dict: fichier -> durée de rendu en secondes, None si la figure était à jour
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    dpi = PREVIEW_DPI if preview else FIGURE_DPI
+    state = load_state(output_dir)
+
+    results, todo = {}, []
+    for figure in figures:
+        key = figure_key(figure, dpi)
+        path = os.path.join(output_dir, figure.filename)
+        if not force and state.get(figure.filename) == key and os.path.exists(path):
+            results[figure.filename] = None
+        else:
+            todo.append((figure, key, path))
+
+    # L'état est sauvegardé même si une figure échoue : les figures déjà rendues ne sont pas refaites
+    jobs = min(jobs or os.cpu_count() or 1, len(todo))
+    try:
+        if jobs <= 1:
+            if todo and setup is not None:
+                setup()
+            for figure, key, path in todo:
+                results[figure.filename] = _render(figure.render, figure.args, path, dpi)
+                state[figure.filename] = key
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(setup,)) as executor:
+                futures = [
+                    (figure, key, executor.submit(_render, figure.render, figure.args, path, dpi))
+                    for figure, key, path in todo
+                ]
+                for figure, key, future in futures:
+                    results[figure.filename] = future.result()
+                    state[figure.filename] = key
+    finally:
+        save_state(output_dir, state)
+    return results
+
+def print_render_report(results):
+    for filename, duration in results.items():
+        status = "inchangée" if duration is None else f"rendue en {duration:.1f} s"
+        print(f"   {filename}: {status}")
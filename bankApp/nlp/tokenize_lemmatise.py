@@ -1,39 +1,70 @@
 import os
 import pandas as pd
-import spacy
+from bankApp.nlp.lemma_table import build_lemma_table, LEMMA_TABLE_FILE
 
-# Définitions des chemins 
+# Définitions des chemins
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 INPUT_FILE = os.path.join(DATA_DIR, "banking_dataset_clean.csv")
 OUTPUT_FILE = os.path.join(DATA_DIR, "banking_dataset_tokenize.csv")
+LEMMA_TABLE_PATH = os.path.join(DATA_DIR, LEMMA_TABLE_FILE)
 
-nlp = spacy.load("fr_core_news_sm")
+# Paramètres de nlp.pipe : taille des lots et nombre de processus (1 = dans ce processus)
+BATCH_SIZE = int(os.environ.get("NLP_SPACY_BATCH_SIZE", "256"))
+N_PROCESS = int(os.environ.get("NLP_SPACY_PROCESSES", "1"))
 
-def clean_dataset():
+# Composants du pipeline spaCy inutiles pour les lemmes (le lemmatiseur n'a besoin que des étiquettes morphologiques)
+DISABLED_COMPONENTS = ["parser", "ner", "senter"]
 
+# Modèle spaCy chargé au premier usage (importer ce module ne charge rien)
+nlp = None
+
+def get_nlp():
+    global nlp
+    if nlp is None:
+        import spacy
+        nlp = spacy.load("fr_core_news_sm", disable=DISABLED_COMPONENTS)
+    return nlp
+
+def build_normalizer(texts, batch_size=BATCH_SIZE, n_process=N_PROCESS):
     """
-    Lit le CSV d'entrée, nettoie et lemmatise le texte, 
-    puis sauvegarde le résultat dans un nouveau CSV.
+    Lemmatise les phrases uniques par lots (nlp.pipe) et construit la table de lemmes.
+    Args:
+        texts (iterable): Phrases nettoyées (les doublons ne sont analysés qu'une fois)
+        batch_size (int): Taille des lots de nlp.pipe
+        n_process (int): Nombre de processus spaCy
+    Returns:
+        LemmaNormalizer
     """
-    df = pd.read_csv(INPUT_FILE, encoding="utf-8")
+    model = get_nlp()
+    unique_texts = list(dict.fromkeys(t for t in texts if isinstance(t, str)))
+    print(f"Lemmatisation de {len(unique_texts)} phrases uniques (lots de {batch_size}, {n_process} processus)")
+    docs = model.pipe(unique_texts, batch_size=batch_size, n_process=n_process)
+    return build_lemma_table(docs, model.Defaults.stop_words)
+
+def clean_dataset(input_file=INPUT_FILE, output_file=OUTPUT_FILE, batch_size=BATCH_SIZE, n_process=N_PROCESS):
 
-    def tokenize_and_lemmatize(text):
+    """
+    Lit le CSV d'entrée, nettoie et lemmatise le texte,
+    puis sauvegarde le résultat dans un nouveau CSV.
+    spaCy ne sert qu'à construire la table forme -> lemme du vocabulaire du corpus ;
+    la colonne tokens est produite par cette table (une consultation par phrase unique,
+    résultat recopié sur toutes les lignes identiques), exactement comme au service.
+    """
+    df = pd.read_csv(input_file, encoding="utf-8")
+    texts = df["instruction_clean"].fillna("")
 
-        """
-        Tokenise et lemmatise une phrase :
-        - Supprime les stop words
-        - Supprime les tokens non alphabétiques (ponctuation, chiffres)
-        - Retourne une chaîne de texte nettoyée
-        """
+    normalizer = build_normalizer(texts, batch_size=batch_size, n_process=n_process)
+    normalizer.save(LEMMA_TABLE_PATH)
+    print(f"Table de lemmes sauvegardée: {len(normalizer)} formes, {len(normalizer.stop_words)} mots vides")
 
-        doc = nlp(text)
-        tokens = [token.lemma_ for token in doc if not token.is_stop and token.is_alpha]
-        return " ".join(tokens)
+    # Normalisation des phrases uniques puis diffusion sur les lignes
+    codes, uniques = pd.factorize(texts)
+    tokens = pd.Series([normalizer.normalize(text) for text in uniques], dtype=object)
+    df["tokens"] = tokens.take(codes).to_numpy()
 
-    df["tokens"] = df["instruction_clean"].apply(tokenize_and_lemmatize)
+    df.to_csv(output_file, index=False, encoding="utf-8")
 
-    df.to_csv(OUTPUT_FILE, index=False, encoding="utf-8")
-    
     return df
 
-clean_dataset()
+if __name__ == "__main__":
+    clean_dataset()
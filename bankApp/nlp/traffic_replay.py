@@ -0,0 +1,292 @@
+#bankApp/nlp/traffic_replay.py
+# Rejeu du trafic réel (table conversations) sur une version candidate des modèles :
+# taux de désaccord par catégorie / intention, dérive de la confiance et débit par étape,
+# avant de publier la version. Le job est reprenable : un point de contrôle est écrit après chaque lot.
+#
+#   python -m bankApp.nlp.traffic_replay --model 20250101-120000-abc123
+#   python -m bankApp.nlp.traffic_replay --model /chemin/vers/modeles --jobs 4 --report replay.json
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from bankApp.nlp.atomic_io import atomic_write
+
+# Configuration des chemins
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+REPLAY_DIR = os.path.join(DATA_DIR, "replay")
+
+# Lignes lues par lot dans la base et envoyées à un processus
+CHUNK_SIZE = 2048
+
+# Catégorie enregistrée par l'application quand aucune réponse ne dépasse le seuil de confiance
+UNKNOWN_CATEGORY = "Inconnue"
+
+# Bornes de l'histogramme de dérive de confiance (score candidat - confiance servie)
+DRIFT_BOUNDS = (-0.5, -0.2, -0.1, -0.05, 0.05, 0.1, 0.2, 0.5)
+
+STAGES = ("normalize", "spell", "encode", "classify", "search")
+
+# Ensemble de modèles du processus de rejeu (chargé une fois par processus par _init_worker)
+_worker = None
+
+def resolve_model_dir(model):
+    # Chemin d'un dossier de modèles, ou nom d'une version de models/versions/
+    from bankApp.nlp.model_registry import version_dir
+
+    if model is not None and os.path.isdir(model):
+        return os.path.abspath(model)
+    path = version_dir(model)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Dossier de modèles introuvable: {model}")
+    return os.path.abspath(path)
+
+def _init_worker(model_dir, min_score, batch_size):
+    # Chargement et préchauffage de la version candidate, une fois par processus
+    global _worker
+    from bankApp.nlp.model_training import load_trained_models
+    from bankApp.nlp.preduction_service import ModelBundle, predict, WARMUP_QUESTION
+
+    models = load_trained_models(model_dir)
+    if models is None:
+        raise RuntimeError(f"Impossible de charger les modèles de {model_dir}")
+    bundle = ModelBundle(os.path.basename(os.path.normpath(model_dir)), *models)
+    predict(bundle, WARMUP_QUESTION)
+
+    # Réponse -> intention : la table ne stocke que la réponse servie
+    metadata = bundle.metadata
+    response_intents = {
+        metadata.responses[response_id]: metadata.intents[intent_id]
+        for response_id, intent_id in set(zip(metadata.response_ids.tolist(), metadata.intent_ids.tolist()))
+    }
+    _worker = (bundle, response_intents, min_score, batch_size)
+
+def _score_chunk(rows):
+    """
+    Re-score un lot de conversations avec la version candidate.
+    Returns:
+        tuple: ([(catégorie servie, intention servie, confiance servie,
+                  catégorie candidate, intention candidate, score candidat)], durées par étape)
+    """
+    from bankApp.nlp.preduction_service import predict_batch
+
+    bundle, response_intents, min_score, batch_size = _worker
+    timings = {}
+    predictions = predict_batch(bundle, [row[1] for row in rows], batch_size=batch_size, timings=timings)
+
+    results = []
+    for (_, _, bot_response, category, confidence), (_, candidates) in zip(rows, predictions):
+        served_intent = response_intents.get(bot_response, UNKNOWN_CATEGORY) if category != UNKNOWN_CATEGORY \
+            else UNKNOWN_CATEGORY
+        # Même règle de seuil que get_response / l'API
+        if candidates and candidates[0][3] >= min_score:
+            new_category, new_intent, _, score = candidates[0]
+        else:
+            new_category, new_intent = UNKNOWN_CATEGORY, UNKNOWN_CATEGORY
+            score = candidates[0][3] if candidates else 0.0
+        results.append((category, served_intent, confidence, new_category, new_intent, score))
+    return results, timings
+
+def empty_state(model_dir, min_score):
+    # Agrégats du rejeu : uniquement des types JSON pour le point de contrôle
+    return {
+        "model_dir": model_dir,
+        "min_score": min_score,
+        "last_id": 0,
+        "rows": 0,
+        "elapsed_s": 0.0,
+        "stage_s": {stage: 0.0 for stage in STAGES},
+        # catégorie/intention servie -> [lignes, désaccords de catégorie, désaccords d'intention]
+        "by_category": {},
+        "by_intent": {},
+        "drift_rows": 0,
+        "drift_sum": 0.0,
+        "drift_abs_sum": 0.0,
+        "drift_histogram": [0] * (len(DRIFT_BOUNDS) + 1),
+        "answered_served": 0,
+        "answered_candidate": 0,
+    }
+
+def merge_results(state, results, timings):
+    # Ajoute les résultats d'un lot aux agrégats
+    for served_cat, served_intent, confidence, new_cat, new_intent, score in results:
+        category_disagrees, intent_disagrees = int(served_cat != new_cat), int(served_intent != new_intent)
+        for table, key in ((state["by_category"], served_cat), (state["by_intent"], served_intent)):
+            counts = table.setdefault(key, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += category_disagrees
+            counts[2] += intent_disagrees
+
+        # Dérive mesurée sur les réponses servies (l'application n'enregistre pas de confiance sinon)
+        if confidence is not None:
+            drift = score - confidence
+            state["drift_rows"] += 1
+            state["drift_sum"] += drift
+            state["drift_abs_sum"] += abs(drift)
+            state["drift_histogram"][sum(drift > bound for bound in DRIFT_BOUNDS)] += 1
+        state["answered_served"] += served_cat != UNKNOWN_CATEGORY
+        state["answered_candidate"] += new_cat != UNKNOWN_CATEGORY
+
+    state["rows"] += len(results)
+    for stage, seconds in timings.items():
+        state["stage_s"][stage] += seconds
+
+def load_checkpoint(path, model_dir, min_score):
+    # Reprend un rejeu interrompu sur la même version et le même seuil, sinon repart de zéro
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return empty_state(model_dir, min_score)
+    if state["model_dir"] != model_dir or state["min_score"] != min_score:
+        print("Point de contrôle d'une autre version ou d'un autre seuil : rejeu depuis le début")
+        return empty_state(model_dir, min_score)
+    print(f"Reprise après la conversation {state['last_id']} ({state['rows']} déjà rejouées)")
+    return state
+
+def save_checkpoint(path, state):
+    # Écriture atomique : un arrêt brutal laisse l'ancien point de contrôle intact
+    with atomic_write(path) as f:
+        json.dump(state, f)
+
+def summarize(state):
+    """
+    Rapport final à partir des agrégats.
+    Returns:
+        dict: désaccords globaux et par catégorie / intention, dérive de confiance, débits
+    """
+    rows = state["rows"]
+    if not rows:
+        return {"rows": 0}
+
+    def rates(table):
+        return {
+            key: {"rows": n, "category_disagreement": cat / n, "intent_disagreement": intent / n}
+            for key, (n, cat, intent) in sorted(table.items(), key=lambda item: -item[1][0])
+        }
+
+    labels = [f"<={bound}" for bound in DRIFT_BOUNDS] + [f">{DRIFT_BOUNDS[-1]}"]
+    return {
+        "model_dir": state["model_dir"],
+        "rows": rows,
+        "category_disagreement": sum(c[1] for c in state["by_category"].values()) / rows,
+        "intent_disagreement": sum(c[2] for c in state["by_category"].values()) / rows,
+        "answered_rate_served": state["answered_served"] / rows,
+        "answered_rate_candidate": state["answered_candidate"] / rows,
+        "confidence_drift_mean": state["drift_sum"] / max(state["drift_rows"], 1),
+        "confidence_drift_abs_mean": state["drift_abs_sum"] / max(state["drift_rows"], 1),
+        "confidence_drift_histogram": dict(zip(labels, state["drift_histogram"])),
+        "throughput_qps": rows / state["elapsed_s"] if state["elapsed_s"] else None,
+        # Débit d'un processus sur chaque étape (temps cumulé de tous les processus)
+        "stage_throughput_qps": {
+            stage: rows / seconds for stage, seconds in state["stage_s"].items() if seconds
+        },
+        "by_category": rates(state["by_category"]),
+        "by_intent": rates(state["by_intent"]),
+    }
+
+def replay(db_manager, model_dir, min_score=0.6, jobs=None, chunk_size=CHUNK_SIZE, batch_size=64,
+           checkpoint=None, limit=None):
+    """
+    Rejoue la table conversations sur une version candidate.
+    Les lots sont re-scorés en parallèle (un ensemble de modèles par processus) et intégrés aux agrégats
+    dans l'ordre des id : le point de contrôle ne saute jamais une conversation.
+    Args:
+        db_manager: DatabaseManager ou InMemoryDatabaseManager (iter_conversations)
+        model_dir (str): Dossier de la version candidate
+        min_score (float): Seuil de confiance appliqué aux réponses candidates
+        jobs (int): Nombre de processus (nombre de cœurs par défaut)
+        checkpoint (str): Fichier de point de contrôle (reprise si présent)
+        limit (int): Nombre maximal de conversations rejouées par cette exécution
+    Returns:
+        dict: Rapport (voir summarize)
+    """
+    jobs = jobs or os.cpu_count() or 1
+    state = load_checkpoint(checkpoint, model_dir, min_score) if checkpoint else empty_state(model_dir, min_score)
+
+    def chunks():
+        remaining = limit
+        for rows in db_manager.iter_conversations(after_id=state["last_id"], batch_size=chunk_size):
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            if rows:
+                yield rows
+            if remaining == 0:
+                return
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(model_dir, min_score, batch_size)) as executor:
+        # Fenêtre bornée de lots en vol : la mémoire ne dépend pas de la taille de la table
+        pending = []
+        source = chunks()
+        while True:
+            while len(pending) < 2 * jobs:
+                rows = next(source, None)
+                if rows is None:
+                    break
+                pending.append((rows[-1][0], executor.submit(_score_chunk, rows)))
+            if not pending:
+                break
+
+            last_id, future = pending.pop(0)
+            merge_results(state, *future.result())
+            state["last_id"] = last_id
+            state["elapsed_s"] += time.perf_counter() - start
+            start = time.perf_counter()
+            if checkpoint:
+                save_checkpoint(checkpoint, state)
+            print(f"   {state['rows']} conversations rejouées (id <= {last_id})")
+
+    return summarize(state)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu du trafic réel sur une version candidate des modèles")
+    parser.add_argument("--model", help="Version (models/versions/) ou dossier de modèles (défaut: version publiée)")
+    parser.add_argument("--jobs", type=int, help="Nombre de processus (défaut: nombre de cœurs)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--min-score", type=float, help="Seuil de confiance (défaut: Config.NLP_MIN_CONFIDENCE)")
+    parser.add_argument("--limit", type=int, help="Nombre maximal de conversations pour cette exécution")
+    parser.add_argument("--restart", action="store_true", help="Ignore le point de contrôle existant")
+    parser.add_argument("--report", help="Fichier JSON du rapport complet")
+    args = parser.parse_args()
+
+    from config import Config
+    from bankApp import db_manager
+
+    model_dir = resolve_model_dir(args.model)
+    min_score = Config.NLP_MIN_CONFIDENCE if args.min_score is None else args.min_score
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    checkpoint = os.path.join(REPLAY_DIR, f"{os.path.basename(model_dir)}.checkpoint.json")
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    report = replay(db_manager, model_dir, min_score=min_score, jobs=args.jobs, chunk_size=args.chunk_size,
+                    checkpoint=checkpoint, limit=args.limit)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if not report["rows"]:
+        print("Aucune conversation à rejouer")
+        return
+    print("=" * 60)
+    print(f"REJEU DU TRAFIC - {report['rows']} conversations sur {report['model_dir']}")
+    print("=" * 60)
+    print(f"   Désaccord catégorie={report['category_disagreement']:.2%} | intention={report['intent_disagreement']:.2%}")
+    print(f"   Réponses au-dessus du seuil: servies={report['answered_rate_served']:.2%} | "
+          f"candidates={report['answered_rate_candidate']:.2%}")
+    print(f"   Dérive de confiance: moyenne={report['confidence_drift_mean']:+.3f} | "
+          f"absolue={report['confidence_drift_abs_mean']:.3f}")
+    if report["throughput_qps"]:
+        print(f"   Débit global: {report['throughput_qps']:.1f} questions/s")
+    for stage, qps in report["stage_throughput_qps"].items():
+        print(f"      {stage:10s} {qps:10.1f} questions/s par processus")
+    print("   Désaccords par catégorie servie:")
+    for category, stats in report["by_category"].items():
+        print(f"      {category:30s} {stats['rows']:8d} | catégorie={stats['category_disagreement']:.2%} | "
+              f"intention={stats['intent_disagreement']:.2%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,632 @@
+#bankApp/nlp/vector_index.py
+import os
+import json
+import heapq
+import numpy as np
+from bankApp.nlp.atomic_io import atomic_write, atomic_save_array
+
+# Index vectoriels pour la recherche d'intention (similarité cosinus sur vecteurs normalisés L2).
+# Les trois index partagent la même interface :
+#   build(vectors, labels)            construction hors ligne (labels : code de catégorie par vecteur)
+#   search(query, k, label=None)      -> (scores décroissants, identifiants de lignes)
+#   extend(vectors, labels, row_map, new_rows)  ajout de lignes (mise à jour incrémentale, voir extend_index)
+#   save(directory) / load_index(directory, vectors)
+# Le filtrage par catégorie est exact : chaque index est partitionné par label,
+# une recherche filtrée ne visite que la partition de la catégorie demandée.
+#
+# Stockage (flat et ivf) : "float32", "float16" ou "int8" (échelle symétrique par vecteur).
+# Avec un stockage quantifié, le balayage porte sur les codes compacts (2 à 4 fois moins de mémoire
+# parcourue), puis les `rescore * k` meilleurs candidats sont réévalués en float32 sur les embeddings
+# des artefacts (mmap : seules les lignes candidates sont lues).
+
+INDEX_SUBDIR = "index"
+INDEX_FILE = "index.json"
+INDEX_KINDS = ("flat", "ivf", "hnsw")
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+# Nombre de lignes converties en float32 à la fois pendant le balayage des codes (bloc résident en cache L1/L2)
+SCAN_CHUNK = 512
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _top_k(scores, k):
+    # Indices des k meilleurs scores, triés par score décroissant (argpartition : O(n))
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+def _label_offsets(labels, n_labels=None):
+    # Bornes [début, fin) de chaque label dans un tableau trié par label
+    counts = np.bincount(labels, minlength=n_labels or 0)
+    return np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+def quantize(vectors, storage):
+    """
+    Quantifie des vecteurs pour le stockage de l'index.
+    Returns:
+        tuple: (codes, échelles par vecteur ou None)
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Stockage inconnu: {storage} (attendu: {STORAGE_TYPES})")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if storage == "float32":
+        return vectors, None
+    if storage == "float16":
+        return vectors.astype(np.float16), None
+
+    # int8 symétrique : v ≈ codes * échelle, échelle = max|v| / 127 par vecteur
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def scan_scores(codes, scales, query):
+    # Scores approchés sur des codes quantifiés, convertis en float32 par blocs
+    if codes.dtype == np.float32:
+        return codes @ query
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), SCAN_CHUNK):
+        block = codes[start:start + SCAN_CHUNK].astype(np.float32) @ query
+        if scales is not None:
+            block *= scales[start:start + SCAN_CHUNK]
+        scores[start:start + SCAN_CHUNK] = block
+    return scores
+
+def _remap_codes(codes, scales, row_map, vectors, new_rows):
+    # Codes des anciennes lignes déplacés à leur nouvelle position, nouvelles lignes quantifiées
+    storage = str(codes.dtype)
+    new_codes, new_scales = quantize(vectors[new_rows], storage)
+    out = np.empty((len(vectors), codes.shape[1]), dtype=codes.dtype)
+    out[row_map], out[new_rows] = codes, new_codes
+    if scales is None:
+        return out, None
+    out_scales = np.empty(len(vectors), dtype=np.float32)
+    out_scales[row_map], out_scales[new_rows] = scales, new_scales
+    return out, out_scales
+
+def _save_arrays(directory, meta, arrays):
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        atomic_save_array(os.path.join(directory, f"{name}.npy"), array)
+    # Le descripteur est écrit en dernier : sa présence indique un index complet
+    with atomic_write(os.path.join(directory, INDEX_FILE)) as f:
+        json.dump(meta, f, indent=2)
+
+def _load_array(directory, name, mmap=True):
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+
+class FlatIndex:
+    """
+    Recherche exacte par balayage. Les vecteurs sont triés par label :
+    une recherche filtrée est un produit matrice-vecteur sur une tranche contiguë.
+    Avec un stockage quantifié, la recherche est exacte à la réévaluation près.
+    """
+    kind = "flat"
+
+    def __init__(self, storage="float32", rescore=4):
+        self.storage = storage
+        self.rescore = rescore
+        self.vectors = None
+        self.codes = None
+        self.scales = None
+        self.ids = None
+        self.label_offsets = None
+
+    @classmethod
+    def from_sorted(cls, vectors, label_offsets, storage="float32", rescore=4):
+        # Index sur des vecteurs déjà triés par label (artefacts de service) : aucune copie en float32
+        index = cls(storage, rescore)
+        index.vectors = vectors
+        index.label_offsets = np.asarray(label_offsets, dtype=np.int64)
+        index.codes, index.scales = quantize(vectors, storage) if storage != "float32" else (vectors, None)
+        return index
+
+    def build(self, vectors, labels=None):
+        vectors = _normalize(vectors)
+        labels = np.zeros(len(vectors), dtype=np.int64) if labels is None else np.asarray(labels)
+        order = np.argsort(labels, kind="stable")
+        if np.all(order == np.arange(len(order))):
+            self.ids = None
+        else:
+            self.ids = order.astype(np.int64)
+            vectors = vectors[order]
+        self.vectors = vectors
+        self.codes, self.scales = quantize(vectors, self.storage)
+        self.label_offsets = _label_offsets(labels[order])
+        return self
+
+    def _range(self, label):
+        if label is None:
+            return 0, len(self.vectors)
+        if label < 0 or label + 1 >= len(self.label_offsets):
+            return 0, 0
+        return int(self.label_offsets[label]), int(self.label_offsets[label + 1])
+
+    def search(self, query, k=1, label=None):
+        start, end = self._range(label)
+        if self.storage == "float32":
+            scores = self.vectors[start:end] @ query
+            best = _top_k(scores, k)
+            scores = scores[best]
+        else:
+            # Balayage sur les codes, puis réévaluation exacte des meilleurs candidats
+            scales = None if self.scales is None else self.scales[start:end]
+            candidates = _top_k(scan_scores(self.codes[start:end], scales, query), k * self.rescore)
+            exact = self.vectors[candidates + start] @ query
+            order = _top_k(exact, k)
+            best, scores = candidates[order], exact[order]
+        rows = best + start
+        if self.ids is not None:
+            rows = self.ids[rows]
+        return scores, rows
+
+    def extend(self, vectors, labels, row_map, new_rows):
+        """
+        Index sur des artefacts augmentés : seuls les codes des nouvelles lignes sont calculés.
+        Args:
+            vectors (np.ndarray): Tous les vecteurs normalisés, nouvelles lignes comprises
+            labels (np.ndarray): Label de chaque vecteur
+            row_map (np.ndarray): Nouvelle position de chaque ancienne ligne
+            new_rows (np.ndarray): Position des lignes ajoutées
+        """
+        if self.ids is not None:
+            return type(self)(self.storage, self.rescore).build(vectors, labels)
+        index = type(self)(self.storage, self.rescore)
+        index.vectors = vectors
+        index.label_offsets = _label_offsets(np.asarray(labels), len(self.label_offsets) - 1)
+        if self.storage == "float32":
+            index.codes = vectors
+        else:
+            index.codes, index.scales = _remap_codes(self.codes, self.scales, row_map, vectors, new_rows)
+        return index
+
+    def memory_bytes(self):
+        # Mémoire parcourue par le balayage (codes + échelles)
+        return int(self.codes.nbytes + (0 if self.scales is None else self.scales.nbytes))
+
+    def save(self, directory):
+        arrays = {"label_offsets": self.label_offsets}
+        if self.ids is not None:
+            # Vecteurs d'entrée non triés par label : ils sont sauvegardés dans l'ordre de l'index,
+            # pour être relus en mmap sans réordonnancement (copie privée) dans chaque processus
+            arrays["ids"] = self.ids
+            arrays["vectors"] = self.vectors
+        if self.storage != "float32":
+            arrays["codes"] = self.codes
+            if self.scales is not None:
+                arrays["scales"] = self.scales
+        _save_arrays(directory, {"kind": self.kind, "storage": self.storage, "rescore": self.rescore}, arrays)
+
+    @classmethod
+    def load(cls, directory, vectors, meta):
+        index = cls(meta.get("storage", "float32"), meta.get("rescore", 4))
+        index.label_offsets = _load_array(directory, "label_offsets", mmap=False)
+        index.vectors = vectors
+        if os.path.exists(os.path.join(directory, "ids.npy")):
+            index.ids = _load_array(directory, "ids")
+            index.vectors = _load_array(directory, "vectors")
+        if index.storage == "float32":
+            index.codes = index.vectors
+        else:
+            index.codes = _load_array(directory, "codes")
+            if os.path.exists(os.path.join(directory, "scales.npy")):
+                index.scales = _load_array(directory, "scales")
+        return index
+
+def spherical_kmeans(vectors, n_clusters, n_iter=20, sample_size=None, seed=0):
+    """
+    K-means sphérique (similarité cosinus) en NumPy.
+    Args:
+        vectors (np.ndarray): Vecteurs normalisés (n, dim)
+        n_clusters (int): Nombre de centroïdes
+        sample_size (int): Entraînement sur un échantillon (les centroïdes convergent bien avant n)
+    Returns:
+        np.ndarray: Centroïdes normalisés (n_clusters, dim)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    if sample_size and len(vectors) > sample_size:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = assign_clusters(vectors, centroids)
+        counts = np.bincount(assignment, minlength=n_clusters)
+
+        # Somme par cluster : tri par affectation puis réduction par segments (bien plus rapide que np.add.at)
+        order = np.argsort(assignment, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        sums = np.zeros(centroids.shape, dtype=np.float32)
+        sums[nonempty] = np.add.reduceat(vectors[order], starts[nonempty], axis=0)
+
+        # Un centroïde vide est réinitialisé sur un point tiré au hasard
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+def assign_clusters(vectors, centroids, chunk_size=65536):
+    # Centroïde le plus proche de chaque vecteur, par blocs pour borner la mémoire
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size]
+        assignment[start:start + chunk_size] = (block @ centroids.T).argmax(axis=1)
+    return assignment
+
+class IVFIndex:
+    """
+    Index à fichiers inversés (IVF) : quantification grossière par k-means, puis balayage
+    des `nprobe` listes les plus proches. Les centroïdes sont appris par label : une recherche
+    filtrée ne sonde que les listes de la catégorie demandée.
+    Les vecteurs (ou leurs codes quantifiés) sont recopiés dans l'ordre des listes pour un balayage contigu.
+    """
+    kind = "ivf"
+
+    def __init__(self, nlist=None, nprobe=16, n_iter=20, seed=0, storage="float32", rescore=4):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.storage = storage
+        self.rescore = rescore
+        self.list_scales = None
+
+    def build(self, vectors, labels=None):
+        vectors = _normalize(vectors)
+        self.vectors = vectors
+        labels = np.zeros(len(vectors), dtype=np.int64) if labels is None else np.asarray(labels)
+        n_labels = int(labels.max()) + 1 if len(labels) else 0
+        # Environ 4 * sqrt(n) listes au total, réparties selon la taille de chaque label
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(vectors))))
+
+        centroids, centroid_labels, list_ids = [], [], []
+        for label in range(n_labels):
+            rows = np.flatnonzero(labels == label)
+            if len(rows) == 0:
+                continue
+            n_clusters = max(1, round(nlist * len(rows) / len(vectors)))
+            label_centroids = spherical_kmeans(
+                vectors[rows], n_clusters, self.n_iter, sample_size=256 * n_clusters, seed=self.seed
+            )
+            assignment = assign_clusters(vectors[rows], label_centroids)
+            order = np.argsort(assignment, kind="stable")
+            offset = len(centroids)
+            centroids.extend(label_centroids)
+            centroid_labels.extend([label] * len(label_centroids))
+            list_ids.append((assignment[order] + offset, rows[order]))
+
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.centroid_labels = np.asarray(centroid_labels, dtype=np.int64)
+        self.label_offsets = _label_offsets(self.centroid_labels, n_labels)
+        list_of_row = np.concatenate([lists for lists, _ in list_ids])
+        self.ids = np.concatenate([rows for _, rows in list_ids])
+        self.list_offsets = _label_offsets(list_of_row, len(self.centroids))
+        self.list_vectors, self.list_scales = quantize(np.ascontiguousarray(vectors[self.ids]), self.storage)
+        return self
+
+    def search(self, query, k=1, label=None, nprobe=None):
+        if label is None:
+            first, last = 0, len(self.centroids)
+        elif label < 0 or label + 1 >= len(self.label_offsets):
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        else:
+            first, last = int(self.label_offsets[label]), int(self.label_offsets[label + 1])
+
+        # Listes les plus proches de la requête
+        probes = _top_k(self.centroids[first:last] @ query, nprobe or self.nprobe) + first
+
+        scores, positions = [], []
+        for probe in probes:
+            start, end = int(self.list_offsets[probe]), int(self.list_offsets[probe + 1])
+            scales = None if self.list_scales is None else self.list_scales[start:end]
+            scores.append(scan_scores(self.list_vectors[start:end], scales, query))
+            positions.append(np.arange(start, end))
+        if not scores:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        scores = np.concatenate(scores)
+        positions = np.concatenate(positions)
+        if self.storage == "float32":
+            best = _top_k(scores, k)
+            return scores[best], self.ids[positions[best]]
+
+        # Réévaluation en float32 des meilleurs candidats sur les embeddings des artefacts
+        rows = self.ids[positions[_top_k(scores, k * self.rescore)]]
+        exact = self.vectors[rows] @ query
+        best = _top_k(exact, k)
+        return exact[best], rows[best]
+
+    def extend(self, vectors, labels, row_map, new_rows):
+        """
+        Ajoute des lignes sans réapprendre les centroïdes : chaque nouveau vecteur rejoint la liste
+        la plus proche de son label, les listes existantes sont conservées (identifiants renumérotés).
+        Un label sans liste (nouvelle catégorie) impose une reconstruction complète.
+        """
+        labels = np.asarray(labels)
+        new_labels = labels[new_rows]
+        if np.any(new_labels + 1 >= len(self.label_offsets)) or np.any(
+                self.label_offsets[new_labels] == self.label_offsets[new_labels + 1]):
+            return type(self)(self.nlist, self.nprobe, self.n_iter, self.seed, self.storage, self.rescore).build(
+                vectors, labels)
+
+        new_lists = np.empty(len(new_rows), dtype=np.int64)
+        for label in np.unique(new_labels):
+            first, last = int(self.label_offsets[label]), int(self.label_offsets[label + 1])
+            mask = new_labels == label
+            new_lists[mask] = assign_clusters(vectors[new_rows[mask]], self.centroids[first:last]) + first
+
+        # Listes des anciennes entrées puis des nouvelles, tri stable : les anciennes restent en tête de liste
+        old_lists = np.repeat(np.arange(len(self.centroids)), np.diff(self.list_offsets))
+        order = np.argsort(np.concatenate([old_lists, new_lists]), kind="stable")
+        new_codes, new_scales = quantize(vectors[new_rows], self.storage)
+
+        index = type(self)(len(self.centroids), self.nprobe, self.n_iter, self.seed, self.storage, self.rescore)
+        index.vectors = vectors
+        index.centroids, index.centroid_labels, index.label_offsets = \
+            self.centroids, self.centroid_labels, self.label_offsets
+        index.list_offsets = _label_offsets(np.concatenate([old_lists, new_lists]), len(self.centroids))
+        index.ids = np.concatenate([np.asarray(row_map)[self.ids], new_rows])[order]
+        index.list_vectors = np.concatenate([self.list_vectors, new_codes])[order]
+        if self.list_scales is not None:
+            index.list_scales = np.concatenate([self.list_scales, new_scales])[order]
+        return index
+
+    def memory_bytes(self):
+        # Mémoire parcourue par les balayages (listes + échelles + centroïdes)
+        scales = 0 if self.list_scales is None else self.list_scales.nbytes
+        return int(self.list_vectors.nbytes + scales + self.centroids.nbytes)
+
+    def save(self, directory):
+        meta = {"kind": self.kind, "nprobe": self.nprobe, "nlist": len(self.centroids),
+                "storage": self.storage, "rescore": self.rescore}
+        arrays = {
+            "centroids": self.centroids,
+            "centroid_labels": self.centroid_labels,
+            "label_offsets": self.label_offsets,
+            "list_offsets": self.list_offsets,
+            "ids": self.ids,
+            "list_vectors": self.list_vectors,
+        }
+        if self.list_scales is not None:
+            arrays["list_scales"] = self.list_scales
+        _save_arrays(directory, meta, arrays)
+
+    @classmethod
+    def load(cls, directory, vectors, meta):
+        index = cls(nlist=meta["nlist"], nprobe=meta["nprobe"],
+                    storage=meta.get("storage", "float32"), rescore=meta.get("rescore", 4))
+        for name in ("centroids", "centroid_labels", "label_offsets", "list_offsets"):
+            setattr(index, name, _load_array(directory, name, mmap=False))
+        index.vectors = vectors
+        index.ids = _load_array(directory, "ids")
+        index.list_vectors = _load_array(directory, "list_vectors")
+        if os.path.exists(os.path.join(directory, "list_scales.npy")):
+            index.list_scales = _load_array(directory, "list_scales")
+        return index
+
+class HNSWIndex:
+    """
+    Graphe HNSW (Hierarchical Navigable Small World) en NumPy.
+    Un sous-graphe est construit par label : les arêtes ne traversent jamais deux catégories,
+    une recherche filtrée part du point d'entrée de la catégorie et reste exacte sur le filtre.
+    La construction (boucle Python) est faite hors ligne ; la recherche visite O(ef * log n) nœuds.
+    """
+    kind = "hnsw"
+
+    def __init__(self, m=16, ef_construction=100, ef_search=64, seed=0, storage="float32"):
+        # Le parcours du graphe lit des vecteurs isolés : la quantification n'y apporte rien
+        if storage != "float32":
+            raise ValueError("L'index hnsw ne supporte que le stockage float32")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+
+    def _search_layer(self, query, entries, ef, neighbors_of):
+        # Recherche gloutonne en faisceau sur un niveau : retourne [(score, nœud)]
+        visited = set(entries)
+        entry_scores = (self.vectors[entries] @ query).tolist()
+        candidates = [(-s, e) for s, e in zip(entry_scores, entries)]
+        results = [(s, e) for s, e in zip(entry_scores, entries)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_score, node = heapq.heappop(candidates)
+            if -neg_score < results[0][0] and len(results) >= ef:
+                break
+            fresh = [n for n in neighbors_of(node) if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for score, neighbor in zip((self.vectors[fresh] @ query).tolist(), fresh):
+                if len(results) < ef or score > results[0][0]:
+                    heapq.heappush(candidates, (-score, neighbor))
+                    heapq.heappush(results, (score, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return results
+
+    def build(self, vectors, labels=None):
+        self.vectors = _normalize(vectors)
+        labels = np.zeros(len(vectors), dtype=np.int64) if labels is None else np.asarray(labels)
+        rng = np.random.default_rng(self.seed)
+        level_mult = 1 / np.log(self.m)
+        self.node_levels = np.floor(-np.log(rng.random(len(vectors)) + 1e-12) * level_mult).astype(np.int64)
+
+        # Graphe en construction : graph[niveau][nœud] = liste de voisins
+        graph = [dict() for _ in range(int(self.node_levels.max(initial=0)) + 1)]
+        entries = {}
+
+        for node in range(len(self.vectors)):
+            label = int(labels[node])
+            entry = entries.get(label)
+            level = int(self.node_levels[node])
+            for lvl in range(level + 1):
+                graph[lvl][node] = []
+            if entry is None:
+                entries[label] = node
+                continue
+
+            query = self.vectors[node]
+            entry_level = int(self.node_levels[entry])
+            points = [entry]
+            for lvl in range(entry_level, level, -1):
+                points = [max(self._search_layer(query, points, 1, graph[lvl].__getitem__))[1]]
+
+            for lvl in range(min(level, entry_level), -1, -1):
+                found = self._search_layer(query, points, self.ef_construction, graph[lvl].__getitem__)
+                max_links = 2 * self.m if lvl == 0 else self.m
+                graph[lvl][node] = [n for _, n in heapq.nlargest(self.m, found)]
+                for neighbor in graph[lvl][node]:
+                    links = graph[lvl][neighbor]
+                    links.append(node)
+                    if len(links) > max_links:
+                        # Élagage : conserve les voisins les plus proches
+                        keep = _top_k(self.vectors[links] @ self.vectors[neighbor], max_links)
+                        graph[lvl][neighbor] = [links[i] for i in keep]
+                points = [n for _, n in found]
+
+            if level > entry_level:
+                entries[label] = node
+
+        self._freeze(graph, entries)
+        return self
+
+    def _freeze(self, graph, entries):
+        # Conversion en tableaux de taille fixe (complétés par -1) pour la sauvegarde et la recherche
+        self.level0 = np.full((len(self.vectors), 2 * self.m), -1, dtype=np.int32)
+        for node, links in graph[0].items():
+            self.level0[node, :len(links)] = links
+        self.upper_nodes, self.upper_links = [], []
+        for lvl in range(1, len(graph)):
+            nodes = np.array(sorted(graph[lvl]), dtype=np.int64)
+            links = np.full((len(nodes), self.m), -1, dtype=np.int32)
+            for i, node in enumerate(nodes):
+                links[i, :len(graph[lvl][node])] = graph[lvl][node]
+            self.upper_nodes.append(nodes)
+            self.upper_links.append(links)
+        labels = sorted(entries)
+        self.entry_labels = np.array(labels, dtype=np.int64)
+        self.entry_nodes = np.array([entries[l] for l in labels], dtype=np.int64)
+        self._index_upper()
+
+    def _index_upper(self):
+        self._upper_pos = [{int(n): i for i, n in enumerate(nodes)} for nodes in self.upper_nodes]
+        self._entries = dict(zip(self.entry_labels.tolist(), self.entry_nodes.tolist()))
+
+    def _neighbors(self, level):
+        if level == 0:
+            return lambda node: [n for n in self.level0[node].tolist() if n >= 0]
+        links, positions = self.upper_links[level - 1], self._upper_pos[level - 1]
+        return lambda node: [n for n in links[positions[node]].tolist() if n >= 0]
+
+    def _search_partition(self, query, entry, k, ef):
+        points = [entry]
+        for lvl in range(int(self.node_levels[entry]), 0, -1):
+            points = [max(self._search_layer(query, points, 1, self._neighbors(lvl)))[1]]
+        return self._search_layer(query, points, max(ef, k), self._neighbors(0))
+
+    def memory_bytes(self):
+        links = sum(l.nbytes for l in self.upper_links)
+        return int(self.vectors.nbytes + self.level0.nbytes + links)
+
+    def search(self, query, k=1, label=None, ef=None):
+        ef = ef or self.ef_search
+        if label is None:
+            entries = list(self._entries.values())
+        elif label in self._entries:
+            entries = [self._entries[label]]
+        else:
+            entries = []
+
+        found = []
+        for entry in entries:
+            found.extend(self._search_partition(query, entry, k, ef))
+        found = heapq.nlargest(k, found)
+        return (np.array([s for s, _ in found], dtype=np.float32),
+                np.array([n for _, n in found], dtype=np.int64))
+
+    def extend(self, vectors, labels, row_map, new_rows):
+        # Le graphe figé (tableaux de voisins) ne supporte pas l'insertion : reconstruction complète
+        return type(self)(self.m, self.ef_construction, self.ef_search, self.seed).build(vectors, labels)
+
+    def save(self, directory):
+        meta = {"kind": self.kind, "m": self.m, "ef_search": self.ef_search, "levels": len(self.upper_nodes)}
+        arrays = {
+            "level0": self.level0,
+            "node_levels": self.node_levels,
+            "entry_labels": self.entry_labels,
+            "entry_nodes": self.entry_nodes,
+        }
+        for lvl, (nodes, links) in enumerate(zip(self.upper_nodes, self.upper_links), start=1):
+            arrays[f"upper_nodes_{lvl}"] = nodes
+            arrays[f"upper_links_{lvl}"] = links
+        _save_arrays(directory, meta, arrays)
+
+    @classmethod
+    def load(cls, directory, vectors, meta):
+        index = cls(m=meta["m"], ef_search=meta["ef_search"])
+        index.vectors = vectors
+        index.level0 = _load_array(directory, "level0")
+        index.node_levels = _load_array(directory, "node_levels")
+        index.entry_labels = _load_array(directory, "entry_labels", mmap=False)
+        index.entry_nodes = _load_array(directory, "entry_nodes", mmap=False)
+        index.upper_nodes = [_load_array(directory, f"upper_nodes_{l}", mmap=False) for l in range(1, meta["levels"] + 1)]
+        index.upper_links = [_load_array(directory, f"upper_links_{l}", mmap=False) for l in range(1, meta["levels"] + 1)]
+        index._index_upper()
+        return index
+
+INDEX_CLASSES = {cls.kind: cls for cls in (FlatIndex, IVFIndex, HNSWIndex)}
+
+def build_index(kind, vectors, labels=None, **params):
+    """
+    Construit un index du type demandé.
+    Args:
+        kind (str): "flat", "ivf" ou "hnsw"
+        vectors (np.ndarray): Vecteurs (n, dim), les identifiants retournés sont leurs numéros de ligne
+        labels (np.ndarray): Code de catégorie de chaque vecteur (filtrage)
+    """
+    if kind not in INDEX_CLASSES:
+        raise ValueError(f"Type d'index inconnu: {kind} (attendu: {INDEX_KINDS})")
+    return INDEX_CLASSES[kind](**params).build(vectors, labels)
+
+def extend_index(index, vectors, labels, row_map, new_rows):
+    """
+    Index d'artefacts augmentés de nouvelles lignes (voir artifacts.append_artifacts), sans reconstruction
+    quand le type d'index le permet (flat, ivf) ; hnsw est reconstruit.
+    Args:
+        vectors (np.ndarray): Embeddings normalisés des nouveaux artefacts
+        labels (np.ndarray): Code de catégorie de chaque ligne
+        row_map (np.ndarray): Nouvelle position de chaque ancienne ligne
+        new_rows (np.ndarray): Position des lignes ajoutées
+    """
+    return index.extend(vectors, labels, np.asarray(row_map, dtype=np.int64), np.asarray(new_rows, dtype=np.int64))
+
+def index_exists(model_dir):
+    return os.path.exists(os.path.join(model_dir, INDEX_SUBDIR, INDEX_FILE))
+
+def save_index(index, model_dir):
+    index.save(os.path.join(model_dir, INDEX_SUBDIR))
+
+def load_index(model_dir, vectors):
+    """
+    Charge l'index d'un dossier de modèles.
+    Args:
+        vectors (np.ndarray): Embeddings normalisés des artefacts de service (utilisés par flat et hnsw)
+    """
+    directory = os.path.join(model_dir, INDEX_SUBDIR)
+    with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    return INDEX_CLASSES[meta["kind"]].load(directory, vectors, meta)
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from bankApp import app, db_manager
-from bankApp.nlp.preduction_service import get_response, DEFAULT_RESPONSE
+from bankApp.nlp.preduction_service import get_response, is_ready, DEFAULT_RESPONSE
 from config import Config
 import uuid
 
@@ -176,6 +176,19 @@ def api_chat():
             'success': False
         }), 500
 
+# Routes de supervision
+@app.route('/health')
+def health():
+    # Vivacité : le processus répond aux requêtes
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    # Disponibilité : les modèles sont chargés et préchauffés
+    if is_ready():
+        return jsonify({'status': 'ready'})
+    return jsonify({'status': 'warming_up'}), 503
+
 # Route publique
 @app.route('/')
 def index():
@@ -0,0 +1 @@
+# Benchmarks de performance du projet (exécutés depuis la racine du dépôt).
@@ -0,0 +1,120 @@
+# benchmarks/chat.py
+# Benchmarks du chemin de chat : démarrage à froid du service de prédiction, latence par étape
+# d'une question, débit par lots selon la taille du lot et cache d'embeddings (succès / échec).
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.corpora import make_queries, make_unique_texts
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Tailles de lot comparées pour le débit de predict_batch
+BATCH_SIZES = (1, 8, 32, 128)
+
+# Chargement complet et préchauffage des modèles dans un interpréteur neuf
+COLD_START_PROBE = """
+import json, time
+start = time.perf_counter()
+from bankApp.nlp.preduction_service import load_bundle
+bundle = load_bundle()
+print(json.dumps({"load_ms": (time.perf_counter() - start) * 1000, "version": bundle.version}))
+"""
+
+def latency_stats(timings_ms):
+    return {
+        "p50_ms": float(np.percentile(timings_ms, 50)),
+        "p99_ms": float(np.percentile(timings_ms, 99)),
+        "mean_ms": float(np.mean(timings_ms)),
+    }
+
+def measure_cold_start():
+    # Import + chargement + préchauffage de la version publiée, mesurés dans un sous-processus
+    result = subprocess.run([sys.executable, "-c", COLD_START_PROBE], cwd=ROOT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Échec du chargement des modèles:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def stage_latency(bundle, questions):
+    """
+    Latence de chaque étape de predict pour une question à la fois.
+    Returns:
+        dict: {étape: {"p50_ms", "p99_ms", "mean_ms"}}, plus "total"
+    """
+    from bankApp.nlp import preduction_service as service
+
+    stages = {"normalize": [], "spell": [], "encode": [], "classify": [], "search": [], "total": []}
+    for question in questions:
+        t0 = time.perf_counter()
+        normalized = service.normalize_text(question)
+        t1 = time.perf_counter()
+        question_clean = service.correct_text(normalized)
+        t2 = time.perf_counter()
+        question_vec = service._encode(bundle, [question_clean])[0]
+        t3 = time.perf_counter()
+        categories = service.rank_categories(bundle, question_clean, question_vec)
+        t4 = time.perf_counter()
+        service._candidates(bundle, question_vec, categories, 1)
+        t5 = time.perf_counter()
+
+        for name, (begin, end) in zip(stages, [(t0, t1), (t1, t2), (t2, t3), (t3, t4), (t4, t5), (t0, t5)]):
+            stages[name].append((end - begin) * 1000)
+    return {name: latency_stats(timings) for name, timings in stages.items()}
+
+def batch_throughput(bundle, questions, batch_sizes=BATCH_SIZES):
+    # Questions par seconde de predict_batch selon la taille du lot
+    from bankApp.nlp.preduction_service import predict_batch
+
+    results = {}
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(questions), batch_size):
+            predict_batch(bundle, questions[i:i + batch_size], batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        results[f"batch_{batch_size}"] = {"throughput_qps": len(questions) / elapsed}
+    return results
+
+def embedding_cache_paths(model_embed, n=256):
+    """
+    Cache d'embeddings d'entraînement : coût par texte quand tous les textes sont absents
+    (encodage + écriture d'un segment) puis quand ils sont tous présents (lecture seule).
+    """
+    from bankApp.nlp.embedding_cache import EmbeddingCache, encode_with_cache
+
+    texts = make_unique_texts(n)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = EmbeddingCache("benchmark", directory)
+        start = time.perf_counter()
+        encode_with_cache(model_embed, texts, cache)
+        miss_ms = (time.perf_counter() - start) * 1000 / n
+
+        cache = EmbeddingCache("benchmark", directory)
+        start = time.perf_counter()
+        encode_with_cache(model_embed, texts, cache)
+        hit_ms = (time.perf_counter() - start) * 1000 / n
+
+    return {"miss_per_text_ms": miss_ms, "hit_per_text_ms": hit_ms, "speedup": miss_ms / max(hit_ms, 1e-9)}
+
+def run(n_queries=200, n_throughput=512, noise=0.1, seed=None):
+    """
+    Exécute les benchmarks du chemin de chat sur la version publiée des modèles.
+    Returns:
+        dict: Résultats par benchmark
+    """
+    from bankApp.nlp.preduction_service import load_bundle
+
+    kwargs = {} if seed is None else {"seed": seed}
+    results = {"cold_start": measure_cold_start()}
+    bundle = load_bundle()
+
+    questions = make_queries(n_queries, noise=noise, **kwargs)["question"].tolist()
+    results["stages"] = stage_latency(bundle, questions)
+
+    questions = make_queries(n_throughput, noise=noise, **kwargs)["question"].tolist()
+    results["batch"] = batch_throughput(bundle, questions)
+
+    results["embedding_cache"] = embedding_cache_paths(bundle.model_embed)
+    return results
@@ -0,0 +1,31 @@
+# benchmarks/corpora.py
+# Corpus de questions reproductibles pour les benchmarks : tirées des intentions de
+# data_generation (instruction, catégorie, intention attendues) avec du bruit de trafic réel.
+import numpy as np
+import pandas as pd
+from bankApp.nlp.data_generation import intents, add_noise
+
+# Graine fixe : deux exécutions (ou deux machines) mesurent exactement les mêmes questions
+CORPUS_SEED = 1234
+
+def make_queries(n=1000, noise=0.1, seed=CORPUS_SEED):
+    """
+    Args:
+        n (int): Nombre de questions
+        noise (float): Taux de bruit (fautes de frappe, casse, mots de remplissage)
+        seed (int): Graine du tirage
+    Returns:
+        pd.DataFrame: Colonnes question, category, intent
+    """
+    rng = np.random.default_rng(seed)
+    rows = [(instruction, info["category"], name)
+            for name, info in intents.items() for instruction in info["instructions"]]
+    picks = rng.integers(0, len(rows), n)
+    df = pd.DataFrame([rows[i] for i in picks], columns=["question", "category", "intent"])
+    df["question"] = add_noise(df["question"], rng, noise)
+    return df
+
+def make_unique_texts(n, seed=CORPUS_SEED):
+    # Textes tous distincts (chemin « absent du cache ») construits sur les instructions du corpus
+    queries = make_queries(n, noise=0.0, seed=seed)
+    return [f"{question} {i}" for i, question in enumerate(queries["question"])]
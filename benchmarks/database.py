@@ -0,0 +1,55 @@
+# benchmarks/database.py
+# Débit de lecture / écriture du gestionnaire de base de données :
+# PostgreSQL local (Config.DB_CONFIG) ou gestionnaire en mémoire de même interface.
+import time
+import uuid
+from benchmarks.chat import latency_stats
+from benchmarks.corpora import make_queries
+
+DB_BACKENDS = ("memory", "postgres")
+
+def make_manager(backend):
+    from bankApp.models import DatabaseManager, InMemoryDatabaseManager
+
+    if backend == "memory":
+        return InMemoryDatabaseManager()
+    manager = DatabaseManager()
+    if not manager.init_db():
+        raise RuntimeError("Base PostgreSQL inaccessible (Config.DB_CONFIG)")
+    return manager
+
+def _timed(func, args_list):
+    # Exécute func sur chaque jeu d'arguments ; retourne (débit par seconde, statistiques de latence)
+    timings = []
+    start = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    return {"throughput_qps": len(args_list) / elapsed, **latency_stats(timings)}
+
+def run(backend="memory", n_writes=1000, n_reads=200):
+    """
+    Crée un utilisateur de benchmark (email unique) puis mesure les appels faits par chaque requête
+    du chat : écriture d'une conversation, lecture de l'historique, chargement de l'utilisateur.
+    Avec PostgreSQL, les lignes écrites restent dans la base locale.
+    Returns:
+        dict: {opération: {"throughput_qps", "p50_ms", "p99_ms", "mean_ms"}}
+    """
+    manager = make_manager(backend)
+    user = manager.create_user(f"bench-{uuid.uuid4().hex[:12]}@example.invalid", "benchmark", "Bench", "Mark")
+    if user is None:
+        raise RuntimeError("Création de l'utilisateur de benchmark impossible")
+
+    queries = make_queries(n_writes)
+    writes = [
+        (user["id"], row.question, "réponse de benchmark", row.category, 0.9)
+        for row in queries.itertuples(index=False)
+    ]
+    return {
+        "backend": backend,
+        "save_conversation": _timed(manager.save_conversation, writes),
+        "get_conversation_history": _timed(manager.get_conversation_history, [(user["id"],)] * n_reads),
+        "get_user_by_public_id": _timed(manager.get_user_by_public_id, [(user["public_id"],)] * n_reads),
+    }
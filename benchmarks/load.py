@@ -0,0 +1,253 @@
+# benchmarks/load.py
+# Générateur de charge HTTP : N utilisateurs synthétiques (créés par /register, connectés par /login)
+# envoient un mélange de questions (/api/chat) et de consultations d'historique (/historique).
+#   - boucle fermée : chaque utilisateur enchaîne ses requêtes avec un temps de réflexion ;
+#   - boucle ouverte : arrivées de Poisson au débit cible, latence mesurée depuis l'arrivée prévue
+#     (le temps d'attente d'une session libre est compté, pas d'omission coordonnée).
+# Sans --url, l'application est lancée dans ce processus avec la base en mémoire (aucun réseau ni PostgreSQL).
+#
+#   python -m benchmarks.load --users 20 --duration 30
+#   python -m benchmarks.load --mode open --rps 50 --duration 60 --mix chat=0.7 history=0.3
+#   python -m benchmarks.load --url http://127.0.0.1:8000 --users 50 --json
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Bornes des histogrammes de latence (ms)
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+DEFAULT_MIX = {"chat": 0.8, "history": 0.2}
+PASSWORD = "charge-test"
+
+class EndpointStats:
+    # Latences et erreurs d'un endpoint (thread-safe)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies_ms = []
+        self.errors = 0
+
+    def record(self, latency_ms, ok):
+        with self.lock:
+            self.latencies_ms.append(latency_ms)
+            if not ok:
+                self.errors += 1
+
+    def summary(self, elapsed_s):
+        latencies = np.array(self.latencies_ms)
+        if not len(latencies):
+            return {"requests": 0}
+        counts = np.histogram(latencies, bins=[0, *HISTOGRAM_BOUNDS_MS, np.inf])[0]
+        return {
+            "requests": int(len(latencies)),
+            "throughput_qps": len(latencies) / elapsed_s,
+            "error_rate": self.errors / len(latencies),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p90_ms": float(np.percentile(latencies, 90)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max()),
+            "histogram": {
+                f"<={bound}ms" if bound != np.inf else "inf": int(count)
+                for bound, count in zip([*HISTOGRAM_BOUNDS_MS, np.inf], counts)
+            },
+        }
+
+def start_local_server(warm=True):
+    """
+    Lance l'application dans un thread (serveur werkzeug multi-thread, port libre)
+    avec le gestionnaire de base en mémoire.
+    Returns:
+        str: URL du serveur
+    """
+    # Avant tout import de bankApp : le gestionnaire de base est choisi à l'import du package
+    os.environ.setdefault("BANKAPP_DATABASE", "memory")
+    from werkzeug.serving import make_server
+    from bankApp import app
+    from bankApp.nlp.preduction_service import warm_up
+
+    if warm:
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"Modèles non chargés ({e}) : /api/chat répondra en erreur", file=sys.stderr)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+class LoadGenerator:
+    """
+    Utilisateurs synthétiques et mélange de trafic reproductibles (graine fixe).
+    """
+
+    def __init__(self, base_url, users=20, mix=None, seed=None, timeout=30):
+        import requests
+        from benchmarks.corpora import make_queries, CORPUS_SEED
+
+        seed = CORPUS_SEED if seed is None else seed
+
+        self.requests = requests
+        self.base_url = base_url.rstrip("/")
+        self.n_users = users
+        self.mix = mix or DEFAULT_MIX
+        self.timeout = timeout
+        self.rng = np.random.default_rng(seed)
+        self.rng_lock = threading.Lock()
+        self.questions = make_queries(2000, seed=seed)["question"].tolist()
+        self.stats = {name: EndpointStats() for name in ("register", "login", "chat", "history")}
+        self.sessions = []
+        self.setup_s = 0.0
+
+    def _call(self, endpoint, session, method, path, since=None, expected=(200,), **kwargs):
+        # Requête chronométrée depuis since (arrivée prévue) ou l'envoi ;
+        # un statut inattendu ou une exception compte comme une erreur
+        start = time.perf_counter() if since is None else since
+        try:
+            response = session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            ok = response.status_code in expected
+        except self.requests.RequestException:
+            ok = False
+        self.stats[endpoint].record((time.perf_counter() - start) * 1000, ok)
+        return ok
+
+    def setup_users(self):
+        # Crée et connecte les utilisateurs (create_user est appelé par /register)
+        run_id = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+        for i in range(self.n_users):
+            session = self.requests.Session()
+            email = f"load-{run_id}-{i}@example.invalid"
+            self._call("register", session, "POST", "/register", allow_redirects=False, expected=(302,), data={
+                "email": email, "password": PASSWORD, "confirm_password": PASSWORD,
+                "first_name": "Charge", "last_name": f"Test{i}",
+            })
+            if self._call("login", session, "POST", "/login", allow_redirects=False, expected=(302,),
+                          data={"email": email, "password": PASSWORD}):
+                self.sessions.append(session)
+        self.setup_s = time.perf_counter() - start
+        if not self.sessions:
+            raise RuntimeError("Aucun utilisateur n'a pu se connecter")
+
+    def _next_action(self):
+        with self.rng_lock:
+            action = self.rng.choice(list(self.mix), p=np.array(list(self.mix.values())) / sum(self.mix.values()))
+            question = self.questions[self.rng.integers(0, len(self.questions))]
+        return action, question
+
+    def _act(self, session, scheduled=None):
+        # Boucle ouverte : la latence inclut l'attente entre l'arrivée prévue et l'envoi
+        action, question = self._next_action()
+        if action == "chat":
+            self._call("chat", session, "POST", "/api/chat", since=scheduled, json={"message": question})
+        else:
+            self._call("history", session, "GET", "/historique", since=scheduled)
+
+    def run_closed(self, duration_s, think_ms=0):
+        # Un thread par utilisateur, requête suivante après la réponse et le temps de réflexion
+        deadline = time.perf_counter() + duration_s
+
+        def user_loop(session):
+            while time.perf_counter() < deadline:
+                self._act(session)
+                if think_ms:
+                    time.sleep(think_ms / 1000)
+
+        threads = [threading.Thread(target=user_loop, args=(s,)) for s in self.sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, duration_s, rps):
+        # Arrivées de Poisson au débit cible, servies par les sessions libres
+        idle = queue.Queue()
+        for session in self.sessions:
+            idle.put(session)
+
+        def serve(scheduled):
+            session = idle.get()
+            try:
+                self._act(session, scheduled)
+            finally:
+                idle.put(session)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.sessions)) as executor:
+            scheduled = start
+            while scheduled < start + duration_s:
+                with self.rng_lock:
+                    scheduled += self.rng.exponential(1 / rps)
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(serve, scheduled)
+
+    def report(self, elapsed_s):
+        # Débit de l'inscription / connexion rapporté à la phase de préparation, des autres à la charge
+        return {
+            name: stats.summary(self.setup_s if name in ("register", "login") else elapsed_s)
+            for name, stats in self.stats.items()
+        }
+
+def parse_mix(items):
+    # ["chat=0.7", "history=0.3"] -> {"chat": 0.7, "history": 0.3}
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Action inconnue: {name} (attendues: {list(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge HTTP de bankApp")
+    parser.add_argument("--url", help="Serveur à tester (sinon application locale, base en mémoire)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Durée de la charge (s)")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--rps", type=float, default=20, help="Débit cible en boucle ouverte")
+    parser.add_argument("--think-ms", type=float, default=0, help="Temps de réflexion en boucle fermée")
+    parser.add_argument("--mix", nargs="+", default=[], help="Mélange de trafic, ex. chat=0.8 history=0.2")
+    parser.add_argument("--seed", type=int, help="Graine des utilisateurs et des questions (défaut: celle des corpus)")
+    parser.add_argument("--no-warm-up", action="store_true", help="Application locale sans chargement des modèles")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    base_url = args.url or start_local_server(warm=not args.no_warm_up)
+    generator = LoadGenerator(base_url, users=args.users, mix=parse_mix(args.mix) or None, seed=args.seed)
+    generator.setup_users()
+
+    start = time.perf_counter()
+    if args.mode == "closed":
+        generator.run_closed(args.duration, args.think_ms)
+    else:
+        generator.run_open(args.duration, args.rps)
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "url": base_url, "mode": args.mode, "users": len(generator.sessions), "duration_s": elapsed,
+        "endpoints": generator.report(elapsed),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['users']} utilisateurs, boucle {args.mode}, {elapsed:.1f} s sur {base_url}")
+    for name, summary in report["endpoints"].items():
+        if not summary["requests"]:
+            continue
+        print(f"   {name:8s} {summary['requests']:6d} req | {summary['throughput_qps']:7.1f} req/s | "
+              f"erreurs {summary['error_rate']:.1%} | p50 {summary['p50_ms']:.1f} ms p90 {summary['p90_ms']:.1f} ms "
+              f"p99 {summary['p99_ms']:.1f} ms max {summary['max_ms']:.1f} ms")
+
+if __name__ == "__main__":
+    main()
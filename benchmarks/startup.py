@@ -0,0 +1,97 @@
+# benchmarks/startup.py
+# Mesure le coût de démarrage de l'application avec `python -X importtime`
+# et vérifie qu'il reste dans le budget fixé.
+#
+#   python -m benchmarks.startup                 # budget par défaut
+#   python -m benchmarks.startup --budget-ms 400
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Budget de démarrage : import de bankApp + première réponse de /health
+DEFAULT_BUDGET_MS = 500
+
+# Modules qui ne doivent pas être importés tant que les modèles ne sont pas demandés
+FORBIDDEN_MODULES = ["pandas", "sklearn", "torch", "sentence_transformers", "spellchecker", "spacy"]
+
+# Programme exécuté dans un interpréteur neuf pour mesurer un vrai démarrage à froid
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import bankApp
+imported = time.perf_counter()
+client = bankApp.app.test_client()
+status = client.get('/health').status_code
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (served - start) * 1000,
+    "health_status": status,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+def parse_importtime(stderr, top=15):
+    """
+    Analyse la sortie de -X importtime.
+    Returns:
+        list: [(module, self_us, cumulative_us)] triée par temps propre décroissant
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:top]
+
+def measure_startup():
+    # Lance la sonde dans un sous-processus et retourne le rapport de démarrage
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Échec de la sonde de démarrage:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = set(report.pop("modules"))
+    report["forbidden_imported"] = [
+        m for m in FORBIDDEN_MODULES if m in modules
+    ]
+    report["slowest_imports"] = parse_importtime(result.stderr)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de démarrage à froid de bankApp")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    report = measure_startup()
+    report["budget_ms"] = args.budget_ms
+    report["within_budget"] = (
+        report["first_response_ms"] <= args.budget_ms and not report["forbidden_imported"]
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Import de bankApp : {report['import_ms']:.0f} ms")
+        print(f"Première réponse /health : {report['first_response_ms']:.0f} ms "
+              f"(budget {args.budget_ms:.0f} ms, statut {report['health_status']})")
+        print("Imports les plus lents (temps propre) :")
+        for name, self_us, cumulative_us in report["slowest_imports"]:
+            print(f"   {name}: {self_us / 1000:.1f} ms (cumulé {cumulative_us / 1000:.1f} ms)")
+        if report["forbidden_imported"]:
+            print(f"Modules lourds importés au démarrage : {report['forbidden_imported']}")
+
+    sys.exit(0 if report["within_budget"] else 1)
+
+if __name__ == "__main__":
+    main()
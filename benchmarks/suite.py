@@ -0,0 +1,150 @@
+# benchmarks/suite.py
+# Suite de benchmarks reproductible (corpus seedés), résultats JSON et comparaison de deux exécutions.
+#
+#   python -m benchmarks.suite run --out bench_base.json
+#   python -m benchmarks.suite run --sections chat --db postgres --out bench_new.json
+#   python -m benchmarks.suite compare bench_base.json bench_new.json --threshold 0.10
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from benchmarks import chat, database, startup
+
+SECTIONS = ("startup", "chat", "database")
+
+# Écart relatif au-delà duquel une métrique est signalée comme régression
+DEFAULT_THRESHOLD = 0.10
+
+# Écart absolu minimal (ms par opération) pour signaler une régression : ignore le bruit des opérations de quelques µs
+MIN_DELTA_MS = 0.05
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=chat.ROOT_DIR, capture_output=True, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(sections=SECTIONS, db_backend="memory"):
+    """
+    Exécute les sections demandées. Une section qui ne peut pas tourner (modèles absents,
+    base inaccessible) est enregistrée avec son erreur au lieu d'interrompre la suite.
+    Returns:
+        dict: {"meta": {...}, "results": {section: ...}}
+    """
+    runners = {
+        "startup": startup.measure_startup,
+        "chat": chat.run,
+        "database": lambda: database.run(db_backend),
+    }
+    results = {}
+    for section in sections:
+        print(f"-> {section}", file=sys.stderr)
+        try:
+            results[section] = runners[section]()
+        except Exception as e:
+            print(f"   section ignorée: {e}", file=sys.stderr)
+            results[section] = {"error": str(e)}
+
+    # Liste des imports les plus lents : utile à la lecture, pas à la comparaison
+    results.get("startup", {}).pop("slowest_imports", None)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "db_backend": db_backend,
+        },
+        "results": results,
+    }
+
+def flatten(tree, prefix=""):
+    # {"a": {"b": 1}} -> {"a.b": 1} (valeurs numériques uniquement)
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+def direction(metric):
+    # +1 si une valeur plus grande est meilleure, -1 si plus petite, 0 si non comparée
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("_ms"):
+        return -1
+    if name.endswith("_qps") or name == "speedup":
+        return 1
+    return 0
+
+def compare(base, new, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare deux exécutions métrique par métrique.
+    Returns:
+        list: [(métrique, valeur de base, nouvelle valeur, écart relatif, régression)]
+    """
+    base_flat, new_flat = flatten(base["results"]), flatten(new["results"])
+    rows = []
+    for metric in sorted(base_flat.keys() & new_flat.keys()):
+        sign = direction(metric)
+        if sign == 0:
+            continue
+        old, value = base_flat[metric], new_flat[metric]
+        change = (value - old) / abs(old) if old else 0.0
+        # Écart absolu ramené en ms par opération (un débit est l'inverse d'une latence)
+        if sign < 0:
+            delta_ms = abs(value - old)
+        else:
+            delta_ms = abs(1000 / value - 1000 / old) if old and value else float("inf")
+        rows.append((metric, old, value, change, sign * change < -threshold and delta_ms >= MIN_DELTA_MS))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks bankApp")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Exécute les benchmarks")
+    run_parser.add_argument("--sections", nargs="+", default=list(SECTIONS), choices=SECTIONS)
+    run_parser.add_argument("--db", default="memory", choices=database.DB_BACKENDS,
+                            help="Base des benchmarks de base de données")
+    run_parser.add_argument("--out", help="Fichier JSON de résultats (sinon sortie standard)")
+
+    compare_parser = commands.add_parser("compare", help="Compare deux fichiers de résultats")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Dégradation relative tolérée (0.10 = 10 %%)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args.sections, db_backend=args.db)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Résultats écrits dans {args.out}")
+        else:
+            print(json.dumps(report, indent=2))
+        return
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    rows = compare(base, new, args.threshold)
+    regressions = [row for row in rows if row[4]]
+    for metric, old, value, change, regression in rows:
+        flag = "RÉGRESSION" if regression else ""
+        print(f"{metric:60s} {old:12.3f} -> {value:12.3f} ({change:+.1%}) {flag}")
+    print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/vector_index.py
+# Compare les index vectoriels (IVF, HNSW) à la recherche exacte : recall@k et latence,
+# avec et sans filtre par catégorie, sur des vecteurs synthétiques regroupés.
+#
+#   python -m benchmarks.vector_index --n 1000000 --kinds ivf --queries 100
+#   python -m benchmarks.vector_index --n 100000 1000000 --kinds ivf --json
+#   python -m benchmarks.vector_index --n 20000 --kinds ivf hnsw --json
+#   python -m benchmarks.vector_index --kinds flat ivf --storage float32 float16 int8
+import argparse
+import json
+import time
+import numpy as np
+from bankApp.nlp.vector_index import FlatIndex, build_index, _label_offsets, _normalize
+
+def make_corpus(n, dim=384, n_labels=5, n_clusters=1000, n_queries=200, seed=0):
+    """
+    Vecteurs synthétiques regroupés autour de `n_clusters` intentions, triés par label
+    comme les artefacts de service, et requêtes bruitées tirées du corpus.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    cluster_of = rng.integers(0, n_clusters, n)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        block = cluster_of[start:start + 100_000]
+        vectors[start:start + len(block)] = centers[block] + 0.35 * rng.standard_normal((len(block), dim))
+    vectors = _normalize(vectors)
+    labels = np.sort(rng.integers(0, n_labels, n))
+    query_rows = rng.integers(0, n, n_queries)
+    # Bruit de requête de norme ~0.3 (les vecteurs du corpus sont unitaires)
+    noise = rng.standard_normal((n_queries, dim)).astype(np.float32) * (0.3 / np.sqrt(dim))
+    queries = _normalize(vectors[query_rows] + noise)
+    return vectors, labels, queries, labels[query_rows]
+
+def _latency_stats(timings_ms):
+    return {
+        "p50_ms": float(np.percentile(timings_ms, 50)),
+        "p99_ms": float(np.percentile(timings_ms, 99)),
+        "mean_ms": float(np.mean(timings_ms)),
+    }
+
+def evaluate(index, exact, queries, query_labels, k, filtered):
+    # recall@k de l'index par rapport à la recherche exacte, et latence par requête
+    recalls, timings = [], []
+    for query, label in zip(queries, query_labels):
+        label = int(label) if filtered else None
+        _, expected = exact.search(query, k, label=label)
+        start = time.perf_counter()
+        _, found = index.search(query, k, label=label)
+        timings.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(expected.tolist()) & set(found.tolist())) / max(len(expected), 1))
+    return {"recall_at_k": float(np.mean(recalls)), **_latency_stats(timings)}
+
+def run(n, kinds, k=10, dim=384, seed=0, params=None, storages=("float32",), n_queries=200):
+    params = params or {}
+    vectors, labels, queries, query_labels = make_corpus(n, dim=dim, n_queries=n_queries, seed=seed)
+    # Référence exacte sur les vecteurs déjà triés et normalisés : pas de seconde copie du corpus
+    # (à 1M x 384, chaque copie float32 occupe 1.5 Go)
+    exact = FlatIndex.from_sorted(vectors, _label_offsets(labels))
+
+    results = {"n": n, "dim": dim, "k": k, "indexes": {}}
+    configs = [("flat", "float32")] + [
+        (kind, storage) for kind in kinds for storage in storages
+        if (kind, storage) != ("flat", "float32") and not (kind == "hnsw" and storage != "float32")
+    ]
+    for kind, storage in configs:
+        start = time.perf_counter()
+        if (kind, storage) == ("flat", "float32"):
+            index = exact
+        else:
+            index = build_index(kind, vectors, labels, storage=storage, **params.get(kind, {}))
+        build_s = time.perf_counter() - start
+        results["indexes"][f"{kind}/{storage}"] = {
+            "build_s": build_s,
+            "memory_mb": index.memory_bytes() / 2**20,
+            "all": evaluate(index, exact, queries, query_labels, k, filtered=False),
+            "filtered": evaluate(index, exact, queries, query_labels, k, filtered=True),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des index vectoriels")
+    parser.add_argument("--n", type=int, nargs="+", default=[100_000], help="Nombre(s) de vecteurs")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", nargs="+", default=["ivf", "hnsw"], choices=["flat", "ivf", "hnsw"])
+    parser.add_argument("--nprobe", type=int, default=16, help="Listes sondées par l'index IVF")
+    parser.add_argument("--ef", type=int, default=64, help="Taille du faisceau de recherche HNSW")
+    parser.add_argument("--storage", nargs="+", default=["float32"], choices=["float32", "float16", "int8"],
+                        help="Stockages à comparer (flat et ivf)")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    params = {"ivf": {"nprobe": args.nprobe}, "hnsw": {"ef_search": args.ef}}
+    all_results = [
+        run(n, args.kinds, k=args.k, dim=args.dim, params=params, storages=args.storage, n_queries=args.queries)
+        for n in args.n
+    ]
+    if args.json:
+        print(json.dumps(all_results, indent=2))
+        return
+
+    for results in all_results:
+        print(f"{results['n']} vecteurs de dimension {args.dim}, recall@{args.k} par rapport à la recherche exacte")
+        for kind, metrics in results["indexes"].items():
+            print(f"   {kind}: construction {metrics['build_s']:.1f} s, mémoire {metrics['memory_mb']:.1f} Mo")
+            for mode in ("all", "filtered"):
+                m = metrics[mode]
+                print(f"      {mode:8s} recall={m['recall_at_k']:.3f} p50={m['p50_ms']:.3f} ms p99={m['p99_ms']:.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# gunicorn.conf.py
+# Configuration du serveur de production : gunicorn -c gunicorn.conf.py
+import gc
+import multiprocessing
+import os
+
+# Un seul thread de calcul par worker pour torch/BLAS : évite la sur-souscription
+# des cœurs entre workers et les blocages d'OpenMP après un fork.
+# Doit être défini avant l'import de torch, donc avant le chargement de l'application.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+wsgi_app = "wsgi:app"
+bind = os.environ.get("BANKAPP_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("BANKAPP_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("BANKAPP_THREADS", "2"))
+timeout = int(os.environ.get("BANKAPP_TIMEOUT", "60"))
+
+# Threads de la session ONNX par worker : les cœurs sont partagés entre les workers.
+# Chaque worker crée sa propre session après le fork (le pool de threads d'onnxruntime n'y survit pas).
+os.environ.setdefault("NLP_ENCODER_THREADS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Charge l'application (et donc les modèles) dans le maître avant le fork
+preload_app = True
+
+def when_ready(server):
+    # Les objets chargés dans le maître sont déplacés dans la génération permanente du GC :
+    # les collectes dans les workers ne les touchent plus, les pages restent partagées (copy-on-write)
+    gc.freeze()
+    server.log.info("Modèles préchargés, gc gelé avant le fork des workers")
+
+def post_fork(server, worker):
+    # Les threads ne survivent pas au fork : chaque worker lance son propre thread de rechargement
+    from bankApp.nlp.preduction_service import start_model_reloader, warm_up_worker
+    start_model_reloader()
+    warm_up_worker()
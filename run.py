@@ -1,9 +1,18 @@
 # run.py
-from bankApp import app
+import os
+from bankApp import app, db_manager
+from bankApp.nlp.preduction_service import warm_up, start_model_reloader
 
 if __name__ == '__main__':
-    # Lancement du serveur de développement
-    app.run(debug=True)
-
+    # Serveur de développement (FLASK_DEBUG=1 pour le mode debug).
+    # En production, utiliser : gunicorn -c gunicorn.conf.py
+    debug = os.environ.get('FLASK_DEBUG') == '1'
 
+    # Avec le rechargement automatique, seul le processus enfant sert les requêtes
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        db_manager.init_db()
+        warm_up()
+        # Recharge en arrière-plan les versions de modèles publiées par l'entraînement
+        start_model_reloader()
 
+    app.run(debug=debug)
@@ -0,0 +1,102 @@
+# tests/test_artifacts.py
+# Format des artefacts de service : aller-retour sauvegarde / chargement et écritures atomiques
+import os
+import json
+import numpy as np
+import pytest
+from bankApp.nlp.artifacts import ARRAY_FILES, ARTIFACTS_SUBDIR, MANIFEST_FILE, artifacts_exist, load_artifacts, save_artifacts
+from bankApp.nlp.atomic_io import atomic_write
+
+CATEGORIES = ["COMPTE", "CARTE", "COMPTE", "CARTE", "PRET", "CARTE"]
+INTENTS = ["solde", "bloquer", "solde", "activer", "simuler", "bloquer"]
+RESPONSES = ["r_solde", "r_bloquer", "r_solde", "r_activer", "r_simuler", "r_bloquer"]
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).standard_normal((len(CATEGORIES), 8)).astype(np.float32)
+
+def test_round_trip(tmp_path, embeddings):
+    save_artifacts(str(tmp_path), CATEGORIES, INTENTS, RESPONSES, embeddings)
+    assert artifacts_exist(str(tmp_path))
+    metadata = load_artifacts(str(tmp_path))
+
+    # Ouverts en mmap, embeddings normalisés
+    assert isinstance(metadata.embeddings, np.memmap)
+    np.testing.assert_allclose(np.linalg.norm(metadata.embeddings, axis=1), 1.0, rtol=1e-6)
+
+    # Chaque ligne relue correspond à une ligne sauvegardée (même embedding normalisé, mêmes libellés)
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    for row in range(len(metadata)):
+        source = int(np.argmin(np.linalg.norm(normalized - metadata.embeddings[row], axis=1)))
+        assert metadata.intent(row) == INTENTS[source]
+        assert metadata.response(row) == RESPONSES[source]
+        start, end = metadata.category_slice(CATEGORIES[source])
+        assert start <= row < end
+
+def test_rows_sorted_by_category(tmp_path, embeddings):
+    save_artifacts(str(tmp_path), CATEGORIES, INTENTS, RESPONSES, embeddings)
+    metadata = load_artifacts(str(tmp_path))
+
+    codes = metadata.row_category_codes()
+    assert list(codes) == sorted(codes)
+    for category in set(CATEGORIES):
+        start, end = metadata.category_slice(category)
+        assert end - start == CATEGORIES.count(category)
+    assert metadata.category_slice("INCONNUE") == (0, 0)
+
+def test_duplicate_rows_merged(tmp_path, embeddings):
+    # Même instruction (même embedding) et même intention : une seule ligne
+    embeddings[2] = embeddings[0]
+    save_artifacts(str(tmp_path), CATEGORIES, INTENTS, RESPONSES, embeddings)
+    assert len(load_artifacts(str(tmp_path))) == len(CATEGORIES) - 1
+
+def test_answer_table_saved(tmp_path, embeddings):
+    # Paires (intention, réponse) distinctes calculées à la sauvegarde, code de paire de chaque ligne en mmap
+    save_artifacts(str(tmp_path), CATEGORIES, INTENTS, RESPONSES, embeddings)
+    metadata = load_artifacts(str(tmp_path))
+    assert isinstance(metadata.answer_ids, np.memmap)
+    assert len(metadata.answers) == len(set(zip(INTENTS, RESPONSES)))
+    for row in range(len(metadata)):
+        assert metadata.answer(row).intent == metadata.intents[metadata.intent_ids[row]]
+        assert metadata.answer(row).response == metadata.responses[metadata.response_ids[row]]
+
+def test_version_1_rebuilds_answer_table(tmp_path, embeddings):
+    save_artifacts(str(tmp_path), CATEGORIES, INTENTS, RESPONSES, embeddings)
+    expected = load_artifacts(str(tmp_path))
+
+    # Artefacts de version 1 : ni answer_ids.npy ni table des réponses
+    directory = os.path.join(str(tmp_path), ARTIFACTS_SUBDIR)
+    with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["version"] = 1
+    del manifest["arrays"]["answer_ids"]
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.remove(os.path.join(directory, ARRAY_FILES["answer_ids"]))
+
+    metadata = load_artifacts(str(tmp_path))
+    assert [(metadata.intent(row), metadata.response(row)) for row in range(len(metadata))] == [
+        (expected.intent(row), expected.response(row)) for row in range(len(expected))
+    ]
+
+def test_unsupported_version(tmp_path, embeddings):
+    save_artifacts(str(tmp_path), CATEGORIES, INTENTS, RESPONSES, embeddings)
+    manifest = os.path.join(str(tmp_path), ARTIFACTS_SUBDIR, MANIFEST_FILE)
+    with open(manifest, "w", encoding="utf-8") as f:
+        f.write('{"version": 0}')
+    with pytest.raises(ValueError):
+        load_artifacts(str(tmp_path))
+
+def test_atomic_write_keeps_previous_file_on_error(tmp_path):
+    path = str(tmp_path / "state.json")
+    with atomic_write(path) as f:
+        f.write("ancien")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write("partiel")
+            raise RuntimeError("interruption")
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "ancien"
+    assert not os.path.exists(path + ".tmp")
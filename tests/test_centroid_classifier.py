@@ -0,0 +1,48 @@
+# tests/test_centroid_classifier.py
+# Classifieur par centroïde : mise à jour incrémentale, prédiction, sauvegarde .npz
+import numpy as np
+import pytest
+from bankApp.nlp.centroid_classifier import NearestCentroidClassifier
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((3, 16)).astype(np.float32)
+    labels = np.array(["CARTE", "COMPTE", "PRET"])[rng.integers(0, 3, 300)]
+    codes = np.searchsorted(["CARTE", "COMPTE", "PRET"], labels)
+    embeddings = centers[codes] + 0.2 * rng.standard_normal((300, 16)).astype(np.float32)
+    return embeddings, labels
+
+def test_partial_fit_equals_fit_on_concatenated_data(data):
+    embeddings, labels = data
+    full = NearestCentroidClassifier().fit(embeddings, labels)
+    incremental = NearestCentroidClassifier().fit(embeddings[:200], labels[:200])
+    incremental.partial_fit(embeddings[200:250], labels[200:250]).partial_fit(embeddings[250:], labels[250:])
+
+    np.testing.assert_array_equal(incremental.classes_, full.classes_)
+    np.testing.assert_array_equal(incremental.counts_, full.counts_)
+    np.testing.assert_allclose(incremental.centroids_, full.centroids_, rtol=1e-5, atol=1e-6)
+
+def test_partial_fit_unknown_category(data):
+    embeddings, labels = data
+    model = NearestCentroidClassifier().fit(embeddings, labels)
+    with pytest.raises(ValueError):
+        model.partial_fit(embeddings[:1], ["EPARGNE"])
+
+def test_predict(data):
+    embeddings, labels = data
+    model = NearestCentroidClassifier().fit(embeddings, labels)
+    assert np.mean(model.predict(embeddings) == labels) > 0.95
+    probas = model.predict_proba(embeddings[:5])
+    np.testing.assert_allclose(probas.sum(axis=1), 1.0, rtol=1e-6)
+
+def test_save_load_then_partial_fit(tmp_path, data):
+    embeddings, labels = data
+    path = str(tmp_path / "centroids.npz")
+    NearestCentroidClassifier(temperature=0.1).fit(embeddings[:200], labels[:200]).save(path)
+    loaded = NearestCentroidClassifier.load(path)
+    assert loaded.temperature == 0.1
+
+    full = NearestCentroidClassifier().fit(embeddings, labels)
+    loaded.partial_fit(embeddings[200:], labels[200:])
+    np.testing.assert_allclose(loaded.centroids_, full.centroids_, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,98 @@
+# tests/test_eda_aggregates.py
+# Agrégats de l'EDA par blocs : fusion associative, doublons en mémoire bornée, statistiques d'histogramme
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from bankApp.nlp import eda_aggregates
+from bankApp.nlp.eda_aggregates import (
+    EdaAggregates, DistinctCounter, SOURCE_HASH_COLUMN, TEXT_COLUMNS, aggregate, histogram_stats, row_hashes,
+)
+
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    words = np.array(["carte", "solde", "virement", "bloquer", "compte", "prêt"])
+    n = 600
+    df = pd.DataFrame({
+        "instruction_clean": [" ".join(rng.choice(words, rng.integers(1, 4))) for _ in range(n)],
+        "response": rng.choice(["r1", "r2 longue", None], n),
+        "category": rng.choice(["CARTE", "COMPTE", "PRET"], n),
+        "intent": rng.choice(["activer", "solde", "simuler"], n),
+    })
+    # Colonne source absente des agrégats : deux lignes de même texte peuvent différer par elle
+    df["tag"] = rng.integers(0, 3, n)
+    return df
+
+def chunks(df, size=150):
+    for start in range(0, len(df), size):
+        chunk = df.iloc[start:start + size]
+        out = chunk[list(TEXT_COLUMNS)].copy()
+        out[SOURCE_HASH_COLUMN] = row_hashes(chunk)
+        yield out
+
+def partials(df):
+    return [EdaAggregates().update(chunk) for chunk in chunks(df)]
+
+def test_merge_is_associative(dataset):
+    a, b, c, d = partials(dataset)
+    left = a.merge(b).merge(c).merge(d).finalize().to_dict()
+    a, b, c, d = partials(dataset)
+    right = a.merge(b.merge(c.merge(d))).finalize().to_dict()
+    a, b, c, d = partials(dataset)
+    shuffled = d.merge(b).merge(a.merge(c)).finalize().to_dict()
+    assert left == right == shuffled
+
+def test_merged_equals_single_pass(dataset):
+    merged = EdaAggregates()
+    for partial in partials(dataset):
+        merged.merge(partial)
+    single = EdaAggregates()
+    for chunk in chunks(dataset):
+        single.update(chunk)
+    assert merged.finalize().to_dict() == single.finalize().to_dict()
+    assert single.rows == len(dataset)
+    assert single.categories == dataset["category"].value_counts().to_dict()
+
+@pytest.mark.parametrize("spill_hashes", [10**6, 7])
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_duplicates_match_dataframe(dataset, monkeypatch, spill_hashes, jobs):
+    # Petit seuil : les hash sont répartis sur disque dès le premier bloc
+    monkeypatch.setattr(eda_aggregates, "SPILL_HASHES", spill_hashes)
+    agg = aggregate(chunks(dataset), jobs=jobs)
+    assert agg.exact_duplicates == dataset.duplicated().sum()
+    assert agg.duplicates == dataset[list(TEXT_COLUMNS)].duplicated().sum()
+    assert agg.duplicates >= agg.exact_duplicates
+
+def test_without_source_hash(dataset):
+    agg = EdaAggregates().update(dataset[list(TEXT_COLUMNS)]).finalize()
+    assert agg.exact_duplicates is None
+    assert agg.duplicates == dataset[list(TEXT_COLUMNS)].duplicated().sum()
+
+def test_distinct_counter_spills_to_disk(monkeypatch):
+    monkeypatch.setattr(eda_aggregates, "SPILL_HASHES", 100)
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2**63, 300, dtype=np.uint64)
+    hashes = np.concatenate([values, values[:120]])
+    counter = DistinctCounter()
+    for block in np.array_split(hashes, 7):
+        counter.add(block)
+    spill_dir = counter.spill_dir
+    assert spill_dir is not None
+    assert counter.count() == len(np.unique(values))
+    counter.close()
+    assert counter.spill_dir is None and not os.path.exists(spill_dir)
+
+def test_save_load_round_trip(tmp_path, dataset):
+    agg = aggregate(chunks(dataset), jobs=1)
+    path = str(tmp_path / "eda_aggregates.json")
+    agg.save(path)
+    assert EdaAggregates.load(path).to_dict() == agg.to_dict()
+
+def test_histogram_stats():
+    counter = {1: 2, 2: 3, 3: 4, 40: 1}
+    values = np.repeat(list(counter), list(counter.values()))
+    stats = histogram_stats(counter)
+    assert stats["mean"] == pytest.approx(values.mean())
+    assert (stats["min"], stats["max"], stats["med"]) == (1, 40, 2)
+    assert list(stats["fliers"]) == [40]
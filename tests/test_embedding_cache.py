@@ -0,0 +1,80 @@
+# tests/test_embedding_cache.py
+# Cache d'embeddings : succès et échecs, segments, fusion (compact) et rechargement
+import os
+import numpy as np
+import pytest
+from bankApp.nlp import embedding_cache
+from bankApp.nlp.embedding_cache import EmbeddingCache, encode_with_cache, text_keys
+
+class CountingEncoder:
+    # Encodeur déterministe qui enregistre les textes réellement encodés
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32):
+        self.encoded.extend(texts)
+        return np.array([[len(text), sum(map(ord, text)) % 97, 1.0] for text in texts], dtype=np.float32)
+
+def segments(cache):
+    return [name for name in os.listdir(cache.directory) if name.endswith(".keys.npy")]
+
+def test_hits_and_misses(tmp_path):
+    cache = EmbeddingCache("modèle/v1", directory=str(tmp_path))
+    encoder = CountingEncoder()
+    texts = ["solde", "carte", "solde", "virement"]
+
+    first = encode_with_cache(encoder, texts, cache)
+    assert sorted(encoder.encoded) == ["carte", "solde", "virement"]  # une fois chaque texte unique
+    np.testing.assert_array_equal(first, encoder.encode(texts))
+
+    encoder.encoded = []
+    second = encode_with_cache(encoder, ["virement", "prêt", "carte"], cache)
+    assert encoder.encoded == ["prêt"]
+    np.testing.assert_array_equal(second, encoder.encode(["virement", "prêt", "carte"]))
+
+def test_persisted_between_instances(tmp_path):
+    encode_with_cache(CountingEncoder(), ["solde", "carte"], EmbeddingCache("m", directory=str(tmp_path)))
+    encoder = CountingEncoder()
+    encode_with_cache(encoder, ["carte", "solde"], EmbeddingCache("m", directory=str(tmp_path)))
+    assert encoder.encoded == []
+    # Autre modèle : autre cache
+    encode_with_cache(encoder, ["carte"], EmbeddingCache("autre", directory=str(tmp_path)))
+    assert encoder.encoded == ["carte"]
+
+def test_lookup_after_compact(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "MAX_SEGMENTS", 3)
+    cache = EmbeddingCache("m", directory=str(tmp_path))
+    encoder = CountingEncoder()
+    batches = [[f"texte {i}-{j}" for j in range(5)] for i in range(4)]
+    for batch in batches[:3]:
+        encode_with_cache(encoder, batch, cache)
+    assert len(segments(cache)) == 3
+
+    # Quatrième segment : fusion en un seul, toutes les clés restent trouvées
+    encode_with_cache(encoder, batches[3], cache)
+    assert len(segments(cache)) == 1
+    assert not [name for name in os.listdir(cache.directory) if name.endswith(".tmp")]
+
+    everything = [text for batch in batches for text in batch]
+    for reloaded in (cache, EmbeddingCache("m", directory=str(tmp_path))):
+        rows, found = reloaded.lookup(text_keys(everything))
+        assert found.all()
+        np.testing.assert_array_equal(reloaded.vectors[rows], encoder.encode(everything))
+        _, found = reloaded.lookup(text_keys(["absent"]))
+        assert not found.any()
+
+def test_duplicate_keys_across_segments(tmp_path):
+    cache = EmbeddingCache("m", directory=str(tmp_path))
+    keys = text_keys(["a", "b"])
+    cache.add(keys, np.ones((2, 3)))
+    cache.add(keys[:1], np.ones((1, 3)))
+    assert len(cache) == 2
+    cache.compact()
+    assert len(EmbeddingCache("m", directory=str(tmp_path))) == 2
+
+def test_empty_cache(tmp_path):
+    cache = EmbeddingCache("m", directory=str(tmp_path))
+    rows, found = cache.lookup(text_keys(["a"]))
+    assert len(cache) == 0 and not found.any()
+    cache.add(text_keys([]), np.empty((0, 3)))
+    assert not os.path.exists(cache.directory)
@@ -0,0 +1,64 @@
+# tests/test_encoders.py
+# Export ONNX de l'encodeur de phrases et vérification de parité avec PyTorch, sur un petit encodeur aléatoire
+import os
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from bankApp.nlp.encoders import (
+    PARITY_FILE, PARITY_SENTENCES, OnnxEncoder, check_parity, export_onnx, onnx_encoder_exists,
+)
+
+@pytest.fixture(scope="module")
+def tiny_encoder(tmp_path_factory):
+    # Petit BERT aléatoire (2 couches, dimension 32) et tokenizer WordPiece sur le vocabulaire des phrases de parité
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+
+    directory = str(tmp_path_factory.mktemp("tiny_bert"))
+    words = sorted({word for sentence in PARITY_SENTENCES for word in sentence.split()})
+    with open(os.path.join(directory, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words))
+    tokenizer = BertTokenizerFast(os.path.join(directory, "vocab.txt"))
+    tokenizer.save_pretrained(directory)
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=64,
+    )
+    BertModel(config).save_pretrained(directory)
+
+    transformer = models.Transformer(directory, max_seq_length=32)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    return SentenceTransformer(modules=[transformer, pooling], device="cpu")
+
+def test_export_passes_parity(tmp_path, tiny_encoder):
+    directory = export_onnx(tiny_encoder, str(tmp_path), quantize=False)
+    assert onnx_encoder_exists(str(tmp_path))
+    assert check_parity(OnnxEncoder(directory, threads=1), directory) > 0.999
+
+    # Mêmes embeddings que PyTorch, lots de tailles variables (padding) compris
+    embeddings = OnnxEncoder(directory, threads=1).encode(PARITY_SENTENCES, batch_size=3)
+    np.testing.assert_allclose(embeddings, tiny_encoder.encode(PARITY_SENTENCES), atol=1e-4)
+
+def test_parity_failure_raises(tmp_path, tiny_encoder):
+    directory = export_onnx(tiny_encoder, str(tmp_path), quantize=False)
+    reference = np.load(os.path.join(directory, PARITY_FILE))
+    np.save(os.path.join(directory, PARITY_FILE), -reference)
+    with pytest.raises(ValueError):
+        check_parity(OnnxEncoder(directory, threads=1), directory)
+
+def test_session_created_per_process(tmp_path, tiny_encoder, monkeypatch):
+    # Aucune session à la construction ; un autre processus (worker après le fork) crée la sienne
+    directory = export_onnx(tiny_encoder, str(tmp_path), quantize=False)
+    encoder = OnnxEncoder(directory, threads=1)
+    assert not encoder._sessions
+    parent = encoder.session
+    monkeypatch.setattr(os, "getpid", lambda: -1)
+    assert encoder.session is not parent
+    np.testing.assert_allclose(encoder.encode(PARITY_SENTENCES), tiny_encoder.encode(PARITY_SENTENCES), atol=1e-4)
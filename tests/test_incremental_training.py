@@ -0,0 +1,56 @@
+# tests/test_incremental_training.py
+# Mise à jour incrémentale : étiquettes inutilisables lues une seule fois par version de départ
+import os
+import numpy as np
+import pytest
+from bankApp.models import InMemoryDatabaseManager
+from bankApp.nlp import incremental_training
+from bankApp.nlp.artifacts import save_artifacts
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    # Version publiée minimale (artefacts seuls) et suivi des étiquettes ignorées propre au test
+    base_dir = str(tmp_path / "v1")
+    save_artifacts(base_dir, ["CARTE", "COMPTE"], ["activer", "solde"], ["r1", "r2"], np.eye(2, dtype=np.float32))
+    monkeypatch.setattr(incremental_training, "current_version", lambda: "v1")
+    monkeypatch.setattr(incremental_training, "version_dir", lambda version=None: base_dir)
+    monkeypatch.setattr(incremental_training, "SKIPPED_LABELS_FILE", str(tmp_path / "skipped.json"))
+    return base_dir
+
+@pytest.fixture
+def db():
+    db = InMemoryDatabaseManager()
+    user = db.create_user("client@example.com", "secret", "Jean", "Client")
+    for question in ("question un", "question deux", "question trois"):
+        db.save_conversation(user["id"], question, "réponse", "Inconnue", 0.1)
+    return db
+
+def spy_after_ids(db, monkeypatch):
+    calls = []
+    iterate = db.iter_labelled_conversations
+    def spy(after_id=0, **kwargs):
+        calls.append(after_id)
+        return iterate(after_id=after_id, **kwargs)
+    monkeypatch.setattr(db, "iter_labelled_conversations", spy)
+    return calls
+
+def test_unusable_labels_not_fetched_again(base, db, monkeypatch):
+    # Intention inconnue, et intention rattachée à une autre catégorie
+    db.label_conversation(1, "CARTE", "inconnue")
+    db.label_conversation(2, "COMPTE", "activer")
+    calls = spy_after_ids(db, monkeypatch)
+
+    assert incremental_training.update_models(db, 0.6) is None
+    assert incremental_training.read_skipped_labels("v1") == 2
+    assert incremental_training.update_models(db, 0.6) is None
+    assert calls == [0, 2]
+
+    # Une autre version de départ relit toutes les étiquettes (ses intentions peuvent être différentes)
+    assert incremental_training.read_skipped_labels("v2") == 0
+
+def test_requires_published_version(db, monkeypatch):
+    # Ancien format à plat : aucune version de départ, aucune version créée
+    monkeypatch.setattr(incremental_training, "current_version", lambda: None)
+    monkeypatch.setattr(incremental_training, "create_version_dir", lambda: pytest.fail("version créée"))
+    with pytest.raises(ValueError):
+        incremental_training.update_models(db, 0.6)
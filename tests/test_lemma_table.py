@@ -0,0 +1,43 @@
+# tests/test_lemma_table.py
+# Table de lemmes : construction depuis des documents analysés, normalisation, sauvegarde
+import json
+from types import SimpleNamespace
+import pytest
+from bankApp.nlp.lemma_table import (
+    LEMMA_TABLE_FILE, LemmaNormalizer, build_lemma_table, lemma_table_exists, load_lemma_table,
+)
+
+def token(text, lemma, is_stop=False, is_alpha=True):
+    # Jeton au sens de spaCy : seuls les attributs lus par build_lemma_table
+    return SimpleNamespace(lower_=text.lower(), lemma_=lemma, is_stop=is_stop, is_alpha=is_alpha)
+
+def test_build_keeps_most_frequent_lemma():
+    docs = [
+        [token("Cartes", "carte"), token("bloquées", "bloquer"), token("ma", "mon", is_stop=True)],
+        [token("bloquées", "bloqué"), token("cartes", "carte"), token("42", "42", is_alpha=False)],
+        [token("bloquées", "bloquer")],
+    ]
+    table = build_lemma_table(docs, stop_words=["Le"])
+    assert table.lemmas == {"cartes": "carte", "bloquées": "bloquer"}
+    assert table.stop_words == {"ma", "le"}
+
+def test_normalize():
+    table = LemmaNormalizer({"cartes": "carte", "bloquées": "bloquer"}, ["ma", "les"])
+    # Minuscules, mots vides et chiffres retirés, mots inconnus conservés, accents gardés
+    assert table.normalize("Les CARTES bloquées de ma banque 2024") == "carte bloquer de banque"
+    assert table.normalize("") == ""
+
+def test_save_load_round_trip(tmp_path):
+    table = LemmaNormalizer({"prêts": "prêt"}, ["le"])
+    table.save(str(tmp_path / LEMMA_TABLE_FILE))
+    assert lemma_table_exists(str(tmp_path))
+    loaded = load_lemma_table(str(tmp_path))
+    assert loaded.lemmas == table.lemmas
+    assert loaded.stop_words == table.stop_words
+    assert loaded.normalize("le prêts") == "prêt"
+
+def test_unsupported_version(tmp_path):
+    path = tmp_path / LEMMA_TABLE_FILE
+    path.write_text(json.dumps({"version": 0, "lemmas": {}, "stop_words": []}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_lemma_table(str(tmp_path))
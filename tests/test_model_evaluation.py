@@ -0,0 +1,27 @@
+# tests/test_model_evaluation.py
+# Questions d'évaluation du pipeline : bruitées, absentes du dataset indexé, reproductibles
+import pandas as pd
+import pytest
+from bankApp.nlp.data_generation import generate_chunks
+
+model_evaluation = pytest.importorskip("bankApp.nlp.model_evaluation")
+
+@pytest.fixture(scope="module")
+def dataset():
+    df = pd.concat(generate_chunks(rows_per_intent=20, seed=0), ignore_index=True)
+    return df, df.sample(frac=0.2, random_state=0)
+
+def test_queries_are_not_indexed_sentences(dataset):
+    df, test_df = dataset
+    queries = model_evaluation.make_eval_queries(df, test_df)
+    assert 0 < len(queries) <= len(test_df)
+    indexed = set(df["instruction"].str.lower().str.strip())
+    assert not queries["instruction"].str.lower().str.strip().isin(indexed).any()
+
+def test_queries_keep_labels_and_are_reproducible(dataset):
+    df, test_df = dataset
+    queries = model_evaluation.make_eval_queries(df, test_df)
+    pd.testing.assert_frame_equal(queries, model_evaluation.make_eval_queries(df, test_df))
+    # Chaque question garde la catégorie et l'intention de l'instruction d'origine
+    pairs = set(zip(df["category"], df["intent"]))
+    assert set(zip(queries["category"], queries["intent"])) <= pairs
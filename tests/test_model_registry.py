@@ -0,0 +1,100 @@
+# tests/test_model_registry.py
+# Versions de modèles : publication, conservation des versions publiées, nettoyage des échecs
+import os
+import time
+import numpy as np
+import pytest
+from bankApp.nlp import model_registry
+from bankApp.nlp.artifacts import save_artifacts
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    model_dir = tmp_path / "models"
+    monkeypatch.setattr(model_registry, "MODEL_DIR", str(model_dir))
+    monkeypatch.setattr(model_registry, "VERSIONS_DIR", str(model_dir / "versions"))
+    monkeypatch.setattr(model_registry, "CURRENT_FILE", str(model_dir / "CURRENT"))
+    monkeypatch.setattr(model_registry, "PUBLISHED_FILE", str(model_dir / "PUBLISHED"))
+    return model_registry
+
+def make_version(registry, name, complete=True, age_hours=0):
+    path = os.path.join(registry.VERSIONS_DIR, name)
+    os.makedirs(path)
+    if complete:
+        registry.complete_version(name)
+    if age_hours:
+        old = time.time() - age_hours * 3600
+        os.utime(path, (old, old))
+    return path
+
+def existing(registry):
+    return sorted(os.listdir(registry.VERSIONS_DIR))
+
+def test_unpublished_versions_do_not_evict_published(registry):
+    for name in ("v1", "v2", "v3"):
+        make_version(registry, name)
+        registry.publish_version(name)
+
+    # Entraînements plus récents jamais publiés (échecs en cours d'écriture, --no-publish)
+    make_version(registry, "v4", complete=False)
+    make_version(registry, "v5")
+    registry.prune_versions(keep=3)
+    assert existing(registry) == ["v1", "v2", "v3", "v4", "v5"]
+
+    make_version(registry, "v6")
+    registry.publish_version("v6")
+    assert registry.published_versions()[-3:] == ["v2", "v3", "v6"]
+    assert "v1" not in existing(registry)
+    assert {"v4", "v5"} <= set(existing(registry))
+
+def test_republished_version_becomes_latest(registry):
+    for name in ("v1", "v2", "v3", "v4"):
+        make_version(registry, name)
+        registry.publish_version(name)
+
+    # Retour arrière sur v2 : elle n'est plus la plus ancienne des versions gardées
+    registry.publish_version("v2")
+    assert registry.current_version() == "v2"
+    assert registry.published_versions() == ["v3", "v4", "v2"]
+
+def test_stale_incomplete_versions_removed(registry):
+    make_version(registry, "v1")
+    registry.publish_version("v1")
+    make_version(registry, "failed", complete=False, age_hours=48)
+    make_version(registry, "running", complete=False)
+    make_version(registry, "candidate", age_hours=48)
+
+    registry.prune_versions()
+    assert existing(registry) == ["candidate", "running", "v1"]
+
+def test_current_version_never_removed(registry):
+    for name in ("v1", "v2"):
+        make_version(registry, name)
+        registry.publish_version(name)
+    registry.publish_version("v1")
+    registry.prune_versions(keep=0)
+    assert existing(registry) == ["v1"]
+
+def test_legacy_versions_count_as_published(registry):
+    # Versions antérieures au fichier PUBLISHED : celles aux artefacts complets sont des cibles de retour arrière
+    embeddings = np.eye(2, dtype=np.float32)
+    for name in ("v1", "v2"):
+        save_artifacts(make_version(registry, name, complete=False), ["A", "B"], ["a", "b"], ["ra", "rb"], embeddings)
+    make_version(registry, "v0", complete=False, age_hours=48)
+
+    assert registry.published_versions() == ["v1", "v2"]
+    registry.prune_versions()
+    assert existing(registry) == ["v1", "v2"]
+
+def test_publish_unknown_version(registry):
+    with pytest.raises(FileNotFoundError):
+        registry.publish_version("absente")
+
+def test_publish_incomplete_version(registry):
+    make_version(registry, "v1")
+    registry.publish_version("v1")
+    # Entraînement en cours ou interrompu : le pointeur CURRENT reste sur la version complète
+    make_version(registry, "v2", complete=False)
+    with pytest.raises(ValueError):
+        registry.publish_version("v2")
+    assert registry.current_version() == "v1"
+    assert registry.published_versions() == ["v1"]
@@ -0,0 +1,69 @@
+# tests/test_models.py
+# Parcours par lots de la base : une erreur de lecture remonte à l'appelant au lieu de terminer le parcours
+import pytest
+from bankApp.models import DatabaseManager
+
+class FakeCursor:
+    # Curseur côté serveur : deux lots, puis une erreur (connexion perdue) si fail_after est atteint
+    def __init__(self, batches, fail_after=None):
+        self.batches = list(batches)
+        self.fail_after = fail_after
+        self.fetched = 0
+
+    def execute(self, query, params):
+        pass
+
+    def fetchmany(self, size):
+        if self.fail_after is not None and self.fetched == self.fail_after:
+            raise RuntimeError("connexion perdue")
+        self.fetched += 1
+        return self.batches.pop(0) if self.batches else []
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = False
+
+    def cursor(self, name=None):
+        return self._cursor
+
+    def close(self):
+        self.closed = True
+
+def make_manager(monkeypatch, connection):
+    manager = DatabaseManager.__new__(DatabaseManager)
+    monkeypatch.setattr(manager, "get_connection", lambda: connection)
+    return manager
+
+BATCHES = [[(1, "bonjour", "r", "COMPTE", 0.9)], [(2, "carte", "r", "CARTE", 0.4)]]
+
+def test_iter_conversations(monkeypatch):
+    connection = FakeConnection(FakeCursor(BATCHES))
+    assert list(make_manager(monkeypatch, connection).iter_conversations()) == BATCHES
+    assert connection.closed
+
+def test_iter_conversations_error_propagates(monkeypatch):
+    connection = FakeConnection(FakeCursor(BATCHES, fail_after=1))
+    seen = []
+    with pytest.raises(RuntimeError):
+        for rows in make_manager(monkeypatch, connection).iter_conversations():
+            seen.extend(rows)
+    # L'appelant sait jusqu'où il est allé et reprend après le dernier id traité
+    assert [row[0] for row in seen] == [1]
+    assert connection.closed
+
+def test_iter_conversations_without_database(monkeypatch):
+    with pytest.raises(ConnectionError):
+        list(make_manager(monkeypatch, None).iter_conversations())
+
+def test_iter_labelled_conversations_error_propagates(monkeypatch):
+    labels = [[(1, "bonjour", "COMPTE", "solde")], [(2, "carte", "CARTE", "bloquer")]]
+    connection = FakeConnection(FakeCursor(labels, fail_after=1))
+    with pytest.raises(RuntimeError):
+        list(make_manager(monkeypatch, connection).iter_labelled_conversations())
+    assert connection.closed
+    with pytest.raises(ConnectionError):
+        list(make_manager(monkeypatch, None).iter_labelled_conversations())
@@ -0,0 +1,92 @@
+# tests/test_pipeline.py
+# Pipeline NLP : code de chaque étape déduit des imports, étapes sautées ou réexécutées selon le hash des entrées
+import os
+import pytest
+from bankApp.nlp import pipeline
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    # Projet factice : bankApp/nlp/<étape>.py et un état de pipeline propre au test
+    root = str(tmp_path)
+    nlp_dir = os.path.join(root, "bankApp", "nlp")
+    monkeypatch.setattr(pipeline, "PROJECT_DIR", root)
+    monkeypatch.setattr(pipeline, "NLP_DIR", nlp_dir)
+    monkeypatch.setattr(pipeline, "STATE_FILE", os.path.join(root, "pipeline_state.json"))
+    monkeypatch.setattr(pipeline, "LOG_DIR", os.path.join(root, "logs"))
+
+    write(os.path.join(nlp_dir, "prepare.py"), "from bankApp.nlp.helpers import clean\n")
+    write(os.path.join(nlp_dir, "train.py"), "import json\n\ndef main():\n    from bankApp.nlp import scoring\n")
+    write(os.path.join(nlp_dir, "helpers.py"), "from bankApp.nlp.shared import CONSTANT\n")
+    write(os.path.join(nlp_dir, "shared.py"), "CONSTANT = 1\n")
+    write(os.path.join(nlp_dir, "scoring.py"), "SCORE = 1\n")
+    write(os.path.join(root, "raw.csv"), "a,b\n")
+
+    # Les étapes écrivent leur sortie au lieu d'être lancées en sous-processus
+    runs = []
+    def fake_run_stage(stage):
+        runs.append(stage.name)
+        for path in stage.outputs:
+            write(path, stage.name)
+        return 0, 0.0
+    monkeypatch.setattr(pipeline, "run_stage", fake_run_stage)
+
+    stages = [
+        pipeline.Stage("prepare", inputs=[os.path.join(root, "raw.csv")], outputs=[os.path.join(root, "clean.csv")]),
+        pipeline.Stage("train", deps=["prepare"], inputs=[os.path.join(root, "clean.csv")],
+                       outputs=[os.path.join(root, "model.bin")]),
+    ]
+    return nlp_dir, stages, runs
+
+def test_stage_code_follows_imports(project):
+    nlp_dir, stages, _ = project
+    names = {stage.name: sorted(os.path.basename(path) for path in stage.code) for stage in stages}
+    assert names["prepare"] == ["helpers.py", "prepare.py", "shared.py"]
+    # Imports dans les fonctions et `from bankApp.nlp import module` compris
+    assert names["train"] == ["scoring.py", "train.py"]
+
+def test_real_stages_include_imported_modules():
+    evaluation = next(stage for stage in pipeline.STAGES if stage.name == "model_evaluation")
+    names = {os.path.basename(path) for path in evaluation.code}
+    assert {"model_evaluation.py", "preduction_service.py", "ponctuations.py", "artifacts.py",
+            "vector_index.py", "centroid_classifier.py", "lemma_table.py", "model_training.py"} <= names
+
+def test_skip_then_rerun_on_code_change(project):
+    nlp_dir, stages, runs = project
+    pipeline.run_pipeline(stages)
+    assert runs == ["prepare", "train"]
+
+    results = pipeline.run_pipeline(stages)
+    assert runs == ["prepare", "train"]
+    assert {result["status"] for result in results.values()} == {"skipped"}
+
+    # Module importé indirectement par prepare : seule prepare est relancée (sa sortie est identique)
+    write(os.path.join(nlp_dir, "shared.py"), "CONSTANT = 22\n")
+    results = pipeline.run_pipeline(stages)
+    assert runs == ["prepare", "train", "prepare"]
+    assert results["train"]["status"] == "skipped"
+
+    write(os.path.join(nlp_dir, "scoring.py"), "SCORE = 222\n")
+    pipeline.run_pipeline(stages)
+    assert runs[-1:] == ["train"]
+
+def test_rerun_on_input_change_and_force(project):
+    _, stages, runs = project
+    pipeline.run_pipeline(stages)
+    write(os.path.join(pipeline.PROJECT_DIR, "raw.csv"), "a,b\n1,2\n")
+    pipeline.run_pipeline(stages)
+    assert runs == ["prepare", "train", "prepare"]
+
+    pipeline.run_pipeline(stages, force={"train"})
+    assert runs[-1:] == ["train"]
+
+def test_missing_output_reruns(project):
+    _, stages, runs = project
+    pipeline.run_pipeline(stages)
+    os.remove(os.path.join(pipeline.PROJECT_DIR, "model.bin"))
+    pipeline.run_pipeline(stages)
+    assert runs == ["prepare", "train", "train"]
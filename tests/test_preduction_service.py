@@ -0,0 +1,31 @@
+# tests/test_preduction_service.py
+# Réponse du service : un tuple pour la meilleure intention, une liste pour les alternatives
+import pytest
+from bankApp.nlp import preduction_service
+
+CANDIDATES = [("CARTE", "activer", "r1", 0.9), ("CARTE", "bloquer", "r2", 0.7), ("COMPTE", "solde", "r3", 0.4)]
+
+@pytest.fixture
+def service(monkeypatch):
+    calls = []
+    def predict(bundle, question, top_n=1):
+        calls.append(top_n)
+        return "CARTE", CANDIDATES[:top_n]
+    monkeypatch.setattr(preduction_service, "get_bundle", lambda: None)
+    monkeypatch.setattr(preduction_service, "predict", predict)
+    return calls
+
+def test_get_response(service):
+    assert preduction_service.get_response("activer ma carte") == CANDIDATES[0]
+    # Sous le seuil : catégorie prédite et score, sans intention ni réponse
+    assert preduction_service.get_response("activer ma carte", min_score=0.95) == ("CARTE", None, None, 0.9)
+    assert service == [1, 1]
+
+def test_get_alternatives(service):
+    assert preduction_service.get_alternatives("ma carte", top_n=3) == CANDIDATES[:2]
+    assert preduction_service.get_alternatives("ma carte", top_n=1, min_score=0.95) == []
+    assert service == [3, 1]
+
+def test_category_margin_disabled_by_default():
+    assert preduction_service.CATEGORY_MARGIN == 0
+    assert preduction_service.select_categories([0.5, 0.49, 0.01], ["A", "B", "C"]) == ["A"]
@@ -0,0 +1,70 @@
+# tests/test_report_figures.py
+# Rendu des figures : seules les figures dont l'empreinte a changé sont redessinées, en série ou en parallèle
+import os
+import pytest
+from bankApp.nlp.report_figures import FIGURE_DPI, PREVIEW_DPI, Figure, load_state, render_figures
+
+def render_text(args, path, dpi):
+    # Fonction de tracé factice (niveau module : envoyée aux processus du pool)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{args} @ {dpi}")
+
+def render_error(args, path, dpi):
+    raise RuntimeError("tracé impossible")
+
+def figures(**changes):
+    data = {"a": [1, 2], "b": {"x": 1}, "c": "texte"}
+    data.update(changes)
+    return [Figure(f"{name}.txt", render_text, value) for name, value in data.items()]
+
+def rendered(results):
+    return sorted(name for name, duration in results.items() if duration is not None)
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_only_changed_figures_rendered(tmp_path, jobs):
+    out = str(tmp_path)
+    assert rendered(render_figures(figures(), out, jobs=jobs)) == ["a.txt", "b.txt", "c.txt"]
+    assert read(os.path.join(out, "a.txt")) == f"[1, 2] @ {FIGURE_DPI}"
+
+    # Rien n'a changé : aucune figure redessinée
+    assert rendered(render_figures(figures(), out, jobs=jobs)) == []
+    # Données d'une figure modifiées, fichier d'une autre supprimé
+    os.remove(os.path.join(out, "c.txt"))
+    assert rendered(render_figures(figures(b={"x": 2}), out, jobs=jobs)) == ["b.txt", "c.txt"]
+    assert set(load_state(out)) == {"a.txt", "b.txt", "c.txt"}
+
+def test_preview_and_force(tmp_path):
+    out = str(tmp_path)
+    render_figures(figures(), out, jobs=1)
+    # Autre résolution : autre empreinte
+    assert rendered(render_figures(figures(), out, preview=True, jobs=1)) == ["a.txt", "b.txt", "c.txt"]
+    assert read(os.path.join(out, "a.txt")).endswith(f"@ {PREVIEW_DPI}")
+    assert rendered(render_figures(figures(), out, preview=True, jobs=1, force=True)) == ["a.txt", "b.txt", "c.txt"]
+
+def test_inputs_override_args(tmp_path):
+    # L'empreinte porte sur inputs : des args différents aux mêmes inputs ne redessinent pas la figure
+    out = str(tmp_path)
+    render_figures([Figure("f.txt", render_text, "v1", inputs={"version": 1})], out, jobs=1)
+    assert rendered(render_figures([Figure("f.txt", render_text, "v2", inputs={"version": 1})], out, jobs=1)) == []
+    assert rendered(render_figures([Figure("f.txt", render_text, "v2", inputs={"version": 2})], out, jobs=1)) == ["f.txt"]
+
+def test_state_saved_when_a_figure_fails(tmp_path):
+    out = str(tmp_path)
+    failing = figures() + [Figure("z.txt", render_error, None)]
+    with pytest.raises(RuntimeError):
+        render_figures(failing, out, jobs=1)
+    # Les figures rendues avant l'échec ne sont pas refaites
+    assert set(load_state(out)) == {"a.txt", "b.txt", "c.txt"}
+    assert rendered(render_figures(figures(), out, jobs=1)) == []
+
+def test_setup_called_once_per_run(tmp_path):
+    out = str(tmp_path)
+    calls = []
+    render_figures(figures(), out, jobs=1, setup=lambda: calls.append(1))
+    render_figures(figures(), out, jobs=1, setup=lambda: calls.append(1))
+    # Deuxième exécution : rien à rendre, style non configuré
+    assert calls == [1]
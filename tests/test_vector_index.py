@@ -0,0 +1,116 @@
+# tests/test_vector_index.py
+# Index vectoriels (flat, ivf, hnsw) : recall par rapport à la recherche exacte, filtre par catégorie,
+# stockages quantifiés et aller-retour sauvegarde / chargement
+import numpy as np
+import pytest
+from bankApp.nlp.vector_index import build_index, extend_index, load_index, save_index, _normalize
+
+N_LABELS = 4
+K = 5
+
+@pytest.fixture(scope="module")
+def corpus():
+    # Vecteurs regroupés autour d'intentions, labels dans le désordre (cas réordonné par les index)
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((40, 32)).astype(np.float32)
+    cluster_of = rng.integers(0, len(centers), 2000)
+    vectors = _normalize(centers[cluster_of] + 0.3 * rng.standard_normal((2000, 32)))
+    labels = cluster_of % N_LABELS
+    rows = rng.integers(0, len(vectors), 30)
+    queries = _normalize(vectors[rows] + 0.05 * rng.standard_normal((len(rows), 32)))
+    return vectors, labels, queries, labels[rows]
+
+def brute_force(vectors, labels, query, k, label=None):
+    scores = vectors @ query
+    if label is not None:
+        scores = np.where(labels == label, scores, -np.inf)
+    return np.argsort(-scores)[:k]
+
+def recall(index, corpus, filtered):
+    vectors, labels, queries, query_labels = corpus
+    recalls = []
+    for query, label in zip(queries, query_labels):
+        label = int(label) if filtered else None
+        expected = brute_force(vectors, labels, query, K, label)
+        _, found = index.search(query, K, label=label)
+        recalls.append(len(set(expected.tolist()) & set(found.tolist())) / K)
+    return float(np.mean(recalls))
+
+@pytest.mark.parametrize("kind, params, minimum", [
+    ("flat", {}, 1.0),
+    ("ivf", {"nprobe": 8}, 0.9),
+    ("hnsw", {"ef_search": 64}, 0.9),
+])
+@pytest.mark.parametrize("filtered", [False, True])
+def test_recall_against_brute_force(corpus, kind, params, minimum, filtered):
+    vectors, labels, _, _ = corpus
+    index = build_index(kind, vectors, labels, **params)
+    assert recall(index, corpus, filtered) >= minimum
+
+@pytest.mark.parametrize("kind", ["flat", "ivf", "hnsw"])
+def test_filter_returns_only_label(corpus, kind):
+    vectors, labels, queries, _ = corpus
+    index = build_index(kind, vectors, labels)
+    for label in range(N_LABELS):
+        scores, rows = index.search(queries[0], K, label=label)
+        assert len(rows) == K
+        assert np.all(labels[rows] == label)
+        assert np.all(np.diff(scores) <= 1e-6)
+    # Catégorie inconnue : aucun résultat
+    assert len(index.search(queries[0], K, label=N_LABELS + 1)[1]) == 0
+
+def test_ivf_probing_all_lists_is_exact(corpus):
+    vectors, labels, _, _ = corpus
+    index = build_index("ivf", vectors, labels, nlist=16, nprobe=16)
+    assert recall(index, corpus, filtered=False) == 1.0
+
+@pytest.mark.parametrize("kind", ["flat", "ivf"])
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_quantized_storage(corpus, kind, storage):
+    vectors, labels, queries, _ = corpus
+    params = {"nprobe": 8} if kind == "ivf" else {}
+    exact = build_index(kind, vectors, labels, **params)
+    index = build_index(kind, vectors, labels, storage=storage, **params)
+    assert index.memory_bytes() < exact.memory_bytes()
+    assert recall(index, corpus, filtered=True) >= recall(exact, corpus, filtered=True) - 0.05
+    # Scores réévalués en float32 : identiques à ceux de la recherche exacte
+    scores, rows = index.search(queries[0], K)
+    np.testing.assert_allclose(scores, vectors[rows] @ queries[0], rtol=1e-5)
+
+@pytest.mark.parametrize("kind, storage", [
+    ("flat", "float32"), ("flat", "int8"), ("ivf", "float32"), ("ivf", "float16"), ("hnsw", "float32"),
+])
+def test_save_load_round_trip(tmp_path, corpus, kind, storage):
+    vectors, labels, queries, query_labels = corpus
+    index = build_index(kind, vectors, labels, storage=storage)
+    save_index(index, str(tmp_path))
+    loaded = load_index(str(tmp_path), vectors)
+    for query, label in zip(queries[:5], query_labels[:5]):
+        for label in (None, int(label)):
+            np.testing.assert_array_equal(loaded.search(query, K, label=label)[1], index.search(query, K, label=label)[1])
+
+def test_flat_load_keeps_vectors_mapped(tmp_path, corpus):
+    # Labels non triés : les vecteurs sont relus dans l'ordre de l'index, en mmap, sans copie au chargement
+    vectors, labels, _, _ = corpus
+    index = build_index("flat", vectors, labels)
+    assert index.ids is not None
+    save_index(index, str(tmp_path))
+    loaded = load_index(str(tmp_path), vectors)
+    assert isinstance(loaded.vectors, np.memmap)
+    assert isinstance(loaded.ids, np.memmap)
+
+@pytest.mark.parametrize("kind", ["flat", "ivf"])
+def test_extend_matches_rebuild(corpus, kind):
+    # Artefacts triés par label (cas du service) augmentés de nouvelles lignes
+    vectors, labels, queries, query_labels = corpus
+    order = np.argsort(labels, kind="stable")
+    vectors, labels = vectors[order], labels[order]
+    old = np.ones(len(vectors), dtype=bool)
+    old[::10] = False
+    row_map, new_rows = np.flatnonzero(old), np.flatnonzero(~old)
+    params = {"nprobe": 1000} if kind == "ivf" else {}
+    index = build_index(kind, vectors[row_map], labels[row_map], **params)
+    extended = extend_index(index, vectors, labels, row_map, new_rows)
+    for query, label in zip(queries, query_labels):
+        expected = brute_force(vectors, labels, query, K, int(label))
+        np.testing.assert_array_equal(np.sort(extended.search(query, K, label=int(label))[1]), np.sort(expected))
@@ -0,0 +1,10 @@
+# wsgi.py
+# Point d'entrée de production (gunicorn -c gunicorn.conf.py).
+# Avec preload_app, ce module est importé une seule fois dans le processus maître :
+# les modèles sont chargés et préchauffés avant le fork des workers.
+from bankApp import app, db_manager
+from bankApp.nlp.preduction_service import warm_up
+
+# Initialisation de la DB puis chargement des modèles
+db_manager.init_db()
+warm_up()